@@ -3,7 +3,11 @@ from setuptools import setup
 setup(
     name='TestRail Utils',
     version='0.1.0',
-    packages=['tr_utils', 'tr_utils.test', 'tr_utils.utils', 'tr_utils.interface'],
+    packages=['tr_utils', 'tr_utils.test', 'tr_utils.utils', 'tr_utils.interface', 'tr_utils.bench',
+              'tr_utils.commands'],
+    extras_require={
+        'async': ['httpx>=0.23'],
+    },
     url='https://github.com/Corefracture/testrail_utils',
     license='MIT ',
     author='Corefracture',
@@ -0,0 +1,276 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+
+class FakeTestRailServer:
+    """
+    In-process fake of the TestRail v2 API, enough of it to exercise and benchmark the utilities end to end.
+
+    Serves get_suites, get_sections, get_cases, get_case and update_case from in-memory data. When page_size is set
+    the list endpoints answer with the paginated format used by newer TestRail servers. Every request can be delayed
+    by a fixed latency, and requests over throttle_rate per second are answered with 429 and a Retry-After header.
+    """
+
+    def __init__(self, cases: list = None, sections: list = None, suites: list = None, page_size: int = None,
+                 latency: float = 0.0, throttle_rate: float = None, record_requests: bool = True):
+        """
+        :param cases: Test case dicts to serve
+        :param sections: Section dicts to serve
+        :param suites: Suite dicts to serve. Defaults to a single suite with ID 1
+        :param page_size: Page size of the list endpoints. None answers with plain lists
+        :param latency: Seconds every request is delayed by before it is answered
+        :param throttle_rate: Requests per second served before answering with 429. None disables throttling
+        :param record_requests: Keep every request in self.requests. Disable for large benchmark runs
+        """
+        self.cases = {case['id']: dict(case) for case in (cases or [])}
+        self.sections = list(sections or [])
+        self.suites = list(suites or [{"id": 1, "name": "Master"}])
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.record_requests = record_requests
+        self.request_count = 0
+        self.throttled_count = 0
+        self.requests = []
+        self.injected_responses = []
+        """ (status, headers) tuples returned, in order, instead of serving the next requests """
+        self.connections = set()
+        """ client (host, port) addresses that connected, one per TCP connection """
+        self.compressed_responses = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        """ The most requests the server was handling at once """
+        self.lock = threading.Lock()
+        self._case_order = None
+        self._throttle_tokens = throttle_rate
+        self._throttle_updated = time.monotonic()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{0}".format(self._server.server_address[1])
+
+    def start(self):
+        fake = self
+
+        class Handler(_FakeRequestHandler):
+            server_fake = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 128
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def requests_for(self, endpoint_prefix: str) -> list:
+        with self.lock:
+            return [request for request in self.requests if request[1].startswith(endpoint_prefix)]
+
+    def handle(self, method: str, endpoint: str, params: dict, body: dict):
+        """
+        Routes an API call
+        :return: Returns a tuple of (status code, response data), or (status code, headers dict) for injected and
+        throttled responses
+        """
+        with self.lock:
+            self.request_count += 1
+            if self.record_requests is True:
+                self.requests.append((method, endpoint, params, body))
+            if len(self.injected_responses) > 0:
+                return self.injected_responses.pop(0)
+            retry_after = self._take_throttle_token()
+            if retry_after is not None:
+                self.throttled_count += 1
+                return 429, {"Retry-After": "{0:.3f}".format(retry_after)}
+
+        name, _, resource_id = endpoint.partition('/')
+
+        if name == "get_suites":
+            return 200, self.suites
+        if name == "get_sections":
+            sections = [sec for sec in self.sections
+                        if 'suite_id' not in params or str(sec.get('suite_id')) == params['suite_id']]
+            return 200, self._page("sections", sections, params)
+        if name == "get_cases":
+            return 200, self._get_cases(params)
+        if name == "get_case":
+            with self.lock:
+                case = self.cases.get(int(resource_id))
+            if case is None:
+                return 400, {"error": "Field :case_id is not a valid test case."}
+            return 200, dict(case)
+        if name == "update_case" and method == "POST":
+            with self.lock:
+                case = self.cases.get(int(resource_id))
+                if case is None:
+                    return 400, {"error": "Field :case_id is not a valid test case."}
+                case.update(body or {})
+                case['updated_on'] = int(time.time())
+                return 200, dict(case)
+
+        return 404, {"error": "Unknown method {0}".format(endpoint)}
+
+    def _take_throttle_token(self):
+        """
+        Must be called with self.lock held
+        :return: Returns None if the request may be served, otherwise the seconds until it may be retried
+        """
+        if self.throttle_rate is None:
+            return None
+
+        now = time.monotonic()
+        self._throttle_tokens = min(self.throttle_rate,
+                                    self._throttle_tokens + (now - self._throttle_updated) * self.throttle_rate)
+        self._throttle_updated = now
+        if self._throttle_tokens >= 1:
+            self._throttle_tokens -= 1
+            return None
+
+        return (1 - self._throttle_tokens) / self.throttle_rate
+
+    def _get_cases(self, params: dict):
+        suite_id = params.get('suite_id')
+        filtered = 'section_id' in params or 'updated_after' in params
+        if filtered is False and self.page_size is not None:
+            # Unfiltered pages are sliced straight out of the suite's case order, so paging a large suite stays linear
+            with self.lock:
+                if self._case_order is None or self._case_order[0] != len(self.cases):
+                    self._case_order = (len(self.cases), {})
+                ids = self._case_order[1].get(suite_id)
+                if ids is None:
+                    ids = self._case_order[1][suite_id] = [case_id for case_id, case in self.cases.items()
+                                                           if self._in_suite(case, suite_id)]
+                offset = int(params.get('offset', 0))
+                limit = min(int(params.get('limit', self.page_size)), self.page_size)
+                page = [dict(self.cases[case_id]) for case_id in ids[offset:offset + limit]]
+            return self._page_envelope("cases", page, offset, limit, len(ids))
+
+        with self.lock:
+            cases = [dict(case) for case in self.cases.values() if self._in_suite(case, suite_id)]
+        if 'section_id' in params:
+            cases = [case for case in cases if str(case['section_id']) == params['section_id']]
+        if 'updated_after' in params:
+            cases = [case for case in cases if case.get('updated_on', 0) > int(params['updated_after'])]
+
+        return self._page("cases", cases, params)
+
+    @staticmethod
+    def _in_suite(case: dict, suite_id) -> bool:
+        return suite_id is None or case.get('suite_id') is None or str(case['suite_id']) == suite_id
+
+    def _page(self, collection_name: str, items: list, params: dict):
+        if self.page_size is None:
+            return items
+
+        offset = int(params.get('offset', 0))
+        limit = min(int(params.get('limit', self.page_size)), self.page_size)
+
+        return self._page_envelope(collection_name, items[offset:offset + limit], offset, limit, len(items))
+
+    @staticmethod
+    def _page_envelope(collection_name: str, page: list, offset: int, limit: int, total: int) -> dict:
+        next_link = None
+        if offset + limit < total:
+            next_link = "/api/v2/get_{0}&offset={1}&limit={2}".format(collection_name, offset + limit, limit)
+
+        return {"offset": offset, "limit": limit, "size": len(page),
+                "_links": {"next": next_link, "prev": None}, collection_name: page}
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_fake = None
+    gzip_min_size = 1024
+    # Headers and body go out in separate writes, Nagle would hold the body back for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        return
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        # TestRail API URLs look like /index.php?/api/v2/get_cases/1&suite_id=1
+        query = urlsplit(self.path).query
+        route, _, param_str = query.partition('&')
+        endpoint = unquote(route).split("/api/v2/", 1)[-1]
+        params = dict(parse_qsl(param_str))
+
+        body = None
+        length = int(self.headers.get('Content-Length', 0))
+        if length > 0:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+
+        with self.server_fake.lock:
+            self.server_fake.in_flight += 1
+            self.server_fake.max_in_flight = max(self.server_fake.max_in_flight, self.server_fake.in_flight)
+        try:
+            if self.server_fake.latency > 0:
+                time.sleep(self.server_fake.latency)
+
+            status, data = self.server_fake.handle(method, endpoint, params, body)
+        finally:
+            with self.server_fake.lock:
+                self.server_fake.in_flight -= 1
+                self.server_fake.connections.add(self.client_address)
+
+        headers = {}
+        if status == 429 or status >= 500:
+            headers = data or {}
+            data = {"error": "Injected status {0}".format(status)}
+        payload = json.dumps(data).encode('utf-8')
+
+        if len(payload) >= self.gzip_min_size and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+            with self.server_fake.lock:
+                self.server_fake.compressed_responses += 1
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
@@ -0,0 +1,137 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import random
+
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+
+class SyntheticSuite:
+    """
+    A generated single suite project laid out the way the utilities are used in practice.
+
+    Section 1 holds the template cases. The derived cases are spread over a two level tree of sections under
+    section 2, template_fanout cases per template. A share of the derived cases are stale, differing from their
+    template in the templated fields, and a share have no template ID assigned yet.
+    """
+
+    project_id = 1
+    suite_id = 1
+    template_section_id = 1
+    derived_section_id = 2
+    template_id_field = "custom_tr_template_id"
+    template_fields_csv = "custom_steps_separated,custom_preconds"
+
+    def __init__(self, cases: list, sections: list, template_count: int, stale_count: int, unassigned_count: int):
+        self.cases = cases
+        self.sections = sections
+        self.template_count = template_count
+        self.stale_count = stale_count
+        self.unassigned_count = unassigned_count
+
+    def __len__(self):
+        return len(self.cases)
+
+    def __repr__(self):
+        return "SyntheticSuite(cases={0}, sections={1}, templates={2}, stale={3}, unassigned={4})".format(
+            len(self.cases), len(self.sections), self.template_count, self.stale_count, self.unassigned_count)
+
+
+def _steps(template_number: int, step_count: int) -> list:
+    return [{"content": "Template {0} step {1}: perform the documented action".format(template_number, step),
+             "expected": "Template {0} step {1}: the documented result is shown".format(template_number, step)}
+            for step in range(1, step_count + 1)]
+
+
+def generate_suite(case_count: int, template_fanout: int = 10, steps_per_case: int = 8, stale_ratio: float = 0.3,
+                   unassigned_ratio: float = 0.1, cases_per_section: int = 500, seed: int = 0) -> SyntheticSuite:
+    """
+    Generates a synthetic suite of test cases and sections
+    :param case_count: The total number of test cases, templates included
+    :param template_fanout: The number of derived cases per template case
+    :param steps_per_case: The number of steps in each template case
+    :param stale_ratio: The share of derived cases that differ from their template
+    :param unassigned_ratio: The share of derived cases with no template ID
+    :param cases_per_section: The number of derived cases per leaf section
+    :param seed: Seed of the random choices, the same arguments always generate the same suite
+    :return: Returns the generated SyntheticSuite
+    """
+    rand = random.Random(seed)
+    end_marker = TestRailTemplater.get_default_end_marker()
+    field = SyntheticSuite.template_id_field
+    suite_id = SyntheticSuite.suite_id
+
+    template_count = max(1, case_count // (template_fanout + 1))
+    derived_count = max(0, case_count - template_count)
+
+    sections = [{"id": SyntheticSuite.template_section_id, "suite_id": suite_id, "name": "Templates",
+                 "parent_id": None, "depth": 0},
+                {"id": SyntheticSuite.derived_section_id, "suite_id": suite_id, "name": "Derived",
+                 "parent_id": None, "depth": 0}]
+
+    # Leaf sections are grouped twenty to a parent so section expansion has a real tree to walk
+    leaf_count = max(1, -(-derived_count // cases_per_section))
+    leaf_ids = []
+    next_section_id = 3
+    for group in range(-(-leaf_count // 20)):
+        group_id = next_section_id
+        next_section_id += 1
+        sections.append({"id": group_id, "suite_id": suite_id, "name": "Group {0}".format(group),
+                         "parent_id": SyntheticSuite.derived_section_id, "depth": 1})
+        for _ in range(min(20, leaf_count - len(leaf_ids))):
+            sections.append({"id": next_section_id, "suite_id": suite_id,
+                             "name": "Area {0}".format(len(leaf_ids)), "parent_id": group_id, "depth": 2})
+            leaf_ids.append(next_section_id)
+            next_section_id += 1
+
+    cases = []
+    templates = []
+    for number in range(1, template_count + 1):
+        template = {"id": number, "title": "Template {0}".format(number), "section_id": 1, "suite_id": suite_id,
+                    "type_id": 1, "priority_id": 2, "updated_on": 1500000000, field: "tmpl-{0:07d}".format(number),
+                    "custom_preconds": "Preconditions of template {0}".format(number),
+                    "custom_steps_separated": _steps(number, steps_per_case)}
+        templates.append(template)
+        cases.append(template)
+
+    stale_count = 0
+    unassigned_count = 0
+    for index in range(derived_count):
+        template = templates[index % template_count]
+        case = {"id": template_count + index + 1, "title": "{0} variant {1}".format(template['title'], index),
+                "section_id": leaf_ids[index // cases_per_section], "suite_id": suite_id, "type_id": 1,
+                "priority_id": 2, "updated_on": 1500000000, field: template[field],
+                # Up to date derived cases share the template's values, as the server would return equal ones
+                "custom_preconds": template['custom_preconds'],
+                "custom_steps_separated": template['custom_steps_separated']}
+
+        if rand.random() < unassigned_ratio:
+            case[field] = None
+            unassigned_count += 1
+        elif rand.random() < stale_ratio:
+            steps = [dict(step) for step in template['custom_steps_separated']]
+            steps[rand.randrange(len(steps))]['content'] += " (outdated)"
+            if rand.random() < 0.5:
+                steps += [{"content": end_marker, "expected": ""},
+                          {"content": "Case specific step of case {0}".format(case['id']), "expected": ""}]
+            case['custom_steps_separated'] = steps
+            stale_count += 1
+
+        cases.append(case)
+
+    return SyntheticSuite(cases, sections, template_count, stale_count, unassigned_count)
@@ -0,0 +1,265 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import argparse
+import gc
+import logging
+import math
+import sys
+import time
+import tracemalloc
+
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_case_classifier import CaseClassifier
+from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
+from tr_utils.utils.tr_template_plan import TemplatePlan, find_end_marker_step, handle_string_replacement
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_MAX_EXPONENT = 1.25
+""" Highest log-log slope of time against input size accepted as linear, leaving room for timer noise """
+
+_FIELD = "custom_tr_template_id"
+_END_MARKER = TestRailTemplater.get_default_end_marker()
+
+
+class ScalingResult:
+    """
+    Timings and peak traced memory of one microbenchmark across input sizes
+    """
+
+    def __init__(self, name: str, points: list):
+        """
+        :param name: The microbenchmark name
+        :param points: List of (input size, best seconds, peak traced bytes) tuples, ordered by size
+        """
+        self.name = name
+        self.points = points
+
+    @property
+    def exponent(self) -> float:
+        """
+        The least squares slope of log(time) against log(size). 1 is linear growth, 2 quadratic
+        """
+        return scaling_exponent([(size, seconds) for size, seconds, _ in self.points])
+
+    def is_superlinear(self, max_exponent: float = DEFAULT_MAX_EXPONENT) -> bool:
+        return self.exponent > max_exponent
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "exponent": round(self.exponent, 3),
+                "points": [{"size": size, "seconds": seconds, "peak_bytes": peak}
+                           for size, seconds, peak in self.points]}
+
+
+def scaling_exponent(points: list) -> float:
+    """
+    Fits time = c * size^k through the given points
+    :param points: List of (input size, seconds) tuples
+    :return: Returns k
+    """
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(seconds, 1e-9)) for _, seconds in points]
+    x_mean = sum(xs) / len(xs)
+    y_mean = sum(ys) / len(ys)
+    variance = sum((x - x_mean) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / variance
+
+
+# region Input Builders
+
+
+def _deep_section_tree(size: int):
+    """ A single chain of sections, each the child of the previous one """
+    sections = [{"id": 1, "parent_id": None}]
+    sections.extend({"id": sec_id, "parent_id": sec_id - 1} for sec_id in range(2, size + 1))
+    tri = TestRailInterface(skip_login=True)
+
+    return lambda: tri.get_child_sections([1], sections)
+
+
+def _wide_section_tree(size: int):
+    """ Three levels of sections with a fan-out of the square root of the size """
+    fan_out = max(2, int(math.sqrt(size)))
+    sections = [{"id": 1, "parent_id": None}]
+    for sec_id in range(2, size + 1):
+        sections.append({"id": sec_id, "parent_id": 1 if sec_id <= fan_out + 1 else 2 + (sec_id - 2) % fan_out})
+    tri = TestRailInterface(skip_login=True)
+
+    return lambda: tri.get_child_sections([1], sections)
+
+
+def _suite_cases(size: int, template_count: int) -> list:
+    """ Template cases in section 1 followed by derived cases spread over 100 sections """
+    cases = [{"id": case_id, "section_id": 1, _FIELD: "tmpl-{0}".format(case_id)}
+             for case_id in range(1, template_count + 1)]
+    cases.extend({"id": case_id, "section_id": 2 + case_id % 100,
+                  _FIELD: "tmpl-{0}".format(1 + case_id % template_count) if case_id % 10 else None}
+                 for case_id in range(template_count + 1, size + 1))
+
+    return cases
+
+
+def _classify(size: int):
+    cases = _suite_cases(size, max(1, size // 11))
+    classifier = CaseClassifier(_FIELD, section_ids=[1])
+
+    return lambda: classifier.classify(cases)
+
+
+def _id_gen_cases_to_update(size: int):
+    cases = _suite_cases(size, max(1, size // 11))
+    id_gen = TemplateIDGen(TestRailInterface(skip_login=True), _FIELD, 1, 1, overwrite_existing_id=False)
+    section_ids = list(range(2, 52))
+
+    return lambda: id_gen._get_cases_to_update(cases, section_ids=section_ids)
+
+
+def _steps(size: int, suffix: str = "") -> list:
+    return [{"content": "Step {0}{1}".format(step, suffix), "expected": "Result {0}".format(step)}
+            for step in range(size)]
+
+
+def _steps_diff(size: int):
+    """ Comparison of a steps field of the given number of steps, the successor of _is_steps_list_same """
+    template = {"id": 1, "custom_steps": _steps(size)}
+    plan = TemplatePlan(template, ["custom_steps"], _END_MARKER)
+    case = {"id": 2, "custom_steps": _steps(size)[:-1] + [{"content": "Changed", "expected": ""},
+                                                            {"content": _END_MARKER, "expected": ""}]}
+
+    return lambda: plan.diff(case)
+
+
+def _end_marker_step(size: int):
+    """ Search for an end marker placed in the last of the given number of steps """
+    steps = _steps(size - 1) + [{"content": _END_MARKER, "expected": ""}]
+
+    return lambda: find_end_marker_step(steps, _END_MARKER)
+
+
+def _string_replacement(size: int):
+    """ Replacement of the templated portion of a string of the given number of characters """
+    template = "t" * (size // 2)
+    case = "c" * (size // 2) + _END_MARKER + "case specific"
+
+    return lambda: handle_string_replacement(template, case, _END_MARKER)
+
+
+# endregion Input Builders
+
+MICROBENCHMARKS = {
+    "get_child_sections_deep": _deep_section_tree,
+    "get_child_sections_wide": _wide_section_tree,
+    "classify_cases": _classify,
+    "id_gen_cases_to_update": _id_gen_cases_to_update,
+    "steps_diff": _steps_diff,
+    "find_end_marker_step": _end_marker_step,
+    "handle_string_replacement": _string_replacement,
+}
+""" Microbenchmark name -> builder taking an input size and returning the zero argument callable to measure """
+
+
+def measure(builder, size: int, repeat: int = 3) -> tuple:
+    """
+    Measures one microbenchmark at one input size. Input building is excluded from the measurement
+    :param builder: The microbenchmark builder, see MICROBENCHMARKS
+    :param size: The input size
+    :param repeat: The number of timed runs, the fastest is reported
+    :return: Returns a tuple of (best seconds, peak traced bytes)
+    """
+    func = builder(size)
+
+    best = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # Traced separately, tracemalloc slows allocation heavy code down too much to time under it
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def run_microbenchmarks(sizes=DEFAULT_SIZES, names: list = None, repeat: int = 3) -> list:
+    """
+    Runs microbenchmarks across the given input sizes
+    :param sizes: The input sizes
+    :param names: The microbenchmarks to run. None runs all of them
+    :param repeat: The number of timed runs per size
+    :return: Returns a list of ScalingResult
+    """
+    results = []
+    for name in (names or list(MICROBENCHMARKS.keys())):
+        points = []
+        for size in sorted(sizes):
+            seconds, peak = measure(MICROBENCHMARKS[name], size, repeat)
+            points.append((size, seconds, peak))
+        results.append(ScalingResult(name, points))
+
+    return results
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks the TestRail utilities' hot paths and checks they "
+                                                 "scale linearly")
+    parser.add_argument("-sizes", "-n", help="The input sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("-only", help="The microbenchmarks to run", nargs="+", choices=list(MICROBENCHMARKS.keys()),
+                        default=None)
+    parser.add_argument("-repeat", help="Timed runs per size, the fastest is reported", type=int, default=3)
+    parser.add_argument("-maxexp", help="The highest accepted log-log scaling exponent. Default: {0}"
+                        .format(DEFAULT_MAX_EXPONENT), type=float, default=DEFAULT_MAX_EXPONENT)
+    parsed_args = parser.parse_args(args)
+
+    # The utilities log per case warnings the inputs deliberately trigger
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run_microbenchmarks(parsed_args.sizes, parsed_args.only, parsed_args.repeat)
+
+    exit_code = 0
+    print("{0:<28}{1:>10}{2:>14}{3:>14}".format("microbenchmark", "size", "best (ms)", "peak (KB)"))
+    for result in results:
+        for size, seconds, peak in result.points:
+            print("{0:<28}{1:>10}{2:>14.3f}{3:>14.1f}".format(result.name, size, seconds * 1000, peak / 1024))
+        verdict = "SUPERLINEAR" if result.is_superlinear(parsed_args.maxexp) else "ok"
+        print("{0:<28}{1:>10}{2:>14.2f}  {3}".format(result.name, "exponent", result.exponent, verdict))
+        if result.is_superlinear(parsed_args.maxexp):
+            exit_code = 1
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
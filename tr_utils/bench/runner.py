@@ -0,0 +1,192 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from tr_utils.bench.fake_server import FakeTestRailServer
+from tr_utils.bench.generators import SyntheticSuite, generate_suite
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_log = logging.getLogger(__name__)
+
+UTILITIES = ("templater", "templateidgen")
+
+
+class BenchmarkResult:
+    """
+    Measurements of one utility run against the fake TestRail server
+    """
+
+    def __init__(self, util: str, case_count: int, exit_code: int, wall_time: float, request_count: int,
+                 throttled_count: int, peak_rss_kb: int, settings: dict = None):
+        self.util = util
+        self.case_count = case_count
+        self.exit_code = exit_code
+        self.wall_time = wall_time
+        self.request_count = request_count
+        self.throttled_count = throttled_count
+        self.peak_rss_kb = peak_rss_kb
+        self.settings = settings or {}
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.request_count / self.wall_time if self.wall_time > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {"util": self.util, "cases": self.case_count, "exit_code": self.exit_code,
+                "wall_time": round(self.wall_time, 3), "requests": self.request_count,
+                "throttled": self.throttled_count, "requests_per_second": round(self.requests_per_second, 1),
+                "peak_rss_kb": self.peak_rss_kb, "settings": self.settings}
+
+    def __repr__(self):
+        return "BenchmarkResult({0}, cases={1}, wall_time={2:.2f}s, requests={3}, rps={4:.1f}, " \
+               "peak_rss={5}KB)".format(self.util, self.case_count, self.wall_time, self.request_count,
+                                        self.requests_per_second, self.peak_rss_kb)
+
+
+def _peak_rss_kb():
+    """
+    :return: Returns the peak resident set size of this process in KB, or None where it cannot be measured
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_utility(util: str, url: str, concurrency: int, dry_run: bool) -> tuple:
+    """
+    Runs one utility against the fake server. Executed in a fresh child process so peak RSS covers only the run
+    :return: Returns a tuple of (exit code, wall time, peak RSS in KB)
+    """
+    logging.basicConfig(level=logging.WARNING)
+    warnings.simplefilter("ignore")
+
+    from tr_utils.interface.tr_interface import TestRailInterface
+
+    started = time.perf_counter()
+    tri = TestRailInterface(url, "bench", "bench", write_concurrency=concurrency)
+    if util == "templater":
+        from tr_utils.utils.tr_templater import TestRailTemplater
+        exit_code = TestRailTemplater(tri, SyntheticSuite.project_id, SyntheticSuite.template_id_field,
+                                      SyntheticSuite.template_fields_csv,
+                                      section_ids_csv=str(SyntheticSuite.template_section_id)
+                                      ).execute_templater(dry_run)
+    else:
+        from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
+        exit_code = TemplateIDGen(tri, SyntheticSuite.template_id_field, SyntheticSuite.project_id,
+                                  SyntheticSuite.suite_id, section_ids_csv=str(SyntheticSuite.derived_section_id),
+                                  overwrite_existing_id=False).execute_id_gen(dry_run)
+
+    return exit_code, time.perf_counter() - started, _peak_rss_kb()
+
+
+def run_benchmark(util: str, case_count: int, template_fanout: int = 10, concurrency: int = 4,
+                  latency: float = 0.0, throttle_rate: float = None, page_size: int = 250, dry_run: bool = False,
+                  seed: int = 0) -> BenchmarkResult:
+    """
+    Generates a suite, serves it from a FakeTestRailServer and times one utility run against it
+    :param util: The utility to run, templater or templateidgen
+    :param case_count: The number of test cases in the generated suite
+    :param template_fanout: The number of derived cases per template case
+    :param concurrency: The write concurrency of the utility's TestRailInterface
+    :param latency: Seconds the fake server delays every request by
+    :param throttle_rate: Requests per second the fake server serves before answering 429
+    :param page_size: Page size of the fake server's list endpoints
+    :param dry_run: Run the utility without writes
+    :param seed: Seed of the suite generator
+    :return: Returns the BenchmarkResult
+    """
+    if util not in UTILITIES:
+        raise ValueError("Unknown utility {0}, expected one of {1}".format(util, ", ".join(UTILITIES)))
+
+    suite = generate_suite(case_count, template_fanout=template_fanout, seed=seed)
+    settings = {"template_fanout": template_fanout, "concurrency": concurrency, "latency": latency,
+                "throttle_rate": throttle_rate, "page_size": page_size, "dry_run": dry_run,
+                "templates": suite.template_count, "stale": suite.stale_count, "unassigned": suite.unassigned_count}
+
+    with FakeTestRailServer(suite.cases, suite.sections, page_size=page_size, latency=latency,
+                            throttle_rate=throttle_rate, record_requests=False) as server:
+        # The suite is freed from this process before the run, the server holds its own copy of every case
+        del suite
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            exit_code, wall_time, peak_rss_kb = pool.submit(_run_utility, util, server.url, concurrency,
+                                                            dry_run).result()
+
+        return BenchmarkResult(util, case_count, exit_code, wall_time, server.request_count,
+                               server.throttled_count, peak_rss_kb, settings)
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the TestRail utilities against a local fake TestRail "
+                                                 "server")
+    parser.add_argument("-util", "-u", help="The utilities to benchmark", nargs="+", choices=UTILITIES,
+                        default=list(UTILITIES))
+    parser.add_argument("-cases", "-n", help="The suite sizes to benchmark", nargs="+", type=int,
+                        default=[1000, 10000, 100000])
+    parser.add_argument("-fanout", help="Derived cases per template case", type=int, default=10)
+    parser.add_argument("-concurrency", "-cc", help="Write concurrency of the utilities", type=int, default=4)
+    parser.add_argument("-latency", help="Seconds the fake server delays every request by", type=float, default=0.0)
+    parser.add_argument("-throttle", help="Requests per second served before the fake server answers 429",
+                        type=float, default=None)
+    parser.add_argument("-pagesize", help="Page size of the list endpoints", type=int, default=250)
+    parser.add_argument("-dryrun", help="Run the utilities without writes", action="store_true")
+    parser.add_argument("-json", help="File to write the results to as JSON", type=str, default=None)
+    parsed_args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = []
+    for case_count in parsed_args.cases:
+        for util in parsed_args.util:
+            result = run_benchmark(util, case_count, parsed_args.fanout, parsed_args.concurrency,
+                                   parsed_args.latency, parsed_args.throttle, parsed_args.pagesize,
+                                   parsed_args.dryrun)
+            _log.info(result)
+            results.append(result)
+
+    print("{0:<14}{1:>10}{2:>6}{3:>12}{4:>11}{5:>10}{6:>14}".format("util", "cases", "exit", "wall (s)",
+                                                                     "requests", "req/s", "peak RSS (MB)"))
+    for result in results:
+        rss = "{0:.1f}".format(result.peak_rss_kb / 1024) if result.peak_rss_kb is not None else "n/a"
+        print("{0:<14}{1:>10}{2:>6}{3:>12.2f}{4:>11}{5:>10.1f}{6:>14}".format(
+            result.util, result.case_count, result.exit_code, result.wall_time, result.request_count,
+            result.requests_per_second, rss))
+
+    if parsed_args.json is not None:
+        with open(parsed_args.json, "w") as json_file:
+            json.dump([result.to_dict() for result in results], json_file, indent=2)
+
+    return 0 if all(result.exit_code == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
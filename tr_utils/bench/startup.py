@@ -0,0 +1,85 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import argparse
+import os
+import subprocess
+import sys
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+IMPORT_BUDGET_RATIO = 10
+""" CLI import time allowed as a multiple of importing argparse alone, roughly twice the measured ratio. Comparing
+against a bare interpreter's import keeps the budget meaningful on slow or loaded machines """
+
+
+def measure_import_times(module: str = "tr_utils_cli") -> dict:
+    """
+    Imports a module in a fresh interpreter under -X importtime
+    :param module: The module to import
+    :return: Returns a dict of imported module name -> cumulative import time in microseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import {0}".format(module)], cwd=_REPO_ROOT,
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError("Importing {0} failed: {1}".format(module, result.stderr))
+
+    # Lines read: import time: self [us] | cumulative | imported package, nested imports are indented
+    imports = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            _, cumulative, name = line.split("|")
+            imports[name.strip()] = int(cumulative)
+
+    return imports
+
+
+def measure_import_ratio(module: str = "tr_utils_cli", baseline: str = "argparse", repeat: int = 3) -> float:
+    """
+    Measures the import time of a module relative to importing a baseline module in a bare interpreter
+    :param module: The module to measure
+    :param baseline: The baseline module, imported on its own
+    :param repeat: Imports measured of each, the fastest is used
+    :return: Returns the module's cumulative import time divided by the baseline's
+    """
+    repeat = max(1, int(repeat))
+    module_us = min(measure_import_times(module)[module] for _ in range(repeat))
+    baseline_us = min(measure_import_times(baseline)[baseline] for _ in range(repeat))
+
+    return module_us / max(1, baseline_us)
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Measures the import time of the TestRail utilities' CLI relative to "
+                                                 "importing argparse and checks it stays within its budget")
+    parser.add_argument("-budget", help="The CLI import time allowed as a multiple of importing argparse. Default: "
+                        "{0}".format(IMPORT_BUDGET_RATIO), type=float, default=IMPORT_BUDGET_RATIO)
+    parser.add_argument("-repeat", help="Imports measured of each, the fastest is used", type=int, default=3)
+    parsed_args = parser.parse_args(args)
+
+    ratio = measure_import_ratio("tr_utils_cli", "argparse", parsed_args.repeat)
+
+    verdict = "OVER BUDGET" if ratio > parsed_args.budget else "ok"
+    print("{0:<28}{1:>14}{2:>14}  {3}".format("tr_utils_cli import", "{0:.1f}x".format(ratio),
+                                               "{0:.1f}x".format(parsed_args.budget), verdict))
+
+    return 1 if ratio > parsed_args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
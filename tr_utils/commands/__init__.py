@@ -0,0 +1,98 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import importlib
+
+ENTRY_POINT_GROUP = "tr_utils.commands"
+
+BUILTIN_COMMANDS = {
+    "templater": ("tr_utils.commands.templater:TemplaterCommand",
+                  "Deploy the changes of template test cases to the test cases deriving from them"),
+    "templateidgen": ("tr_utils.commands.template_id_gen:TemplateIDGenCommand",
+                      "Generate unique template IDs for test cases"),
+    "pipeline": ("tr_utils.commands.pipeline:PipelineCommand",
+                 "Generate missing template IDs and run the templater over one retrieval of the suite"),
+    "templateindex": ("tr_utils.commands.template_index:TemplateIndexCommand",
+                      "Verify or rebuild the template ID index given by -templateindex"),
+    "apply": ("tr_utils.commands.apply:ApplyCommand",
+              "Write the changes of a plan created with templater -plan, skipping test cases changed since planning"),
+    "batch": ("tr_utils.commands.batch:BatchCommand",
+              "Run the templater and templateidgen jobs of a JSON or YAML batch file in one process"),
+}
+"""
+Registry of the utilities the CLI can run, command name -> (module:class, help). Other packages add utilities by
+declaring an entry point in the tr_utils.commands group naming a UtilCommand subclass, see tr_utils.commands.common.
+
+Loading a command imports only the command's own module. Entry points are only scanned when a name is not built in,
+or when every command is listed.
+"""
+
+
+def _entry_points() -> dict:
+    """
+    Scans the installed packages for tr_utils.commands entry points
+    :return: Returns a dict of command name -> entry point
+    """
+    from importlib import metadata
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        group = entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        group = entry_points.get(ENTRY_POINT_GROUP, [])
+
+    return {entry_point.name: entry_point for entry_point in group}
+
+
+def available_commands(scan_entry_points: bool = True) -> dict:
+    """
+    Lists the commands without importing them
+    :param scan_entry_points: Include the commands declared by entry points of other packages
+    :return: Returns a dict of command name -> help, built-in commands first
+    """
+    ret_val = {name: command[1] for name, command in BUILTIN_COMMANDS.items()}
+
+    if scan_entry_points is True:
+        for name in _entry_points().keys():
+            ret_val.setdefault(name, None)
+
+    return ret_val
+
+
+def load_command(name: str):
+    """
+    Imports a command
+    :param name: The command name
+    :return: Returns the UtilCommand subclass
+    :raises KeyError: If no command is registered under the name
+    :raises TypeError: If the command does not implement every abstract method of UtilCommand
+    """
+    if name in BUILTIN_COMMANDS:
+        module_name, _, class_name = BUILTIN_COMMANDS[name][0].partition(':')
+        command = getattr(importlib.import_module(module_name), class_name)
+    else:
+        entry_point = _entry_points().get(name)
+        if entry_point is None:
+            raise KeyError("No tr_utils command named {0}".format(name))
+        command = entry_point.load()
+
+    # Commands are used as classes, never instantiated, so ABC does not reject an incomplete one on its own
+    missing = sorted(getattr(command, '__abstractmethods__', ()))
+    if len(missing) > 0:
+        raise TypeError("tr_utils command {0} does not implement {1}".format(name, ", ".join(missing)))
+
+    return command
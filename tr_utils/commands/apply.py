@@ -0,0 +1,48 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_change_plan import ChangePlanApplier
+
+
+class ApplyCommand(common.UtilCommand):
+
+    util = ChangePlanApplier
+
+    # The project and suite come from the plan
+    requires_project = False
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        util_parser.add_argument("-plan", help="The change plan file to apply", required=True, type=str)
+
+    @staticmethod
+    def execute_util(apply_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        dry_run = common.is_dry_run(apply_params)
+
+        write_journal = common.open_write_journal(apply_params, dry_run, {"util": "apply", "plan": apply_params.plan})
+
+        applier = ApplyCommand.util(tr_instance, apply_params.plan, write_journal=write_journal)
+
+        try:
+            return applier.execute_apply(dry_run)
+        finally:
+            if write_journal is not None:
+                write_journal.close()
@@ -0,0 +1,80 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+import logging
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_batch_runner import BatchRunner, format_report, load_batch_file, write_report
+
+_log = logging.getLogger(__name__)
+
+
+class BatchCommand(common.UtilCommand):
+
+    # Every job names its own project
+    requires_project = False
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        util_parser.add_argument("-jobfile", "-jf", help="The JSON or YAML batch file", required=True, type=str)
+        util_parser.add_argument("-parallel", "-p", help="The maximum number of project / suite groups to run at once. "
+                                                         "Defaults to the batch file's max_parallel_suites setting, "
+                                                         "or 4", required=False, type=int, default=None)
+        util_parser.add_argument("-report", help="File to write the per job results to as JSON", required=False,
+                                 type=str, default=None)
+
+    @staticmethod
+    def prepare(batch_params: argparse.Namespace):
+        """
+        Loads the batch file and resolves the parallelism, ahead of creating the TestRailInterface
+        :return: Returns None to continue, or 1 if the batch file failed to load
+        """
+        try:
+            batch_params.batch_data = load_batch_file(batch_params.jobfile)
+        except Exception as e:
+            _log.error("Failed to load batch file {0}: {1}. Exiting.".format(batch_params.jobfile, e))
+            return 1
+
+        if batch_params.parallel is None:
+            batch_params.parallel = int(batch_params.batch_data['settings'].get('max_parallel_suites', 4))
+
+        # Every group of the batch reads and writes with the full concurrency, size the request limit and the pool for
+        # all of them so the groups run alongside each other
+        group_requests = (max(1, batch_params.concurrency) + 1) * max(1, batch_params.parallel)
+        if batch_params.requestconcurrency is None:
+            batch_params.requestconcurrency = group_requests
+        if batch_params.poolsize is None:
+            batch_params.poolsize = group_requests
+
+        return None
+
+    @staticmethod
+    def execute_util(batch_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        batch_data = batch_params.batch_data
+        dry_run = batch_data['settings'].get('dry_run', False)
+        if 'dryrun' in batch_params and batch_params.dryrun is not None:
+            dry_run = batch_params.dryrun.lower() == "true"
+
+        results = BatchRunner(tr_instance, batch_data['jobs'], batch_params.parallel, dry_run).run()
+        _log.info("Batch results:\n{0}".format(format_report(results)))
+
+        if batch_params.report is not None:
+            write_report(results, batch_params.report)
+
+        return max([result.exit_code for result in results] + [0])
@@ -0,0 +1,122 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import abc
+import argparse
+import logging
+
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_write_journal import WriteJournal
+
+_log = logging.getLogger(__name__)
+
+
+class UtilCommand(abc.ABC):
+    """
+    Base of the CLI command of a utility. A command declares the utility's arguments and runs it against the
+    TestRailInterface the CLI creates from the common arguments.
+
+    Commands are registered by name in tr_utils.commands, or by other packages under the tr_utils.commands entry point
+    group. A command's module is only imported when the command is selected, keep heavy imports out of the others.
+    """
+
+    requires_project = True
+    """ Whether the command needs the common -trprojid argument """
+
+    @staticmethod
+    @abc.abstractmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        """
+        Defines the parameters for use with the utility
+        :param util_parser: The argument parser of the command
+        :return:
+        """
+        return
+
+    @staticmethod
+    def prepare(util_params: argparse.Namespace):
+        """
+        Runs ahead of creating the TestRailInterface, for example to adjust the connection pool to the work loaded
+        :param util_params: The parsed arguments
+        :return: Returns None to continue, or the exit code to stop with
+        """
+        return None
+
+    @staticmethod
+    @abc.abstractmethod
+    def execute_util(util_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        """
+        Runs the utility
+        :param util_params: The parsed arguments
+        :param tr_instance: The TestRailInterface
+        :return: Returns the exit code
+        """
+        return 1
+
+
+def is_dry_run(util_params: argparse.Namespace) -> bool:
+    return 'dryrun' in util_params and util_params.dryrun is not None and util_params.dryrun.lower() == "true"
+
+
+def add_secs_or_caseids(sub_parser: argparse.ArgumentParser, reqd: bool = True):
+    arg_group = sub_parser.add_mutually_exclusive_group(required=reqd)
+    arg_group.add_argument("-secids", "-s", help="Section IDs in CSV format to template children test cases from",
+                           type=str, default=None)
+    arg_group.add_argument("-tcids", "-i", help="TestCase IDs in CSV format to template from", type=str,
+                           default=None)
+
+
+def _deprecated_inc_children(value: str) -> bool:
+    """
+    Parses the deprecated -incchildren value into the -nochildren setting
+    :param value: true or false
+    :return: Returns True if children sections are to be excluded
+    """
+    if value.lower() not in ("true", "false"):
+        raise argparse.ArgumentTypeError("expected true or false, got {0}".format(value))
+
+    _log.warning("-incchildren is deprecated, children sections are included unless -nochildren is given")
+    return value.lower() == "false"
+
+
+def add_no_children_secs(sub_parser: argparse.ArgumentParser):
+    sub_parser.add_argument("-nochildren", "-nc", help="Only use the given sections when selecting by section id, "
+                                                       "without their children sections",
+                            action="store_true", default=False)
+    sub_parser.add_argument("-incchildren", "-c", help="Deprecated, use -nochildren. -incchildren false is the same "
+                                                       "as -nochildren", dest="nochildren", metavar="{true,false}",
+                            type=_deprecated_inc_children)
+
+
+def add_template_id_field_name(sub_parser: argparse.ArgumentParser, reqd: bool = False, default: bool = None):
+    sub_parser.add_argument("-tfname", "-tn", help="Template ID field name", required=reqd, type=str,
+                            default=default)
+
+
+def open_write_journal(util_params: argparse.Namespace, dry_run: bool, job: dict):
+    """
+    Opens the write journal given by -journal, or resumes the one given by -resume
+    :return: Returns the WriteJournal, or None if no journal was requested or on a dry run
+    """
+    journal_path = util_params.resume if util_params.resume is not None else util_params.journal
+    if journal_path is None:
+        return None
+    if dry_run is True:
+        _log.info("Dry run, not writing to journal {0}".format(journal_path))
+        return None
+
+    return WriteJournal(journal_path, job, resume=util_params.resume is not None)
@@ -0,0 +1,70 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_pipeline import TemplatePipeline
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+
+class PipelineCommand(common.UtilCommand):
+
+    util = TemplatePipeline
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        """
+        Defines the parameters for use with the pipeline utility
+
+        :param util_parser: The argument parser of the pipeline command
+        :return:
+        """
+        # add the section Ids or case Ids choice. The pipeline always includes the child sections of section IDs
+        common.add_secs_or_caseids(util_parser)
+
+        #add template ID field arg
+        common.add_template_id_field_name(util_parser, reqd=True)
+
+        util_parser.add_argument("-fields", "-f", help="Field names in CSV format to template", required=True)
+
+        util_parser.add_argument("-markeroverride", "-mo", help="End of template marker override. Default value is: "
+                                 "{0}".format(TestRailTemplater.get_default_end_marker()),
+                                 required=False, type=str, default=None)
+        return
+
+    @staticmethod
+    def execute_util(pipeline_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        dry_run = common.is_dry_run(pipeline_params)
+
+        write_journal = common.open_write_journal(pipeline_params, dry_run, {
+            "util": "pipeline", "project_id": pipeline_params.trprojid, "suite_id": pipeline_params.trsuiteid,
+            "template_id_field": pipeline_params.tfname, "fields": pipeline_params.fields,
+            "section_ids": pipeline_params.secids, "case_ids": pipeline_params.tcids})
+
+        pipeline = PipelineCommand.util(tr_instance, pipeline_params.trprojid, pipeline_params.tfname,
+                                        pipeline_params.fields, pipeline_params.secids, pipeline_params.tcids,
+                                        tr_suite_id=pipeline_params.trsuiteid,
+                                        end_marker_override=pipeline_params.markeroverride,
+                                        write_journal=write_journal)
+
+        try:
+            return pipeline.execute_pipeline(dry_run)
+        finally:
+            if write_journal is not None:
+                write_journal.close()
@@ -0,0 +1,62 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
+
+
+class TemplateIDGenCommand(common.UtilCommand):
+
+    util = TemplateIDGen
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        # add the section Ids or case Ids choice
+        common.add_secs_or_caseids(util_parser)
+
+        # add option to exclude section children
+        common.add_no_children_secs(util_parser)
+
+        #add template ID field arg
+        common.add_template_id_field_name(util_parser)
+
+        util_parser.add_argument("-overwrite", "-ow", help="Overwrite data found in the TemplateID field. Defaults to "
+                                                           "True", type=bool, required=False, default=True)
+
+    @staticmethod
+    def execute_util(template_id_gen_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        dry_run = common.is_dry_run(template_id_gen_params)
+
+        write_journal = common.open_write_journal(template_id_gen_params, dry_run, {
+            "util": "templateidgen", "project_id": template_id_gen_params.trprojid,
+            "suite_id": template_id_gen_params.trsuiteid, "template_id_field": template_id_gen_params.tfname,
+            "section_ids": template_id_gen_params.secids, "case_ids": template_id_gen_params.tcids})
+
+        template_id_gen = TemplateIDGenCommand.util(tr_instance, template_id_gen_params.tfname,
+                                                    template_id_gen_params.trprojid, template_id_gen_params.trsuiteid,
+                                                    template_id_gen_params.secids, template_id_gen_params.tcids,
+                                                    get_all_child_sections=not template_id_gen_params.nochildren,
+                                                    write_journal=write_journal)
+
+        try:
+            return template_id_gen.execute_id_gen(dry_run)
+        finally:
+            if write_journal is not None:
+                write_journal.close()
@@ -0,0 +1,68 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+import logging
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+
+_log = logging.getLogger(__name__)
+
+
+class TemplateIndexCommand(common.UtilCommand):
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        #add template ID field arg
+        common.add_template_id_field_name(util_parser, reqd=True)
+
+        util_parser.add_argument("-rebuild", "-rb", help="Rebuild the index from the suite instead of verifying it",
+                                 action="store_true", default=False)
+
+    @staticmethod
+    def execute_util(index_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        template_index = tr_instance.template_index
+        if template_index is None:
+            _log.error("The templateindex utility requires the -templateindex parameter. Exiting.")
+            return 1
+
+        tr_proj_id = int(index_params.trprojid)
+        tr_suite_id = index_params.trsuiteid
+        tr_suite_id = tr_instance.suites_get_default_suite(tr_proj_id) if tr_suite_id is None else int(tr_suite_id)
+        # A failed page must not pass for the end of the suite, a truncated suite would be indexed as complete
+        test_case_data = tr_instance.iter_testcase_data(tr_proj_id, tr_suite_id, prefetch=True, raise_errors=True)
+
+        try:
+            if index_params.rebuild is True:
+                template_index.rebuild(tr_proj_id, tr_suite_id, index_params.tfname, test_case_data)
+                return 0
+
+            report = template_index.verify(tr_proj_id, tr_suite_id, index_params.tfname, test_case_data)
+        except Exception as e:
+            _log.exception("Failed to retrieve the test cases of suite ID {0}, the template index was left unchanged. "
+                           "Exception: {1}".format(tr_suite_id, e))
+            return 1
+
+        if report.has_drift is True:
+            _log.error("Template index drift detected: {0} missing, {1} stale and {2} mismatched test cases. "
+                       "Run with -rebuild to correct the index.".format(len(report.missing), len(report.stale),
+                                                                      len(report.mismatched)))
+            return 5
+
+        _log.info("Template index is in sync with the suite.")
+        return 0
@@ -0,0 +1,89 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import argparse
+
+from tr_utils.commands import common
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+
+class TemplaterCommand(common.UtilCommand):
+
+    util = TestRailTemplater
+
+    @staticmethod
+    def setup_args(util_parser: argparse.ArgumentParser):
+        """
+        Defines the parameters for use with the templater utility
+
+        :param util_parser: The argument parser of the templater command
+        :return:
+        """
+        # add the section Ids or case Ids choice
+        common.add_secs_or_caseids(util_parser)
+
+        # add option to exclude section children
+        common.add_no_children_secs(util_parser)
+
+        #add template ID field arg
+        common.add_template_id_field_name(util_parser)
+
+        util_parser.add_argument("-fields", "-f", help="Field names in CSV format to template", required=True)
+
+        util_parser.add_argument("-markeroverride", "-mo", help="End of template marker override. Default value is: "
+                                 "{0}".format(TemplaterCommand.util.get_default_end_marker()),
+                                 required=False, type=str, default=None)
+
+        util_parser.add_argument("-sectionfetch", "-sf", help="Retrieve template cases with a filtered request per "
+                                 "section instead of scanning the whole suite. Derived cases are found through the "
+                                 "template index when one is given", action="store_true", default=False)
+
+        util_parser.add_argument("-plan", help="Write the changes to this change plan file instead of TestRail, to be "
+                                               "written later with the apply utility",
+                                 required=False, type=str, default=None)
+
+        util_parser.add_argument("-diffworkers", "-dw", help="Diff the test cases in this many worker processes, "
+                                 "sharded by template ID. Worth it for large suites with long steps",
+                                 required=False, type=int, default=None)
+        return
+
+    @staticmethod
+    def execute_util(templater_params: argparse.Namespace, tr_instance: TestRailInterface) -> int:
+        dry_run = common.is_dry_run(templater_params)
+
+        # Planning writes nothing to TestRail, there is nothing to journal
+        write_journal = None
+        if templater_params.plan is None:
+            write_journal = common.open_write_journal(templater_params, dry_run, {
+                "util": "templater", "project_id": templater_params.trprojid, "suite_id": templater_params.trsuiteid,
+                "template_id_field": templater_params.tfname, "fields": templater_params.fields,
+                "section_ids": templater_params.secids, "case_ids": templater_params.tcids})
+
+        templater = TemplaterCommand.util(tr_instance, templater_params.trprojid, templater_params.tfname,
+                                          templater_params.fields, templater_params.secids, templater_params.tcids,
+                                          tr_suite_id=templater_params.trsuiteid,
+                                          end_marker_override=templater_params.markeroverride,
+                                          get_all_child_sections=not templater_params.nochildren,
+                                          fetch_templates_by_section=templater_params.sectionfetch,
+                                          write_journal=write_journal, diff_workers=templater_params.diffworkers)
+
+        try:
+            return templater.execute_templater(dry_run, plan_path=templater_params.plan)
+        finally:
+            if write_journal is not None:
+                write_journal.close()
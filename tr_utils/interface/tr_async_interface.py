@@ -0,0 +1,433 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import asyncio
+import logging
+import os
+import weakref
+from urllib.parse import urlencode
+
+from tr_utils.interface.tr_rate_control import parse_retry_after
+from tr_utils.interface.tr_section_tree import SectionTree
+from tr_utils.interface.tr_template_index import TemplateIndex
+from tr_utils.interface.tr_write_executor import WriteResult
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncTestRailError(Exception):
+    """
+    Raised when the TestRail server returns an error status for an async request
+    """
+
+    def __init__(self, status: int, endpoint: str, body):
+        self.status = status
+        self.endpoint = endpoint
+        self.body = body
+        super().__init__("TestRail returned status {0} for {1}: {2}".format(status, endpoint, body))
+
+
+class AsyncHttpTransport:
+    """
+    Async HTTP transport built on httpx, an optional dependency installed with the async extra.
+
+    Bounds the number of requests in flight with a semaphore and keeps as many keep-alive connections pooled. As with
+    TestRailInterface's session, responses are requested compressed, redirects are followed and proxies are read
+    from the HTTP_PROXY, HTTPS_PROXY and NO_PROXY environment variables. A request failing on a dropped connection
+    is retried once, for idempotent requests only, since the server may already have processed a write.
+
+    The semaphore and the httpx client are bound to the event loop they are used on, so each running loop gets its
+    own, created on first use. One transport can be used across several asyncio.run calls.
+    """
+
+    _RATE_LIMIT_STATUS = 429
+    _USER_AGENT = "tr_utils async"
+    _IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, base_url: str, tr_user: str, tr_pass: str, max_in_flight: int = 32, timeout: float = 30,
+                 rate_limit_retries: int = 3):
+        """
+        :param base_url: The TestRail web URL. Provide http or https
+        :param tr_user: The tr user account
+        :param tr_pass: The tr user password or API key
+        :param max_in_flight: The maximum number of requests in flight at once
+        :param timeout: Timeout in seconds for connecting, and for each read or write of a request
+        :param rate_limit_retries: How many times a rate limited (429) request is retried after its Retry-After delay
+        """
+        if httpx is None:
+            raise ImportError("The async TestRail interface requires httpx, install it or the async extra")
+
+        self._api_url = "{0}/index.php?/api/v2/".format(base_url.rstrip('/'))
+        self._auth = (tr_user, tr_pass)
+        self._timeout = timeout
+        self._rate_limit_retries = rate_limit_retries
+        self._max_in_flight = max(1, int(max_in_flight))
+        self._loop_states = weakref.WeakKeyDictionary()
+
+        return
+
+    async def request(self, method: str, endpoint: str, params: dict = None, json_body: dict = None):
+        """
+        Sends an API request and decodes the JSON response
+        :param method: GET or POST
+        :param endpoint: The API endpoint, for example 'get_cases/1'
+        :param params: Optional query parameters
+        :param json_body: Optional JSON body for POST requests
+        :return: Returns a tuple of (status code, decoded response)
+        """
+        # TestRail routes on the query string, the parameters are appended to it rather than sent as a query
+        url = self._api_url + endpoint
+        if params is not None and len(params) > 0:
+            url = "{0}&{1}".format(url, urlencode(params))
+
+        semaphore, client = self._loop_state()
+        async with semaphore:
+            for attempt in range(0, self._rate_limit_retries + 1):
+                response = await self._send(client, method, url, json_body)
+
+                if response.status_code == self._RATE_LIMIT_STATUS and attempt < self._rate_limit_retries:
+                    delay = parse_retry_after(response.headers.get('retry-after'), 1.0)
+                    self._log.warning("Rate limited by TestRail on {0}, retrying in {1}s".format(endpoint, delay))
+                    await asyncio.sleep(delay)
+                    continue
+
+                break
+
+        try:
+            decoded = response.json() if len(response.content) > 0 else None
+        except ValueError:
+            decoded = response.text
+
+        return response.status_code, decoded
+
+    async def close(self):
+        """
+        Closes the connections of every event loop the transport was used on. The connections of loops already
+        closed by earlier asyncio.run calls can no longer be closed from their loop and are released with the client
+        :return:
+        """
+        running_loop = asyncio.get_running_loop()
+        loop_states = list(self._loop_states.items())
+        self._loop_states.clear()
+
+        for loop, (semaphore, client) in loop_states:
+            try:
+                if loop is running_loop:
+                    await client.aclose()
+                elif loop.is_closed() is False:
+                    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            except (RuntimeError, OSError) as e:
+                # The loop closed meanwhile or the server already dropped the connection
+                self._log.debug("Failed to close pooled connections. Exception: {0}".format(e))
+
+        return
+
+    def _loop_state(self) -> tuple:
+        """
+        Gets the in-flight semaphore and httpx client of the running event loop, creating them on first use
+        :return: Returns a tuple of (semaphore, httpx.AsyncClient)
+        """
+        loop = asyncio.get_running_loop()
+        state = self._loop_states.get(loop)
+        if state is None:
+            limits = httpx.Limits(max_connections=self._max_in_flight,
+                                  max_keepalive_connections=self._max_in_flight)
+            client = httpx.AsyncClient(auth=self._auth, timeout=self._timeout, limits=limits, follow_redirects=True,
+                                       trust_env=True, headers={"User-Agent": self._USER_AGENT,
+                                                                "Accept": "application/json"})
+            state = (asyncio.Semaphore(self._max_in_flight), client)
+            self._loop_states[loop] = state
+
+        return state
+
+    async def _send(self, client, method: str, url: str, json_body: dict):
+        """
+        Sends a request, retrying an idempotent request once if its connection was dropped
+        :return: Returns the httpx.Response
+        """
+        try:
+            return await client.request(method, url, json=json_body)
+        except (httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            if method not in self._IDEMPOTENT_METHODS:
+                raise
+            self._log.debug("Connection dropped sending {0} {1}, retrying. Exception: {2}".format(method, url, e))
+
+        return await client.request(method, url, json=json_body)
+
+
+class AsyncTestRailInterface:
+    """
+    asyncio counterpart of TestRailInterface. Provides the same data helpers as coroutines so many requests can be
+    kept in flight from a single process. See TestRailTemplater.execute_templater_async and
+    TemplateIDGen.execute_id_gen_async.
+    """
+
+    _ENV_URL_PARAM_NAME = "TR_URL"
+    _ENV_USER_PARAM_NAME = "TR_USER"
+    _ENV_PASS_PARAM_NAME = "TR_PASS"
+
+    _logger = logging.getLogger(__name__)
+    _initialized = False
+    _transport = None
+
+    @property
+    def transport(self) -> AsyncHttpTransport:
+        """
+        Property method for returning the async HTTP transport
+        :return: An instance of AsyncHttpTransport, or None if the interface hasn't been initialized
+        """
+        return self._transport
+
+    @property
+    def template_index(self) -> TemplateIndex:
+        """
+        Property for the persistent template ID index
+        :return: The TemplateIndex, or None if the interface was created without a template_index_path
+        """
+        return self._template_index
+
+    @property
+    def is_initialized(self) -> bool:
+        """
+        Property to determine if the interface has been initialized
+        :return: A bool indicating initialization status
+        """
+        return self._initialized
+
+    def __init__(self, tr_url=None, tr_user=None, tr_pass=None, max_in_flight: int = 32, timeout: float = 30,
+                 template_index_path: str = None):
+        """
+        Initializes the AsyncTestRailInterface. Parameters which are not provided are read from the same environment
+        variables as TestRailInterface.
+
+        :param tr_url: The TestRail web URL to sign into. No trailing '/' needed. Provide http or https
+        :param tr_user: The tr user account ot sign into
+        :param tr_pass: The tr user password or API key
+        :param max_in_flight: The maximum number of requests in flight at once
+        :param timeout: Timeout in seconds for a single request
+        :param template_index_path: Optional path of the SQLite template ID index, kept current as cases are written
+        """
+        self._template_index = TemplateIndex(template_index_path) if template_index_path is not None else None
+
+        tr_url = os.getenv(self._ENV_URL_PARAM_NAME) if tr_url is None else tr_url
+        tr_user = os.getenv(self._ENV_USER_PARAM_NAME) if tr_user is None else tr_user
+        tr_pass = os.getenv(self._ENV_PASS_PARAM_NAME) if tr_pass is None else tr_pass
+
+        if tr_url is None or tr_user is None or tr_pass is None:
+            self._logger.error("Failed to obtain parameters to initialize the async TestRail interface. Please check "
+                               "the parameters and try again!")
+        elif httpx is None:
+            self._logger.error("The async TestRail interface requires httpx. Install it, or the async extra, and "
+                               "try again!")
+        else:
+            self._transport = AsyncHttpTransport(tr_url, tr_user, tr_pass, max_in_flight, timeout)
+            self._initialized = True
+
+        return
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the underlying connections
+        :return:
+        """
+        if self._transport is not None:
+            await self._transport.close()
+
+        return
+
+    def case_data_have_error(self, case_data: dict) -> str:
+        """
+        Checks if a test case data dict has an error and returns the error statement
+        :param case_data: The Test Case data dict
+        :return: Returns the error message, if applicable, or an empty string if no error found
+        """
+        if 'error' in case_data:
+            return case_data['error']
+        else:
+            return ""
+
+    async def _get(self, endpoint: str, params: dict = None):
+        status, data = await self._transport.request("GET", endpoint, params)
+        if status >= 400:
+            raise AsyncTestRailError(status, endpoint, data)
+
+        return data
+
+    async def _get_all_pages(self, endpoint: str, collection_name: str, params: dict):
+        """
+        Retrieves every page of a list endpoint. Older servers return a plain list while newer servers return a page
+        dict with the items under collection_name and a _links.next entry.
+        """
+        ret_val = []
+        params = dict(params)
+
+        while True:
+            data = await self._get(endpoint, params)
+            if isinstance(data, list):
+                ret_val.extend(data)
+                break
+
+            items = data.get(collection_name, [])
+            ret_val.extend(items)
+
+            if data.get('_links', {}).get('next') is None or len(items) == 0:
+                break
+
+            params['offset'] = data.get('offset', params.get('offset', 0)) + len(items)
+
+        return ret_val
+
+    # region Section Helpers
+
+    def build_section_tree(self, sections_data: list) -> SectionTree:
+        """
+        Builds an indexed SectionTree from raw sections data
+        :param sections_data: The raw sections data, see retrieve_sections_data
+        :return: Returns a SectionTree instance
+        """
+        return SectionTree(sections_data)
+
+    def get_child_sections(self, template_section_ids: list, sections_data) -> list:
+        """
+        Gets the provided section IDs along with all of their descendant section IDs
+        :param template_section_ids: The root section IDs to expand
+        :param sections_data: Either the raw sections data list or a previously built SectionTree
+        :return: Returns a list of section IDs
+        """
+        if isinstance(sections_data, SectionTree) is False:
+            sections_data = self.build_section_tree(sections_data)
+
+        return sections_data.expand(template_section_ids)
+
+    async def retrieve_sections_data(self, project_id: int, suite_id: int) -> list:
+        """
+        Retrieves the raw sections data for the project and suite IDs provided
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :return: Returns a list containing section data, or an empty list on failure
+        """
+        try:
+            sections = await self._get_all_pages("get_sections/{0}".format(project_id), "sections",
+                                                 {"suite_id": suite_id})
+
+        except Exception as e:
+            self._logger.exception("Exception caught when retrieving sections data! Exception: {0}".format(e))
+            sections = []
+
+        return sections
+
+    # endregion Section Helpers
+
+    # region Suite Helpers
+
+    async def suites_get_default_suite(self, tr_proj_id: int) -> int:
+        """
+        Get the default suite ID for a TestRail project.
+        :param tr_proj_id: The TestRail project ID
+        :return: Returns the suite ID, or -1 on failure
+        """
+        ret_val = -1
+
+        try:
+            suites = await self._get("get_suites/{0}".format(tr_proj_id))
+            if isinstance(suites, dict) and 'suites' in suites:
+                suites = suites['suites']
+
+            if 'error' in suites or len(suites) == 0 or 'id' not in suites[0]:
+                self._logger.error("Error encountered when attempting to identify default suite ID for project ID {0}. "
+                                   "Error: {1}".format(tr_proj_id, suites))
+            else:
+                ret_val = suites[0]['id']
+        except Exception as e:
+            self._logger.exception("Exception encountered when attempting to retrieving default suite ID for project "
+                                   "ID: {0}. Exception: {1}".format(tr_proj_id, e))
+
+        return ret_val
+
+    # endregion Suite Helpers
+
+    # region Test Case Helpers
+
+    async def retrieve_testcase_data(self, project_id: int, suite_id: int) -> list:
+        """
+        Retrieves the raw test case data for the project and test case suite IDs provided
+        :return: Returns list containing TestCase data, or an empty list on failure
+        """
+        try:
+            test_case_data = await self._get_all_pages("get_cases/{0}".format(project_id), "cases",
+                                                       {"suite_id": suite_id})
+
+        except Exception as e:
+            test_case_data = []
+            self._logger.exception("Exception caught when retrieving test case data from TestRail Server!"
+                                   "Exception: {0}".format(e))
+
+        return test_case_data
+
+    async def update_case(self, case_id: int, case_data: dict) -> dict:
+        """
+        Writes test case data to the TestRail server
+        :param case_id: The ID of the test case to update
+        :param case_data: The test case field data to write
+        :return: Returns the TestRail response data. Error responses are returned as a dict with an 'error' key
+        """
+        status, data = await self._transport.request("POST", "update_case/{0}".format(case_id), json_body=case_data)
+
+        if status >= 400 and (isinstance(data, dict) is False or 'error' not in data):
+            data = {'error': "Status code {0}: {1}".format(status, data)}
+
+        return data
+
+    async def update_cases(self, updates: list) -> list:
+        """
+        Writes multiple test cases concurrently, bounded by the transport's in-flight limit
+        :param updates: A list of (case_id, case data dict) tuples
+        :return: Returns a list of WriteResult, in the order of the updates
+        """
+        results = await asyncio.gather(*[self._write(case_id, payload) for case_id, payload in updates])
+
+        for result in results:
+            if result.success is False:
+                self._logger.error("Failed to update test case ID: {0}. Error: {1}"
+                                   .format(result.case_id, result.error))
+
+        return list(results)
+
+    async def _write(self, case_id: int, payload: dict) -> WriteResult:
+        try:
+            response = await self.update_case(case_id, payload)
+        except Exception as e:
+            return WriteResult(case_id, False, str(e))
+
+        if isinstance(response, dict) and 'error' in response:
+            return WriteResult(case_id, False, str(response['error']), response)
+
+        return WriteResult(case_id, True, response=response)
+
+    # endregion Test Case Helpers
@@ -0,0 +1,147 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import threading
+
+
+class CaseRecord:
+    """
+    Compact test case record holding only the projected fields of a test case in __slots__. Records support the
+    subset of the dict interface the utilities use on test case data, so they can stand in for the raw case dicts.
+
+    Fields missing from the raw test case are left unset, reading one raises KeyError as a dict would.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, case: dict):
+        for field in self.__slots__:
+            if field in case:
+                object.__setattr__(self, field, case[field])
+
+    def __getitem__(self, field: str):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __setitem__(self, field: str, value):
+        if field not in self.__slots__:
+            raise KeyError("{0} is not a projected field of this test case record".format(field))
+        object.__setattr__(self, field, value)
+
+    def __contains__(self, field) -> bool:
+        return field in self.__slots__ and hasattr(self, field)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CaseRecord, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, self.to_dict())
+
+    def get(self, field: str, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def update(self, values: dict):
+        for field, value in values.items():
+            self[field] = value
+
+    def keys(self) -> list:
+        return [field for field in self.__slots__ if hasattr(self, field)]
+
+    def items(self) -> list:
+        return [(field, getattr(self, field)) for field in self.keys()]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+
+class CaseProjection:
+    """
+    Projects raw test case dicts into CaseRecords holding only the given fields, dropping every other field as soon
+    as a test case is decoded. The test case 'id' is always projected.
+
+    Test case writes send only the changed fields, see TestRailTemplater, so no record needs its full test case data
+    retrieved again.
+    """
+
+    _record_types = {}
+    _record_types_lock = threading.Lock()
+
+    def __init__(self, fields: list):
+        """
+        :param fields: The field names to keep, for example ['section_id', 'custom_tr_template_id']
+        :raises ValueError: If a field name cannot be used as a record slot
+        """
+        self._fields = tuple(dict.fromkeys(['id'] + list(fields)))
+        self._record_type = CaseProjection._get_record_type(self._fields)
+
+        return
+
+    @property
+    def fields(self) -> tuple:
+        return self._fields
+
+    def project(self, case: dict) -> CaseRecord:
+        """
+        Projects a single test case
+        :param case: The raw test case dict
+        :return: Returns the CaseRecord
+        """
+        return self._record_type(case)
+
+    def project_all(self, cases):
+        """
+        Projects every test case of an iterable, lazily
+        :param cases: An iterable of raw test case dicts
+        :return: Returns a generator of CaseRecords
+        """
+        record_type = self._record_type
+        for case in cases:
+            yield record_type(case)
+
+    @staticmethod
+    def _get_record_type(fields: tuple) -> type:
+        """
+        Gets the CaseRecord subclass with a slot per field, shared by every projection of the same fields
+        :param fields: The field names
+        :return: Returns the record type
+        """
+        with CaseProjection._record_types_lock:
+            record_type = CaseProjection._record_types.get(fields)
+            if record_type is None:
+                for field in fields:
+                    if field.isidentifier() is False or field.startswith('_') or hasattr(CaseRecord, field):
+                        raise ValueError("Test case field name {0} cannot be projected".format(field))
+
+                record_type = type("CaseRecord", (CaseRecord,), {"__slots__": fields})
+                CaseProjection._record_types[fields] = record_type
+
+        return record_type
@@ -16,11 +16,24 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 #########################################################
 
+import contextlib
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from testrail_api import TestRailAPI
 
+from tr_utils.interface.tr_case_projection import CaseProjection, CaseRecord
+from tr_utils.interface.tr_metrics import ApiCallHook, MetricsCollector, reset_phase, set_phase, submit_in_phase
+from tr_utils.interface.tr_rate_control import RateController
+from tr_utils.interface.tr_read_memo import ReadMemo
+from tr_utils.interface.tr_section_tree import SectionTree
+from tr_utils.interface.tr_session import TestRailSession
+from tr_utils.interface.tr_snapshot import SuiteSnapshot
+from tr_utils.interface.tr_stream_decoder import StreamedPage, open_streamed_page
+from tr_utils.interface.tr_template_index import TemplateIndex
+from tr_utils.interface.tr_write_executor import WriteExecutor
+
 
 class TestRailInterface:
     """
@@ -31,6 +44,11 @@ class TestRailInterface:
     _ENV_USER_PARAM_NAME = "TR_USER"
     _ENV_PASS_PARAM_NAME = "TR_PASS"
 
+    _DEFAULT_PAGE_SIZE = 250
+    """
+    The page size requested from servers supporting pagination (TestRail 6.7 or later)
+    """
+
     _logger = logging.getLogger(__name__)
     _initialized = False
     _api = None
@@ -56,7 +74,51 @@ class TestRailInterface:
         """
         return self._initialized
 
-    def __init__(self, tr_url=None, tr_user=None, tr_pass=None, skip_login=False):
+    @property
+    def write_concurrency(self) -> int:
+        """
+        Property for the maximum number of concurrent test case writes
+        :return: The write concurrency
+        """
+        return self._write_executor.max_workers
+
+    @property
+    def template_index(self) -> TemplateIndex:
+        """
+        Property for the persistent template ID index
+        :return: The TemplateIndex, or None if the interface was created without a template_index_path
+        """
+        return self._template_index
+
+    @property
+    def rate_controller(self) -> RateController:
+        """
+        Property for the rate controller every TestRail API request is sent under. Exposes the current request rate
+        and the throttling and retry counters, see RateController.stats
+        :return: The RateController
+        """
+        return self._rate_controller
+
+    @property
+    def metrics(self) -> MetricsCollector:
+        """
+        Property for the built in API call metrics, aggregated per endpoint and per phase. See MetricsCollector
+        :return: The MetricsCollector
+        """
+        return self._metrics
+
+    @property
+    def read_memo(self) -> ReadMemo:
+        """
+        Property for the memo of read responses, see the read_memo ctor parameter
+        :return: The ReadMemo, or None when disabled
+        """
+        return self._read_memo
+
+    def __init__(self, tr_url=None, tr_user=None, tr_pass=None, skip_login=False, write_concurrency: int = 1,
+                 snapshot_dir: str = None, template_index_path: str = None, rate_limit: float = None,
+                 pool_size: int = None, connect_timeout: float = 10, read_timeout: float = 60,
+                 stream_decode: bool = False, read_memo: bool = True, request_concurrency: int = None):
         """
         Initializes the TestRailInterface. If parameters are no provided the class utilizies os.getenv to
         attempt to retrieve the parameter data from environment variables.
@@ -66,8 +128,38 @@ class TestRailInterface:
         :param tr_url: The TestRail web URL to sign into. No trailing '/' needed. Provide http or https
         :param tr_user: The tr user account ot sign into
         :param tr_pass: The tr user password or API key
+        :param write_concurrency: The maximum number of test case writes to have in flight at once
+        :param snapshot_dir: Optional directory to keep incrementally refreshed suite snapshots in. When set, suite
+        wide test case data is served from the snapshots. See SuiteSnapshot
+        :param template_index_path: Optional path of the SQLite template ID index. See TemplateIndex
+        :param rate_limit: Optional maximum number of API requests per second
+        :param pool_size: The number of kept-alive connections to pool. Defaults to write_concurrency plus one for
+        page prefetching
+        :param connect_timeout: Seconds to wait for a connection to the TestRail server
+        :param read_timeout: Seconds to wait for the TestRail server to send a response
+        :param stream_decode: Decode test case pages incrementally while they are read, instead of buffering and
+        decoding each page whole. See StreamedPage
+        :param read_memo: Memoize read responses for the lifetime of the interface, coalescing identical concurrent
+        reads. Test case writes made through the interface invalidate the affected reads. See ReadMemo
+        :param request_concurrency: The maximum number of API requests in flight, across every thread using the
+        interface. Defaults to write_concurrency. Raise it when several utilities share the interface at once
         """
 
+        self._write_executor = WriteExecutor(self.update_case, write_concurrency)
+        request_concurrency = write_concurrency if request_concurrency is None else request_concurrency
+        self._rate_controller = RateController(request_concurrency, rate_limit)
+        self._snapshot_dir = snapshot_dir
+        self._snapshots = {}
+        self._stream_decode = stream_decode
+        self._read_memo = ReadMemo() if read_memo is True else None
+        self._template_index = TemplateIndex(template_index_path) if template_index_path is not None else None
+        self._session = None
+        self._api_url = None
+        self._timeout = (connect_timeout, read_timeout)
+        self._metrics = MetricsCollector()
+        self._call_hooks = [self._metrics]
+        self._phase_listeners = []
+
         tr_url = os.getenv(self._ENV_URL_PARAM_NAME) if tr_url is None else tr_url
         tr_user = os.getenv(self._ENV_USER_PARAM_NAME) if tr_user is None else tr_user
         tr_pass = os.getenv(self._ENV_PASS_PARAM_NAME) if tr_pass is None else tr_pass
@@ -80,7 +172,11 @@ class TestRailInterface:
             self._logger.error("Failed to obtain parameters to initialize TestRail API instance. Please check "
                                "the parameters and try again!")
         else:
-            self._api = TestRailAPI(tr_url, tr_user, tr_pass)
+            pool_size = max(1, write_concurrency) + 1 if pool_size is None else pool_size
+            self._session = TestRailSession(self._rate_controller, pool_size, self._call_hooks, self._read_memo)
+            self._api = TestRailAPI(tr_url, tr_user, tr_pass, session=self._session, rate_limit=False,
+                                    timeout=self._timeout)
+            self._api_url = "{0}/index.php?/api/v2/".format(tr_url.rstrip('/'))
             self._initialized = True
 
         return
@@ -96,81 +192,207 @@ class TestRailInterface:
         else:
             return ""
 
-    # region Section Helpers
+    # region Instrumentation
 
-    def get_child_sections(self, template_section_ids: list, sections_data: list) -> list:
+    def add_call_hook(self, hook: ApiCallHook):
         """
-
+        Registers a hook fired before and after every TestRail API call made through this interface
+        :param hook: The ApiCallHook
         :return:
         """
-        new_sec_ids = []
+        self._call_hooks.append(hook)
 
-        try:
-            for section_id in template_section_ids:
-                new_sec_ids.append(section_id)
-                child_secs = self._secs_get_child_sections(int(section_id), sections_data)
-                if len(child_secs) > 0:
-                    new_sec_ids.extend(child_secs)
+    def remove_call_hook(self, hook: ApiCallHook):
+        if hook in self._call_hooks:
+            self._call_hooks.remove(hook)
 
-        except Exception as e:
-            self._logger.exception("Exception caught when attempting to get all children sections! Exception: {0}"
-                                .format(e))
+    def add_phase_listener(self, listener):
+        """
+        Registers a listener notified as phases are entered and exited, see PhaseProfiler
+        :param listener: An object with phase_entered(name) and phase_exited(name) methods. Both are called on the
+        thread entering the phase
+        :return:
+        """
+        self._phase_listeners.append(listener)
 
-        return new_sec_ids
+    def remove_phase_listener(self, listener):
+        if listener in self._phase_listeners:
+            self._phase_listeners.remove(listener)
 
-    def _secs_get_all_descendants_of_section(self, section_id, section_lookups: dict) -> list:
+    @contextlib.contextmanager
+    def phase(self, name: str):
         """
-        Recursively traverses section IDs to find all descendants of a section
-        :param section_id: The parent section ID
-        :param section_lookups: section lookup table, section id -> parent section id
+        Context manager tagging the API calls made within it, including those made from this interface's worker
+        threads, with a phase name such as case_fetch or write
+        :param name: The phase name
         :return:
         """
-        ret_val = []
+        token = set_phase(name)
+        for listener in self._phase_listeners:
+            listener.phase_entered(name)
+        try:
+            yield
+        finally:
+            for listener in self._phase_listeners:
+                listener.phase_exited(name)
+            reset_phase(token)
 
-        for sec_id, prnt_id in section_lookups.items():
-            if section_id == prnt_id:
-                ret_val.append(sec_id)
-                ret_val.extend(self._secs_get_all_descendants_of_section(sec_id, section_lookups))
+    def phased(self, iterable, name: str):
+        """
+        Generator tagging the API calls made while advancing the provided iterable with a phase name. Lets a streamed
+        fetch keep its own phase while the consumer runs in another
+        :param iterable: The iterable, typically a test case data stream
+        :param name: The phase name
+        :return:
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
 
-        return ret_val
+    # endregion Instrumentation
 
-    def retrieve_sections_data(self, project_id: int, suite_id: int):
-        """
+    # region Pagination Helpers
 
-        :param project_id:
-        :param suite_id:
-        :return:
+    def _iter_pages(self, fetch_page, collection_name: str, page_size: int = None, prefetch: bool = False,
+                    raise_errors: bool = False):
+        """
+        Generator following TestRail pagination. Servers before TestRail 6.7 return the complete list on the first
+        request, newer servers return a page dict with the items under collection_name and a _links.next entry.
+        :param fetch_page: Callable taking (offset, limit) and returning the decoded response or a StreamedPage
+        :param collection_name: The key holding the items within a page dict
+        :param page_size: The number of items to request per page
+        :param prefetch: When True the next page is requested while the current page is being consumed
+        :param raise_errors: When True errors are raised to the consumer instead of logged and ending the generator
+        :return: Returns a generator of items
         """
+        page_size = self._DEFAULT_PAGE_SIZE if page_size is None else page_size
+        prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tr_prefetch") if prefetch is True else None
+        offset = 0
+        pending = None
+
         try:
-            sections = self.tr.sections.get_sections(project_id, suite_id=suite_id)
+            pending = submit_in_phase(prefetcher, fetch_page, offset, page_size) if prefetcher is not None else None
+
+            while True:
+                data = pending.result() if pending is not None else fetch_page(offset, page_size)
+                pending = None
+
+                if isinstance(data, list):
+                    yield from data
+                    break
+
+                if isinstance(data, StreamedPage):
+                    next_offset = data.next_offset(offset)
+                    if next_offset is not None and prefetcher is not None:
+                        pending = submit_in_phase(prefetcher, fetch_page, next_offset, page_size)
+
+                    count = 0
+                    for item in data.items():
+                        count += 1
+                        yield item
+
+                    # Page fields sent after the items are only known once the items are consumed
+                    offset = data.get('offset', offset) + count
+                    if data.is_list is True or data.get('_links', {}).get('next') is None or count == 0:
+                        break
+                    continue
+
+                if 'error' in data:
+                    raise ValueError("Error encountered when retrieving {0} data at offset {1}. Error: {2}"
+                                     .format(collection_name, offset, data['error']))
+
+                items = data.get(collection_name, [])
+                offset = data.get('offset', offset) + len(items)
+                has_next = data.get('_links', {}).get('next') is not None and len(items) > 0
+
+                if has_next is True and prefetcher is not None:
+                    pending = submit_in_phase(prefetcher, fetch_page, offset, page_size)
+
+                yield from items
+
+                if has_next is False:
+                    break
 
         except Exception as e:
-            self._logger.exception("Exception caught when retrieving sections data! Exception: {0}".format(e))
-            sections = []
+            if raise_errors is True:
+                raise
+            self._logger.exception("Exception caught when retrieving {0} data from TestRail Server! Exception: {1}"
+                                   .format(collection_name, e))
+
+        finally:
+            if prefetcher is not None:
+                prefetcher.shutdown(wait=False, cancel_futures=True)
+                # Release the connection of a streamed page prefetched but never consumed
+                if pending is not None:
+                    pending.add_done_callback(self._close_streamed_page)
+
+    @staticmethod
+    def _close_streamed_page(future):
+        if future.cancelled() is False and future.exception() is None and isinstance(future.result(), StreamedPage):
+            future.result().close()
+
+    # endregion Pagination Helpers
+
+    # region Section Helpers
 
-        return sections
+    def build_section_tree(self, sections_data: list) -> SectionTree:
+        """
+        Builds an indexed SectionTree from raw sections data. Build the tree once and reuse it for repeated
+        descendant lookups against the same suite.
+        :param sections_data: The raw sections data, see retrieve_sections_data
+        :return: Returns a SectionTree instance
+        """
+        return SectionTree(sections_data)
 
-    def _secs_get_child_sections(self, section_id: int, sections: list) -> list:
+    def get_child_sections(self, template_section_ids: list, sections_data) -> list:
         """
-        Gets all children sections under the provided section ID or sections
-        :return:
+        Gets the provided section IDs along with all of their descendant section IDs. Overlapping roots are
+        de-duplicated so each section ID is only returned once.
+        :param template_section_ids: The root section IDs to expand
+        :param sections_data: Either the raw sections data list or a previously built SectionTree
+        :return: Returns a list of section IDs
         """
-        ret_val = []
+        new_sec_ids = []
 
         try:
-            temp_lookup = {}
-            for section in sections:
-                parent_id = section['parent_id']
-                sec_id = section['id']
-                temp_lookup[sec_id] = parent_id
+            if isinstance(sections_data, SectionTree) is False:
+                sections_data = self.build_section_tree(sections_data)
 
-            ret_val.extend(self._secs_get_all_descendants_of_section(section_id, temp_lookup))
+            new_sec_ids = sections_data.expand(template_section_ids)
 
         except Exception as e:
-            self._logger.exception("Exception caught when retrieving source test cases for templater! "
-                                   "Exception: {0}".format(e))
+            self._logger.exception("Exception caught when attempting to get all children sections! Exception: {0}"
+                                .format(e))
 
-        return ret_val
+        return new_sec_ids
+
+    def retrieve_sections_data(self, project_id: int, suite_id: int):
+        """
+        Retrieves the raw sections data for the project and suite IDs provided
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :return: Returns a list containing section data, or an empty list on failure
+        """
+        return list(self.iter_sections_data(project_id, suite_id))
+
+    def iter_sections_data(self, project_id: int, suite_id: int, page_size: int = None, prefetch: bool = False):
+        """
+        Lazily retrieves the raw sections data for the project and suite IDs provided, following pagination
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param page_size: The number of sections to request per page
+        :param prefetch: When True the next page is requested while the current page is being consumed
+        :return: Returns a generator of section dicts
+        """
+        def fetch_page(offset: int, limit: int):
+            return self.tr.sections.get_sections(project_id, suite_id=suite_id, offset=offset, limit=limit)
+
+        return self._iter_pages(fetch_page, "sections", page_size, prefetch)
 
     # endregion Section Helpers
 
@@ -210,19 +432,227 @@ class TestRailInterface:
 
         return ret_val
 
-    def retrieve_testcase_data(self, project_id: int, suite_id: int) -> list:
+    def retrieve_testcase_data(self, project_id: int, suite_id: int, fields: list = None) -> list:
         """
         Retrieves the raw test case data for the project and test case suite IDs provided
+        :param fields: Optional field names to project the test cases to, see iter_testcase_data
         :return: Returns list containing TestCase data, or an empty list on failure
         """
-        try:
-            test_case_data = self.tr.cases.get_cases(project_id, suite_id=suite_id)
+        return list(self.iter_testcase_data(project_id, suite_id, fields=fields))
 
-        except Exception as e:
-            test_case_data = []
-            self._logger.exception("Exception caught when retrieving test case data from TestRail Server!"
-                                "Exception: {0}".format(e))
+    def iter_testcase_data(self, project_id: int, suite_id: int, page_size: int = None, prefetch: bool = False,
+                           fields: list = None, raise_errors: bool = False, **filters):
+        """
+        Lazily retrieves the raw test case data for the project and suite IDs provided, following pagination. Only one
+        page of test cases, two when prefetching, is held at a time.
+
+        When the interface was created with a snapshot_dir and no filters are provided, the test cases are served
+        from the incrementally refreshed suite snapshot instead. See get_suite_snapshot.
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param page_size: The number of test cases to request per page
+        :param prefetch: When True the next page is requested while the current page is being consumed
+        :param fields: Optional field names to keep. Each test case is projected to a compact CaseRecord holding only
+        these fields, and the 'id', as soon as its page is decoded. See CaseProjection
+        :param raise_errors: When True a failed page is raised to the consumer. By default it is logged and ends the
+        generator, indistinguishable from the end of the suite
+        :param filters: Additional get_cases filters, for example section_id
+        :return: Returns a generator of test case dicts, or of CaseRecords when projecting
+        """
+        if self._snapshot_dir is not None and len(filters) == 0:
+            snapshot = self.get_suite_snapshot(project_id, suite_id)
+            if snapshot is not None:
+                return self._project(iter(snapshot.cases()), fields)
+
+        return self._iter_server_testcase_data(project_id, suite_id, page_size, prefetch, raise_errors, fields=fields,
+                                               **filters)
+
+    def _iter_server_testcase_data(self, project_id: int, suite_id: int, page_size: int = None,
+                                   prefetch: bool = False, raise_errors: bool = False, fields: list = None,
+                                   **filters):
+        if self._stream_decode is False:
+            def fetch_page(offset: int, limit: int):
+                return self.tr.cases.get_cases(project_id, suite_id=suite_id, offset=offset, limit=limit, **filters)
+
+            return self._project(self._iter_pages(fetch_page, "cases", page_size, prefetch, raise_errors), fields)
+
+        # Streamed pages project each test case as it is decoded, dropped fields never outlive their test case
+        projection = CaseProjection(fields) if fields is not None else None
+
+        # Sent through the session directly, it is authenticated by the TestRailAPI and rate controlled like any
+        # other request, as TestRailAPI has no public call returning the undecoded response
+        def fetch_streamed_page(offset: int, limit: int):
+            params = dict(filters, suite_id=suite_id, offset=offset, limit=limit)
+            response = self._session.get("{0}get_cases/{1}".format(self._api_url, project_id), params=params,
+                                         headers={"Content-Type": "application/json"}, stream=True,
+                                         timeout=self._timeout)
+            return open_streamed_page(response, "cases", projection)
+
+        return self._iter_pages(fetch_streamed_page, "cases", page_size, prefetch, raise_errors)
+
+    def retrieve_testcase_data_by_sections(self, project_id: int, suite_id: int, section_ids: list,
+                                           fields: list = None) -> list:
+        """
+        Retrieves the raw test case data of the provided sections with a filtered get_cases request per section.
+        Sections are requested concurrently, bounded by the interface's write_concurrency. Child sections are not
+        included by TestRail, expand the section IDs first, see get_child_sections.
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param section_ids: The section IDs to retrieve test cases from
+        :param fields: Optional field names to project the test cases to, see iter_testcase_data
+        :return: Returns a list containing TestCase data, ordered by section
+        """
+        def fetch(section_id):
+            return list(self._iter_server_testcase_data(project_id, suite_id, fields=fields, section_id=section_id))
+
+        if len(section_ids) == 0:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.write_concurrency, len(section_ids)),
+                                thread_name_prefix="tr_read") as pool:
+            futures = [submit_in_phase(pool, fetch, section_id) for section_id in section_ids]
+            sections_cases = [future.result() for future in futures]
+
+        return [case for section_cases in sections_cases for case in section_cases]
+
+    def get_suite_snapshot(self, project_id: int, suite_id: int):
+        """
+        Gets the suite snapshot for a project / suite, refreshing it from the server on first use by this interface
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :return: Returns the SuiteSnapshot, or None if snapshots are disabled or the refresh failed
+        """
+        if self._snapshot_dir is None:
+            return None
+
+        key = (int(project_id), int(suite_id))
+        if key not in self._snapshots:
+            snapshot = SuiteSnapshot(self._snapshot_dir, project_id, suite_id)
+
+            def fetch_cases(**filters):
+                return self._iter_server_testcase_data(project_id, suite_id, prefetch=True, raise_errors=True,
+                                                       **filters)
+
+            if snapshot.refresh(fetch_cases) is False:
+                self._logger.error("Failed to refresh the snapshot for project ID {0} suite ID {1}, falling back to "
+                                   "the TestRail server".format(project_id, suite_id))
+                return None
+
+            self._snapshots[key] = snapshot
+
+        return self._snapshots[key]
+
+    def get_case(self, case_id: int) -> dict:
+        """
+        Retrieves the raw test case data for a single test case
+        :param case_id: The ID of the test case
+        :return: Returns the test case data dict
+        """
+        return self.tr.cases.get_case(case_id)
+
+    def retrieve_testcase_data_by_ids(self, case_ids: list, fields: list = None) -> list:
+        """
+        Retrieves the raw test case data for the provided test case IDs. Requests are issued concurrently, bounded by
+        the interface's write_concurrency.
+        :param case_ids: The IDs of the test cases to retrieve
+        :param fields: Optional field names to project the test cases to, see iter_testcase_data
+        :return: Returns a list containing TestCase data in the order of case_ids. Cases which fail to load are
+        logged and left out
+        """
+        projection = CaseProjection(fields) if fields is not None else None
+
+        def fetch(case_id):
+            try:
+                response = self.get_case(case_id)
+            except Exception as e:
+                return {'error': str(e)}
+
+            # Project as each test case arrives rather than holding every full test case first
+            if projection is not None and isinstance(response, dict) and 'error' not in response:
+                return projection.project(response)
+            return response
+
+        if len(case_ids) == 0:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.write_concurrency, len(case_ids)),
+                                thread_name_prefix="tr_read") as pool:
+            futures = [submit_in_phase(pool, fetch, case_id) for case_id in case_ids]
+            responses = [future.result() for future in futures]
+
+        test_case_data = []
+        for case_id, response in zip(case_ids, responses):
+            if isinstance(response, CaseRecord) or (isinstance(response, dict) and 'error' not in response):
+                test_case_data.append(response)
+            else:
+                self._logger.error("Failed to retrieve test case ID: {0}. Error: {1}".format(case_id, response))
 
         return test_case_data
 
+    @staticmethod
+    def _project(test_case_data, fields: list = None):
+        """
+        Projects streamed test case data to the given fields
+        :param test_case_data: An iterable of raw test case dicts
+        :param fields: The field names to keep, or None to keep the raw test cases
+        :return: Returns an iterable of test case data
+        """
+        if fields is None:
+            return test_case_data
+
+        return CaseProjection(fields).project_all(test_case_data)
+
+    def update_case(self, case_id: int, case_data: dict) -> dict:
+        """
+        Writes test case data to the TestRail server
+        :param case_id: The ID of the test case to update
+        :param case_data: The test case field data to write
+        :return: Returns the TestRail response data
+        """
+        try:
+            response = self.tr.cases.update_case(case_id, **case_data)
+        except Exception as e:
+            self._drop_deleted_case(case_id, str(e))
+            raise
+        finally:
+            if self._read_memo is not None:
+                self._read_memo.invalidate("get_case", "get_case/{0}".format(case_id))
+                self._read_memo.invalidate("get_cases")
+
+        if len(self._snapshots) > 0 and isinstance(response, dict) and 'error' not in response:
+            for (project_id, suite_id), snapshot in self._snapshots.items():
+                if suite_id == response.get('suite_id'):
+                    snapshot.apply_case_update(response)
+        elif isinstance(response, dict) and 'error' in response:
+            self._drop_deleted_case(case_id, str(response['error']))
+
+        return response
+
+    def _drop_deleted_case(self, case_id: int, error: str):
+        """
+        Removes a test case from the suite snapshots when a write to it failed because it no longer exists, so the
+        snapshots stop serving it before their next deleted case reconcile
+        :param case_id: The ID of the test case written
+        :param error: The write error
+        :return:
+        """
+        if "is not a valid test case" not in error:
+            return
+
+        for snapshot in self._snapshots.values():
+            if snapshot.remove_case(case_id) is True:
+                self._logger.info("Removed deleted test case ID {0} from snapshot {1}".format(case_id, snapshot.path))
+                snapshot.save()
+
+        return
+
+    def update_cases(self, updates: list, on_result=None) -> list:
+        """
+        Writes multiple test cases using the write executor. See the write_concurrency ctor parameter
+        :param updates: A list of (case_id, case data dict) tuples
+        :param on_result: Optional callable invoked with each WriteResult, in the order of the updates
+        :return: Returns a list of WriteResult, in the order of the updates
+        """
+        return self._write_executor.execute(updates, on_result)
+
     # endregion Test Case Helpers
@@ -0,0 +1,270 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import contextvars
+import json
+import logging
+import re
+import threading
+
+_current_phase = contextvars.ContextVar("tr_utils_phase", default=None)
+
+_ENDPOINT_RE = re.compile(r"/api/v2/([A-Za-z_]+)")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+""" Upper bounds, in seconds, of the API call latency histogram buckets """
+
+
+def current_phase():
+    """
+    :return: Returns the name of the phase the calling code runs in, or None outside of any phase
+    """
+    return _current_phase.get()
+
+
+def set_phase(name):
+    """
+    Enters a phase. Prefer TestRailInterface.phase, which also restores the previous phase
+    :param name: The phase name
+    :return: Returns the token to pass to reset_phase
+    """
+    return _current_phase.set(name)
+
+
+def reset_phase(token):
+    _current_phase.reset(token)
+
+
+def submit_in_phase(pool, fn, *args):
+    """
+    Submits a call to an executor so it runs in the submitting thread's phase. Worker threads do not otherwise
+    inherit the phase
+    :param pool: The concurrent.futures executor
+    :param fn: The callable
+    :return: Returns the Future
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Reduces a TestRail API URL to its method name, for example .../index.php?/api/v2/get_cases/1&suite_id=2 to
+    get_cases
+    :param url: The request URL
+    :return: Returns the API method name, or 'other' for non API URLs
+    """
+    match = _ENDPOINT_RE.search(url)
+
+    return match.group(1) if match is not None else "other"
+
+
+class ApiCallEvent:
+    """
+    One TestRail API call, as seen by ApiCallHooks. The after_call fields are None in before_call.
+    """
+
+    def __init__(self, method: str, endpoint: str, phase: str = None):
+        self.method = method
+        self.endpoint = endpoint
+        self.phase = phase
+        self.status = None
+        """ The HTTP status of the final attempt, None if no response was received """
+        self.latency = None
+        """ Seconds from the first attempt until the final response, including retries and throttling waits """
+        self.bytes_in = None
+        self.bytes_out = None
+        self.retries = 0
+        self.error = None
+        """ The exception type name if the call raised """
+
+    def __repr__(self):
+        return "ApiCallEvent({0} {1}, phase={2}, status={3}, latency={4}, retries={5})".format(
+            self.method, self.endpoint, self.phase, self.status, self.latency, self.retries)
+
+
+class ApiCallHook:
+    """
+    Base class of hooks fired around every TestRail API call made through a TestRailInterface. Override either
+    method. Hooks run on the thread making the call, and an exception raised by a hook is logged and ignored.
+    """
+
+    def before_call(self, event: ApiCallEvent):
+        return
+
+    def after_call(self, event: ApiCallEvent):
+        return
+
+
+class _CallStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+
+    def add(self, event: ApiCallEvent):
+        self.count += 1
+        if event.error is not None or event.status is None or event.status >= 400:
+            self.errors += 1
+        status = str(event.status) if event.status is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+        latency = event.latency or 0.0
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+        self.bytes_in += event.bytes_in or 0
+        self.bytes_out += event.bytes_out or 0
+        self.retries += event.retries
+
+    def cumulative_buckets(self) -> list:
+        """
+        :return: Returns a list of (upper bound, cumulative count) tuples, the last bound being '+Inf'
+        """
+        ret_val = []
+        total = 0
+        for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], self.buckets):
+            total += count
+            ret_val.append((bound, total))
+
+        return ret_val
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "errors": self.errors, "statuses": dict(self.statuses),
+                "latency_sum": round(self.latency_sum, 6), "latency_max": round(self.latency_max, 6),
+                "latency_buckets": {str(bound): count for bound, count in self.cumulative_buckets()},
+                "bytes_in": self.bytes_in, "bytes_out": self.bytes_out, "retries": self.retries}
+
+
+class MetricsCollector(ApiCallHook):
+    """
+    ApiCallHook aggregating call counts, statuses, latency histograms, bytes and retries per endpoint and per phase.
+    Exports to JSON or to the Prometheus text format.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._phases = {}
+
+        return
+
+    def after_call(self, event: ApiCallEvent):
+        with self._lock:
+            key = (event.endpoint, event.method)
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = _CallStats()
+            stats.add(event)
+
+            phase = event.phase or "none"
+            stats = self._phases.get(phase)
+            if stats is None:
+                stats = self._phases[phase] = _CallStats()
+            stats.add(event)
+
+        return
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._phases = {}
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            endpoints = [dict(endpoint=endpoint, method=method, **stats.to_dict())
+                         for (endpoint, method), stats in sorted(self._endpoints.items())]
+            phases = {phase: stats.to_dict() for phase, stats in sorted(self._phases.items())}
+
+        totals = {"count": sum(endpoint['count'] for endpoint in endpoints),
+                  "errors": sum(endpoint['errors'] for endpoint in endpoints),
+                  "latency_sum": round(sum(endpoint['latency_sum'] for endpoint in endpoints), 6),
+                  "bytes_in": sum(endpoint['bytes_in'] for endpoint in endpoints),
+                  "bytes_out": sum(endpoint['bytes_out'] for endpoint in endpoints),
+                  "retries": sum(endpoint['retries'] for endpoint in endpoints)}
+
+        return {"totals": totals, "endpoints": endpoints, "phases": phases}
+
+    def to_prometheus(self) -> str:
+        """
+        :return: Returns the metrics in the Prometheus text exposition format
+        """
+        lines = []
+        # Snapshot the stats under the lock, calls completing meanwhile keep updating them
+        with self._lock:
+            endpoints = [(key, stats.to_dict()) for key, stats in sorted(self._endpoints.items())]
+            phases = [(phase, stats.to_dict()) for phase, stats in sorted(self._phases.items())]
+
+        def family(name: str, metric_type: str, help_text: str):
+            lines.append("# HELP {0} {1}".format(name, help_text))
+            lines.append("# TYPE {0} {1}".format(name, metric_type))
+
+        family("testrail_api_requests_total", "counter", "TestRail API calls by endpoint, method and status")
+        for (endpoint, method), stats in endpoints:
+            for status, count in sorted(stats['statuses'].items()):
+                lines.append('testrail_api_requests_total{{endpoint="{0}",method="{1}",status="{2}"}} {3}'
+                             .format(endpoint, method, status, count))
+
+        family("testrail_api_request_duration_seconds", "histogram", "TestRail API call latency including retries")
+        for (endpoint, method), stats in endpoints:
+            labels = 'endpoint="{0}",method="{1}"'.format(endpoint, method)
+            for bound, count in stats['latency_buckets'].items():
+                lines.append('testrail_api_request_duration_seconds_bucket{{{0},le="{1}"}} {2}'
+                             .format(labels, bound, count))
+            lines.append("testrail_api_request_duration_seconds_sum{{{0}}} {1}".format(labels, stats['latency_sum']))
+            lines.append("testrail_api_request_duration_seconds_count{{{0}}} {1}".format(labels, stats['count']))
+
+        for name, key, help_text in (("testrail_api_response_bytes_total", "bytes_in", "Response bytes received"),
+                                     ("testrail_api_request_bytes_total", "bytes_out", "Request bytes sent"),
+                                     ("testrail_api_retries_total", "retries", "Retried API call attempts")):
+            family(name, "counter", help_text)
+            for (endpoint, method), stats in endpoints:
+                lines.append('{0}{{endpoint="{1}",method="{2}"}} {3}'.format(name, endpoint, method, stats[key]))
+
+        family("testrail_api_phase_requests_total", "counter", "TestRail API calls by utility phase")
+        for phase, stats in phases:
+            lines.append('testrail_api_phase_requests_total{{phase="{0}"}} {1}'.format(phase, stats['count']))
+        family("testrail_api_phase_duration_seconds_total", "counter", "TestRail API call latency by utility phase")
+        for phase, stats in phases:
+            lines.append('testrail_api_phase_duration_seconds_total{{phase="{0}"}} {1}'.format(phase,
+                                                                                              stats['latency_sum']))
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        with open(path, "w") as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+        self._log.info("Wrote API metrics to {0}".format(path))
+
+    def write_prometheus(self, path: str):
+        with open(path, "w") as prom_file:
+            prom_file.write(self.to_prometheus())
+
+        self._log.info("Wrote API metrics to {0}".format(path))
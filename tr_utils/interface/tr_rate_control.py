@@ -0,0 +1,324 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import email.utils
+import logging
+import random
+import threading
+import time
+
+
+def parse_retry_after(retry_after, default: float) -> float:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date
+    :param retry_after: The header value, or None
+    :param default: The delay returned when the header is missing or cannot be parsed
+    :return: Returns the delay in seconds
+    """
+    if retry_after is None:
+        return default
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers block in acquire until a token is available.
+    """
+
+    def __init__(self, rate: float = None, burst: float = None):
+        """
+        :param rate: Tokens added per second. None disables the bucket
+        :param burst: Maximum tokens held. Defaults to one second of tokens
+        """
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._burst = burst if burst is not None else (max(1.0, rate) if rate is not None else 1.0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+
+        return
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def acquire(self):
+        """
+        Takes a token, waiting for one to become available if needed
+        :return:
+        """
+        if self._rate is None:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self._rate
+
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bounds requests in flight with a limit tuned by additive-increase / multiplicative-decrease. Every successful
+    request grows the limit by 1 / limit, about one slot per round trip of the whole window, and every throttled
+    request cuts it in half.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        """
+        :param max_limit: The upper bound of the limit, usually the configured concurrency
+        :param min_limit: The lower bound of the limit
+        :param decrease_factor: The factor applied to the limit when throttled
+        """
+        self._condition = threading.Condition()
+        self._max_limit = max(1, max_limit)
+        self._min_limit = max(1, min(min_limit, self._max_limit))
+        self._decrease_factor = decrease_factor
+        self._limit = float(self._max_limit)
+        self._in_flight = 0
+
+        return
+
+    @property
+    def limit(self) -> int:
+        return max(self._min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self._limit = min(float(self._max_limit), self._limit + 1.0 / max(1.0, self._limit))
+            self._condition.notify_all()
+
+    def on_throttled(self):
+        with self._condition:
+            self._limit = max(float(self._min_limit), self._limit * self._decrease_factor)
+
+
+class RateController:
+    """
+    Rate control for TestRail API requests.
+
+    -   A token bucket caps the request rate when a rate limit is configured
+    -   An AIMD limiter tunes the number of requests in flight between 1 and the configured concurrency
+    -   429 responses pause every request until their Retry-After time passes and are retried. This is safe for
+        writes as well since a throttled request is not processed by the server. The concurrency limit is cut once per
+        pause window, not once for every request in flight when the server started throttling
+    -   5xx responses and connection errors are retried with jittered exponential backoff, for idempotent requests
+        only
+    """
+
+    _RATE_LIMIT_STATUS = 429
+    _DEFAULT_RETRY_AFTER = 5.0
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, max_concurrency: int = 1, rate_limit: float = None, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        """
+        :param max_concurrency: The maximum number of requests in flight
+        :param rate_limit: The maximum requests per second. None leaves the rate uncapped
+        :param max_retries: The maximum number of retries per request
+        :param backoff_base: The base delay in seconds for retries of failed idempotent requests
+        :param backoff_max: The maximum delay in seconds between retries
+        """
+        self._bucket = TokenBucket(rate_limit)
+        self._limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._current_rate = 0.0
+        self._counters = {'requests': 0, 'throttled': 0, 'server_errors': 0, 'connection_errors': 0,
+                          'retries': 0, 'backoff_seconds': 0.0}
+
+        return
+
+    @property
+    def current_rate(self) -> float:
+        """
+        Property for the request rate, in requests per second, measured over the last completed second
+        """
+        return self._current_rate
+
+    @property
+    def concurrency_limit(self) -> int:
+        return self._limiter.limit
+
+    def stats(self) -> dict:
+        """
+        Gets the current rate control state and counters
+        :return: Returns a dict of counters plus the current rate, concurrency limit and requests in flight
+        """
+        with self._lock:
+            ret_val = dict(self._counters)
+
+        ret_val['current_rate'] = self._current_rate
+        ret_val['rate_limit'] = self._bucket.rate
+        ret_val['concurrency_limit'] = self._limiter.limit
+        ret_val['in_flight'] = self._limiter.in_flight
+
+        return ret_val
+
+    def execute(self, send, idempotent: bool):
+        """
+        Sends a request under rate control, retrying as described in the class documentation
+        :param send: Callable performing the request and returning a requests.Response
+        :param idempotent: True if the request may be safely retried after a server or connection error
+        :return: Returns the final response. Errors are raised once retries are exhausted
+        """
+        attempt = 0
+
+        while True:
+            self._wait_for_pause()
+            self._bucket.acquire()
+            self._limiter.acquire()
+            sent_at = time.monotonic()
+
+            try:
+                response = send()
+            except (ConnectionError, OSError) as e:
+                self._limiter.release()
+                self._count('connection_errors')
+                if idempotent is False or attempt >= self._max_retries:
+                    raise
+                self._retry_after_backoff(attempt, "connection error: {0}".format(e))
+                attempt += 1
+                continue
+            except BaseException:
+                self._limiter.release()
+                raise
+
+            self._limiter.release()
+            self._record_request()
+            status = response.status_code
+
+            if status == self._RATE_LIMIT_STATUS:
+                self._count('throttled')
+                delay = self._parse_retry_after(response.headers.get('Retry-After'))
+                if self._pause(sent_at, delay) is True:
+                    self._limiter.on_throttled()
+                    self._log.warning("Throttled by TestRail, pausing requests for {0:.1f}s. Concurrency limit is now "
+                                      "{1}".format(delay, self._limiter.limit))
+                if attempt >= self._max_retries:
+                    return response
+                self._count('retries')
+                attempt += 1
+                continue
+
+            if status >= 500:
+                self._count('server_errors')
+                if idempotent is True and attempt < self._max_retries:
+                    self._retry_after_backoff(attempt, "status code {0}".format(status))
+                    attempt += 1
+                    continue
+
+            if status < 500:
+                self._limiter.on_success()
+
+            return response
+
+    def _retry_after_backoff(self, attempt: int, reason: str):
+        delay = min(self._backoff_max, self._backoff_base * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        self._log.warning("Retrying TestRail request after {0} in {1:.2f}s".format(reason, delay))
+        self._count('retries')
+        self._count('backoff_seconds', delay)
+        time.sleep(delay)
+
+    def _pause(self, sent_at: float, delay: float) -> bool:
+        """
+        Pauses every request for a Retry-After delay. Requests sent before the current pause ends were throttled by
+        the same burst, they only extend the pause. The pause is counted once, by the thread setting or extending it
+        :param sent_at: The time the throttled request was sent
+        :param delay: The Retry-After delay in seconds
+        :return: Returns True if the throttled request started a new pause window
+        """
+        with self._lock:
+            new_window = sent_at >= self._paused_until
+            now = time.monotonic()
+            paused_from = max(now, self._paused_until)
+            self._paused_until = max(self._paused_until, now + delay)
+            self._counters['backoff_seconds'] += max(0.0, self._paused_until - paused_from)
+
+        return new_window
+
+    def _wait_for_pause(self):
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def _count(self, counter: str, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _record_request(self):
+        with self._lock:
+            self._counters['requests'] += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            self._window_count += 1
+            if elapsed >= 1.0:
+                self._current_rate = self._window_count / elapsed
+                self._window_start = now
+                self._window_count = 0
+
+    def _parse_retry_after(self, retry_after) -> float:
+        """
+        Parses a Retry-After header given either in seconds or as an HTTP date
+        :param retry_after: The header value, or None
+        :return: Returns the delay in seconds
+        """
+        return parse_retry_after(retry_after, self._DEFAULT_RETRY_AFTER)
@@ -0,0 +1,189 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import collections
+import logging
+import threading
+
+import requests
+
+
+def _copy_response(response: requests.Response) -> requests.Response:
+    """
+    Copies a loaded response for one caller. The body bytes are shared, they are immutable, everything a caller may
+    change or decode is its own
+    :param response: The loaded response
+    :return: Returns the copy
+    """
+    response_copy = requests.Response()
+    response_copy.status_code = response.status_code
+    response_copy.headers = response.headers.copy()
+    response_copy._content = response.content
+    response_copy._content_consumed = True
+    response_copy.encoding = response.encoding
+    response_copy.url = response.url
+    response_copy.reason = response.reason
+    response_copy.history = list(response.history)
+    response_copy.cookies = response.cookies.copy()
+    response_copy.elapsed = response.elapsed
+    response_copy.request = response.request
+    return response_copy
+
+
+class _MemoEntry:
+
+    __slots__ = ("done", "response", "error", "size")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        self.size = 0
+
+
+class ReadMemo:
+    """
+    Read-through memo of TestRail API read responses for the lifetime of a TestRailInterface, keyed by endpoint,
+    resource and parameters.
+
+    Concurrent identical reads are coalesced: the first caller sends the request and the others wait for its response.
+    Successful responses are kept, least recently used first out, within a byte budget so a large suite is not pinned
+    in memory. Every caller, including the one that sent the request, gets its own copy of the response sharing only
+    the undecoded body bytes, so no Response object is used across threads and every caller decodes its own objects.
+
+    Writes invalidate the entries they affect, see invalidate. A read in flight while its endpoint is invalidated
+    still completes for its callers but is not kept.
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: The maximum total size of the response bodies kept
+        """
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._in_flight = {}
+        self._generations = {}
+        self._size = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+        return
+
+    @property
+    def size(self) -> int:
+        """
+        Property for the total size of the response bodies kept
+        :return: The size in bytes
+        """
+        with self._lock:
+            return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def fetch(self, endpoint: str, resource: str, params: dict, send):
+        """
+        Gets the memoized response of a read, sending it when it is neither kept nor in flight
+        :param endpoint: The API endpoint name, for example get_cases
+        :param resource: The endpoint and resource path, for example get_cases/1
+        :param params: The request parameters
+        :param send: Callable sending the request and returning the response
+        :return: Returns a copy of the response for this caller
+        """
+        key = (resource, tuple(sorted((str(name), str(value)) for name, value in (params or {}).items())))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_response(entry.response)
+
+            entry = self._in_flight.get(key)
+            owner = entry is None
+            if owner is True:
+                entry = self._in_flight[key] = _MemoEntry()
+                generation = self._generations.get(endpoint, 0)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if owner is False:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return _copy_response(entry.response)
+
+        try:
+            entry.response = send()
+            # Load the body before any waiter copies it
+            entry.response.content
+        except BaseException as e:
+            entry.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if entry.error is None and self._generations.get(endpoint, 0) == generation:
+                    self._keep(key, entry)
+            entry.done.set()
+
+        return _copy_response(entry.response)
+
+    def invalidate(self, endpoint: str, resource: str = None):
+        """
+        Drops the kept responses of an endpoint, and keeps reads of it in flight from being kept
+        :param endpoint: The API endpoint name, for example get_cases
+        :param resource: Only drop the responses of this endpoint and resource path, for example get_case/1
+        :return:
+        """
+        prefix = endpoint + "/"
+        with self._lock:
+            self._generations[endpoint] = self._generations.get(endpoint, 0) + 1
+            for key in [key for key in self._entries.keys()
+                        if (key[0] == resource if resource is not None else key[0].startswith(prefix))]:
+                self._size -= self._entries.pop(key).size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _keep(self, key: tuple, entry: _MemoEntry):
+        """
+        Keeps a successful response within the byte budget. Called with the lock held
+        :return:
+        """
+        response = entry.response
+        if getattr(response, 'status_code', None) != 200:
+            return
+
+        entry.size = len(response.content)
+        if entry.size > self._max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self._max_bytes:
+            self._size -= self._entries.popitem(last=False)[1].size
@@ -0,0 +1,179 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+
+
+class SectionTree:
+    """
+    Indexed view of a TestRail section hierarchy.
+
+    Built once from the raw sections data returned by TestRailInterface.retrieve_sections_data. The tree keeps a
+    parent -> children adjacency index and numbers every section with a pre-order entry index and the last pre-order
+    index found in its subtree. A section's whole subtree is therefore a contiguous slice of the pre-order listing and
+    "is X under Y" is a constant time interval check.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, sections_data: list):
+        """
+        :param sections_data: The raw list of section dicts as returned by the TestRail get_sections endpoint
+        """
+        self._parents = {}
+        self._children = {}
+        self._preorder = []
+        self._enter = {}
+        self._exit = {}
+
+        for section in sections_data:
+            sec_id = int(section['id'])
+            parent_id = section.get('parent_id')
+            self._parents[sec_id] = int(parent_id) if parent_id is not None else None
+            self._children.setdefault(sec_id, [])
+
+        # Sections whose parent is missing from the data set are treated as roots
+        roots = []
+        for sec_id, parent_id in self._parents.items():
+            if parent_id is None or parent_id not in self._parents:
+                roots.append(sec_id)
+            else:
+                self._children[parent_id].append(sec_id)
+
+        self._number_sections(roots)
+
+        return
+
+    def __len__(self) -> int:
+        return len(self._preorder)
+
+    def __contains__(self, section_id) -> bool:
+        return int(section_id) in self._enter
+
+    def get_children(self, section_id) -> list:
+        """
+        Gets the direct children of a section
+        :param section_id: The parent section ID
+        :return: Returns a list of child section IDs, or an empty list if the section has no children
+        """
+        return list(self._children.get(int(section_id), []))
+
+    def get_parent(self, section_id):
+        """
+        Gets the parent of a section
+        :param section_id: The child section ID
+        :return: Returns the parent section ID, or None for root or unknown sections
+        """
+        return self._parents.get(int(section_id))
+
+    def get_descendants(self, section_id) -> list:
+        """
+        Gets all descendants of a section in pre-order. The section itself is not included.
+        :param section_id: The parent section ID
+        :return: Returns a list of descendant section IDs
+        """
+        section_id = int(section_id)
+        if section_id not in self._enter:
+            return []
+
+        return self._preorder[self._enter[section_id] + 1:self._exit[section_id] + 1]
+
+    def is_descendant(self, section_id, root_id, include_self: bool = True) -> bool:
+        """
+        Checks if a section resides anywhere under the provided root section
+        :param section_id: The section ID to check
+        :param root_id: The root section ID
+        :param include_self: When True a section is considered to be under itself
+        :return: Returns True if section_id is in the subtree of root_id
+        """
+        section_id = int(section_id)
+        root_id = int(root_id)
+
+        if section_id not in self._enter or root_id not in self._enter:
+            return include_self is True and section_id == root_id
+
+        if section_id == root_id:
+            return include_self
+
+        return self._enter[root_id] < self._enter[section_id] <= self._exit[root_id]
+
+    def expand(self, root_ids: list) -> list:
+        """
+        Expands the provided root sections into the roots plus all of their descendants. Roots that reside under
+        another provided root are de-duplicated so each section ID is returned only once.
+
+        Root IDs which are not found in the sections data are returned as-is, without any descendants.
+        :param root_ids: The section IDs to expand
+        :return: Returns a list of section IDs, each root followed by its descendants in pre-order
+        """
+        ret_val = []
+        seen_unknown = set()
+
+        known_roots = sorted({int(root_id) for root_id in root_ids if int(root_id) in self._enter},
+                             key=self._enter.get)
+
+        # Sweep the roots by entry index; a root inside the previous kept interval is already covered by it
+        covered = set()
+        last_exit = -1
+        for root_id in known_roots:
+            if self._enter[root_id] <= last_exit:
+                covered.add(root_id)
+            else:
+                last_exit = self._exit[root_id]
+
+        for root_id in root_ids:
+            root_id = int(root_id)
+            if root_id in self._enter:
+                if root_id not in covered:
+                    covered.add(root_id)
+                    ret_val.extend(self._preorder[self._enter[root_id]:self._exit[root_id] + 1])
+            elif root_id not in seen_unknown:
+                seen_unknown.add(root_id)
+                ret_val.append(root_id)
+
+        return ret_val
+
+    def _number_sections(self, roots: list):
+        """
+        Iteratively walks the tree from the provided roots assigning pre-order entry indexes and subtree exit indexes.
+        :param roots: The root section IDs
+        :return:
+        """
+        for root_id in roots:
+            stack = [(root_id, False)]
+
+            while len(stack) > 0:
+                sec_id, visited = stack.pop()
+
+                if visited is True:
+                    self._exit[sec_id] = len(self._preorder) - 1
+                    continue
+
+                if sec_id in self._enter:
+                    self._log.warning("Section ID {0} was found more than once while indexing sections!"
+                                      .format(sec_id))
+                    continue
+
+                self._enter[sec_id] = len(self._preorder)
+                self._preorder.append(sec_id)
+
+                stack.append((sec_id, True))
+                for child_id in reversed(self._children[sec_id]):
+                    stack.append((child_id, False))
+
+        return
@@ -0,0 +1,133 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tr_utils.interface.tr_metrics import ApiCallEvent, current_phase, endpoint_name
+from tr_utils.interface.tr_rate_control import RateController
+from tr_utils.interface.tr_read_memo import ReadMemo
+
+
+class TestRailSession(requests.Session):
+    """
+    requests Session used by TestRailInterface's TestRailAPI instance. Every API request made through the session is
+    sent under the interface's RateController.
+
+    The connection pool is sized to the interface's concurrency so concurrent requests reuse kept-alive connections
+    rather than opening, and TLS handshaking, new ones. Responses are requested gzip compressed, which matters for
+    large steps payloads.
+
+    Every request fires the provided ApiCallHooks before it is sent and once its final attempt completes. Reads are
+    served through the ReadMemo when one is provided, reads it answers are not sent and so fire no hooks.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    _IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, rate_controller: RateController, pool_size: int = 10, call_hooks: list = None,
+                 read_memo: ReadMemo = None):
+        """
+        :param rate_controller: The RateController to send requests under
+        :param pool_size: The maximum number of connections kept alive per host
+        :param call_hooks: List of ApiCallHook fired around every request. The list is used as is, hooks added to it
+        later fire as well
+        :param read_memo: Optional ReadMemo serving GET requests. Streamed requests always go to the server
+        """
+        super().__init__()
+        self._rate_controller = rate_controller
+        self._pool_size = max(1, int(pool_size))
+        self._call_hooks = call_hooks if call_hooks is not None else []
+        self._read_memo = read_memo
+
+        # Retries are handled by the rate controller, keep urllib3 from retrying underneath it
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size, max_retries=0, pool_block=False)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+        self.headers["Accept-Encoding"] = "gzip, deflate"
+        self.headers["Connection"] = "keep-alive"
+
+        return
+
+    @property
+    def rate_controller(self) -> RateController:
+        return self._rate_controller
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    def request(self, method, url, *args, **kwargs):
+        method = str(method).upper()
+
+        if self._read_memo is not None and method == "GET" and kwargs.get('stream', False) is False:
+            return self._read_memo.fetch(endpoint_name(url), url.split("/api/v2/", 1)[-1], kwargs.get('params'),
+                                         lambda: self._send(method, url, *args, **kwargs))
+
+        return self._send(method, url, *args, **kwargs)
+
+    def _send(self, method: str, url, *args, **kwargs):
+        attempts = [0]
+
+        def send():
+            attempts[0] += 1
+            return super(TestRailSession, self).request(method, url, *args, **kwargs)
+
+        if len(self._call_hooks) == 0:
+            return self._rate_controller.execute(send, method in self._IDEMPOTENT_METHODS)
+
+        event = ApiCallEvent(method, endpoint_name(url), current_phase())
+        self._fire_hooks("before_call", event)
+
+        started = time.perf_counter()
+        try:
+            response = self._rate_controller.execute(send, method in self._IDEMPOTENT_METHODS)
+            event.status = response.status_code
+            event.bytes_in = self._response_size(response, kwargs.get('stream', False))
+            event.bytes_out = len(response.request.body or b"") if response.request is not None else 0
+            return response
+        except Exception as e:
+            event.error = type(e).__name__
+            raise
+        finally:
+            event.latency = time.perf_counter() - started
+            event.retries = max(0, attempts[0] - 1)
+            self._fire_hooks("after_call", event)
+
+    @staticmethod
+    def _response_size(response, stream: bool) -> int:
+        """
+        :return: Returns the size of the response body as sent, compressed if it was, without reading streamed bodies
+        """
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and content_length.isdigit():
+            return int(content_length)
+
+        return 0 if stream is True else len(response.content)
+
+    def _fire_hooks(self, name: str, event: ApiCallEvent):
+        for hook in list(self._call_hooks):
+            try:
+                getattr(hook, name)(event)
+            except Exception as e:
+                self._log.exception("Exception raised by API call hook {0}. Exception: {1}".format(hook, e))
@@ -0,0 +1,218 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+class SuiteSnapshot:
+    """
+    On-disk snapshot of the test cases in a project / suite, refreshed incrementally.
+
+    The first refresh downloads the whole suite. Later refreshes only request cases updated since the previous sync
+    using the get_cases updated_after filter. Deleted cases cannot be seen through updated_after, so they are
+    reconciled with a pass listing the suite projected to the case 'id'. TestRail cannot select fields server side,
+    so that pass transfers the full suite, it runs only when the last reconcile is older than reconcile_interval, or
+    on every refresh when reconcile_interval is 0. In between, a case found deleted by a failed write is dropped
+    right away, see remove_case.
+    """
+
+    _FORMAT_VERSION = 1
+
+    _SYNC_SKEW = 300
+    """ Seconds subtracted from the last sync time to cover clock differences between this host and the server """
+
+    _DEFAULT_RECONCILE_INTERVAL = 7 * 24 * 60 * 60
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, snapshot_dir: str, project_id: int, suite_id: int, reconcile_interval: int = None):
+        """
+        :param snapshot_dir: The directory snapshot files are kept in
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param reconcile_interval: Seconds between deleted case reconcile passes. 0 reconciles on every refresh
+        """
+        self._path = os.path.join(snapshot_dir, "tr_snapshot_p{0}_s{1}.json".format(project_id, suite_id))
+        self._project_id = project_id
+        self._suite_id = suite_id
+        self._reconcile_interval = self._DEFAULT_RECONCILE_INTERVAL if reconcile_interval is None \
+            else reconcile_interval
+        self._cases = None
+        self._synced_at = None
+        self._reconciled_at = None
+        self._save_lock = threading.Lock()
+
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def synced_at(self):
+        """
+        Property for the UNIX timestamp of the last sync, or None if the snapshot has never been synced
+        """
+        return self._synced_at
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._cases is not None
+
+    def cases(self) -> list:
+        """
+        Gets the snapshot test case data
+        :return: Returns a list of test case dicts, or an empty list if the snapshot has not been loaded or refreshed
+        """
+        if self._cases is None:
+            return []
+
+        return list(self._cases.values())
+
+    def load(self) -> bool:
+        """
+        Loads the snapshot file from disk
+        :return: Returns True if a usable snapshot was loaded
+        """
+        if os.path.isfile(self._path) is False:
+            return False
+
+        try:
+            with open(self._path, 'r', encoding='utf-8') as snapshot_file:
+                data = json.load(snapshot_file)
+
+            if data.get('version') != self._FORMAT_VERSION:
+                self._log.warning("Ignoring snapshot {0} with unsupported version {1}".format(self._path,
+                                                                                            data.get('version')))
+                return False
+
+            self._cases = {case['id']: case for case in data['cases']}
+            self._synced_at = data['synced_at']
+            self._reconciled_at = data.get('reconciled_at', data['synced_at'])
+
+        except Exception as e:
+            self._log.exception("Exception caught when loading suite snapshot {0}! Exception: {1}".format(self._path, e))
+            self._cases = None
+            return False
+
+        return True
+
+    def refresh(self, fetch_cases) -> bool:
+        """
+        Brings the snapshot up to date with the server and saves it
+        :param fetch_cases: Callable taking get_cases filter keyword arguments, and an optional 'fields' list to
+        project the test cases to, and returning an iterable of test cases
+        :return: Returns True if the snapshot was refreshed
+        """
+        if self._cases is None:
+            self.load()
+
+        sync_started = int(time.time())
+
+        try:
+            if self._cases is None:
+                self._log.info("No snapshot found at {0}, downloading the full suite".format(self._path))
+                self._cases = {case['id']: case for case in fetch_cases()}
+                self._reconciled_at = sync_started
+            else:
+                updated = 0
+                for case in fetch_cases(updated_after=max(0, self._synced_at - self._SYNC_SKEW)):
+                    self._cases[case['id']] = case
+                    updated += 1
+                self._log.info("Refreshed {0} updated test cases into snapshot {1}".format(updated, self._path))
+
+                if sync_started - self._reconciled_at >= self._reconcile_interval:
+                    self._reconcile_deletions(fetch_cases)
+                    self._reconciled_at = sync_started
+
+        except Exception as e:
+            self._log.exception("Exception caught when refreshing suite snapshot {0}! Exception: {1}"
+                                .format(self._path, e))
+            return False
+
+        self._synced_at = sync_started
+        self.save()
+
+        return True
+
+    def apply_case_update(self, case_data: dict):
+        """
+        Applies test case data written to the server to the in-memory snapshot
+        :param case_data: The updated test case data as returned by the server
+        :return:
+        """
+        if self._cases is not None and isinstance(case_data, dict) and 'id' in case_data:
+            self._cases[case_data['id']] = case_data
+
+        return
+
+    def remove_case(self, case_id: int) -> bool:
+        """
+        Removes a test case the server reported as deleted, for example by rejecting a write to it, from the in-memory
+        snapshot
+        :param case_id: The test case ID
+        :return: Returns True if the test case was in the snapshot
+        """
+        if self._cases is None:
+            return False
+
+        return self._cases.pop(int(case_id), None) is not None
+
+    def save(self):
+        """
+        Atomically writes the snapshot to disk. Safe to call from concurrent writer threads
+        :return:
+        """
+        with self._save_lock:
+            data = {'version': self._FORMAT_VERSION, 'project_id': self._project_id, 'suite_id': self._suite_id,
+                    'synced_at': self._synced_at, 'reconciled_at': self._reconciled_at, 'cases': self.cases()}
+
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            tmp_path = self._path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(data, snapshot_file, separators=(',', ':'))
+            os.replace(tmp_path, self._path)
+
+        return
+
+    def _reconcile_deletions(self, fetch_cases):
+        """
+        Removes cases deleted on the server. Lists the suite's test cases projected to their 'id', the full test
+        cases are transferred but only their IDs are kept
+        :param fetch_cases: See refresh
+        :return:
+        """
+        live_ids = {case['id'] for case in fetch_cases(fields=['id'])}
+
+        # An empty result is far more likely to be a failed request than a suite with every case deleted
+        if len(live_ids) == 0 and len(self._cases) > 0:
+            self._log.warning("Server returned no test cases, skipping deleted case reconcile for {0}"
+                              .format(self._path))
+            return
+
+        deleted = [case_id for case_id in self._cases.keys() if case_id not in live_ids]
+        for case_id in deleted:
+            del self._cases[case_id]
+
+        self._log.info("Removed {0} deleted test cases from snapshot {1}".format(len(deleted), self._path))
+
+        return
@@ -0,0 +1,265 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import codecs
+import json
+import logging
+import re
+
+from tr_utils.interface.tr_case_projection import CaseProjection
+
+
+class StreamedPage:
+    """
+    Incrementally decodes a paginated TestRail response, yielding the items of its collection array one at a time
+    while the response body is still being read.
+
+    The raw bytes, the decoded text and the object tree of a whole page are never in memory at once: only the current
+    chunk and the item being decoded are. When a CaseProjection is provided each item is projected as soon as it is
+    decoded, so the fields it drops are released before the next item is read.
+
+    The page fields preceding the collection, TestRail sends offset, limit, size and _links first, are decoded when
+    the page is opened. Fields following the collection are available once the items have been consumed. Servers
+    before TestRail 6.7 send a bare array instead of a page, its items are streamed the same way.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, chunks, collection_name: str, projection: CaseProjection = None, on_close=None):
+        """
+        :param chunks: An iterable of response body byte chunks
+        :param collection_name: The key holding the items within a page dict
+        :param projection: Optional CaseProjection applied to every item
+        :param on_close: Optional callable invoked once the page is closed, for example to release the connection
+        :raises ValueError: If the body is not a JSON object or array
+        """
+        self._chunks = iter(chunks)
+        self._collection_name = collection_name
+        self._projection = projection
+        self._on_close = on_close
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._fields = {}
+        self._in_collection = False
+        self._is_list = False
+        self._closed = False
+
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+        return
+
+    @property
+    def is_list(self) -> bool:
+        return self._is_list
+
+    def get(self, key: str, default=None):
+        """
+        Gets a page field decoded so far
+        :param key: The page field name
+        :param default: Returned when the field has not been decoded, or is not part of the page
+        :return: Returns the field value
+        """
+        return self._fields.get(key, default)
+
+    def next_offset(self, offset: int):
+        """
+        Determines the offset of the next page from the fields preceding the items, so the next page can be
+        requested before this one is consumed
+        :param offset: The offset this page was requested at
+        :return: Returns the next offset, or None if there is no next page or it is not known yet
+        """
+        if self._is_list is True or self.get('_links', {}).get('next') is None:
+            return None
+
+        size = self.get('size')
+        if isinstance(size, int) is False or size == 0:
+            return None
+
+        return self.get('offset', offset) + size
+
+    def items(self):
+        """
+        Streams the decoded, and projected, items of the collection. The page is closed when the items are exhausted
+        or the generator is closed
+        :return: Returns a generator of items
+        """
+        try:
+            while self._in_collection is True:
+                self._skip_whitespace()
+                if self._peek() == ']':
+                    self._pos += 1
+                    self._in_collection = False
+                    break
+
+                item = self._decode_value()
+                yield self._projection.project(item) if self._projection is not None else item
+
+                self._skip_whitespace()
+                if self._peek() == ',':
+                    self._pos += 1
+
+            if self._is_list is False:
+                self._decode_fields()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed is False:
+            self._closed = True
+            if self._on_close is not None:
+                self._on_close()
+
+    # region Private Functions
+
+    def _open(self):
+        self._skip_whitespace()
+        first = self._peek()
+        self._pos += 1
+
+        if first == '[':
+            self._is_list = True
+            self._in_collection = True
+        elif first == '{':
+            self._decode_fields()
+        else:
+            raise ValueError("Expected a JSON object or array, found {0!r}".format(first))
+
+    def _decode_fields(self):
+        """
+        Decodes page fields until the collection array is reached or the page object ends
+        :return:
+        """
+        while True:
+            self._skip_whitespace()
+            char = self._peek()
+            if char == '}':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+
+            key = self._decode_value()
+            self._skip_whitespace()
+            self._expect(':')
+            self._skip_whitespace()
+
+            if key == self._collection_name and self._peek() == '[':
+                self._pos += 1
+                self._in_collection = True
+                return
+
+            self._fields[key] = self._decode_value()
+
+    def _fill(self) -> bool:
+        """
+        Reads the next chunk of the body into the buffer, dropping the consumed text
+        :return: Returns False at the end of the body
+        """
+        if self._eof is True:
+            return False
+
+        text = ""
+        while len(text) == 0:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                text = self._text_decoder.decode(b"", final=True)
+                break
+            text = self._text_decoder.decode(chunk)
+
+        self._buf = self._buf[self._pos:] + text
+        self._pos = 0
+
+        return len(text) > 0 or self._eof is False
+
+    def _peek(self) -> str:
+        while self._pos >= len(self._buf):
+            if self._fill() is False:
+                raise ValueError("Unexpected end of the response body")
+
+        return self._buf[self._pos]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError("Expected {0!r} at response body offset {1}, found {2!r}".format(char, self._pos,
+                                                                                            self._peek()))
+        self._pos += 1
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = self._WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or self._fill() is False:
+                return
+
+    def _decode_value(self):
+        """
+        Decodes the JSON value at the current position, reading more of the body until the value is complete
+        :return: Returns the decoded value
+        """
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buf, self._pos)
+                # A number running to the end of the buffer may continue in the next chunk
+                if end < len(self._buf) or self._eof is True:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof is True:
+                    raise
+
+            self._fill()
+
+    # endregion
+
+
+def open_streamed_page(response, collection_name: str, projection: CaseProjection = None, chunk_size: int = None):
+    """
+    Opens a StreamedPage over a response requested with stream=True. Error responses are read whole and returned as
+    a dict with an 'error' entry, as TestRail sends them.
+    :param response: The requests Response
+    :param collection_name: The key holding the items within a page dict
+    :param projection: Optional CaseProjection applied to every item
+    :param chunk_size: The number of bytes to read at a time. Defaults to StreamedPage.CHUNK_SIZE
+    :return: Returns the StreamedPage, or the error dict
+    """
+    if response.ok is False:
+        try:
+            error = response.json()
+        except ValueError:
+            error = {}
+        finally:
+            response.close()
+
+        if isinstance(error, dict) is False or 'error' not in error:
+            error = {'error': "Status code {0}: {1}".format(response.status_code, response.reason)}
+        return error
+
+    chunk_size = StreamedPage.CHUNK_SIZE if chunk_size is None else chunk_size
+
+    return StreamedPage(response.iter_content(chunk_size), collection_name, projection, on_close=response.close)
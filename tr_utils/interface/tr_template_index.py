@@ -0,0 +1,226 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+import sqlite3
+import threading
+import time
+
+
+class IndexDriftReport:
+    """
+    Differences found between the template index and the suite's test case data
+    """
+
+    def __init__(self):
+        self.missing = []
+        """ Case IDs with a template ID that are not in the index """
+
+        self.stale = []
+        """ Case IDs in the index that no longer exist or no longer have a template ID """
+
+        self.mismatched = []
+        """ Case IDs indexed under a different template ID or section than the case data holds """
+
+    @property
+    def has_drift(self) -> bool:
+        return len(self.missing) > 0 or len(self.stale) > 0 or len(self.mismatched) > 0
+
+    def __repr__(self):
+        return "IndexDriftReport(missing={0}, stale={1}, mismatched={2})".format(len(self.missing), len(self.stale),
+                                                                               len(self.mismatched))
+
+
+class TemplateIndex:
+    """
+    Persistent SQLite index of template ID -> test case IDs.
+
+    Lets a templater run find the cases deriving from a handful of templates without downloading the whole suite.
+    The index is kept current as the templater and TemplateIDGen write cases, and can be verified against or rebuilt
+    from the suite's test case data to correct drift from edits made outside of these utilities.
+
+    Entries are kept per template ID field, a suite templated through several fields has an independent index for
+    each of them.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, db_path: str):
+        """
+        :param db_path: Path of the SQLite database file. Created if it does not exist
+        """
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        with self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(template_index)")]
+            if len(columns) > 0 and 'template_id_field' not in columns:
+                # Entries of indexes created before they were kept per field cannot be attributed to a field
+                self._log.warning("Dropping template index {0} created by an older version, rebuild it with the "
+                                  "templateindex utility".format(db_path))
+                self._conn.execute("DROP TABLE template_index")
+                self._conn.execute("DROP TABLE IF EXISTS indexed_suites")
+
+            self._conn.execute("CREATE TABLE IF NOT EXISTS template_index ("
+                               "case_id INTEGER NOT NULL, template_id_field TEXT NOT NULL, "
+                               "project_id INTEGER NOT NULL, suite_id INTEGER NOT NULL, template_id TEXT NOT NULL, "
+                               "section_id INTEGER, updated_on INTEGER, PRIMARY KEY (case_id, template_id_field))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS template_index_lookup "
+                               "ON template_index (project_id, suite_id, template_id_field, template_id)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS indexed_suites ("
+                               "project_id INTEGER NOT NULL, suite_id INTEGER NOT NULL, template_id_field TEXT NOT NULL, "
+                               "built_on INTEGER NOT NULL, PRIMARY KEY (project_id, suite_id, template_id_field))")
+
+        return
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_built(self, project_id: int, suite_id: int, template_id_field: str) -> bool:
+        """
+        Checks if the index has been built for a project / suite and template ID field
+        :return: Returns True if the index can be used for lookups
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM indexed_suites WHERE project_id = ? AND suite_id = ? AND "
+                                     "template_id_field = ?", (project_id, suite_id, template_id_field)).fetchone()
+
+        return row is not None
+
+    def get_case_ids(self, project_id: int, suite_id: int, template_id_field: str, template_ids: list) -> dict:
+        """
+        Looks up the cases indexed under the provided template IDs
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param template_id_field: The name of the field containing the template ID data
+        :param template_ids: The template IDs to look up
+        :return: Returns a dict of template ID -> list of case IDs. Every requested template ID is present
+        """
+        ret_val = {template_id: [] for template_id in template_ids}
+        by_key = {str(template_id): template_id for template_id in template_ids}
+        keys = list(by_key.keys())
+
+        with self._lock:
+            # Chunked to stay under SQLite's bound parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute("SELECT template_id, case_id FROM template_index WHERE project_id = ? AND "
+                                          "suite_id = ? AND template_id_field = ? AND template_id IN ({0}) "
+                                          "ORDER BY case_id".format(",".join("?" * len(chunk))),
+                                          [project_id, suite_id, template_id_field] + chunk)
+                for template_id, case_id in rows:
+                    ret_val[by_key[template_id]].append(case_id)
+
+        return ret_val
+
+    def upsert_cases(self, project_id: int, suite_id: int, template_id_field: str, cases):
+        """
+        Adds or updates index entries for the provided test cases. Cases without a template ID are removed.
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param template_id_field: The name of the field containing the template ID data
+        :param cases: An iterable of test case dicts, for example update_case responses
+        :return:
+        """
+        rows = []
+        removed = []
+
+        for case in cases:
+            template_id = case.get(template_id_field)
+            if template_id is None or template_id == "":
+                removed.append((case['id'], template_id_field))
+            else:
+                rows.append((case['id'], template_id_field, project_id, suite_id, str(template_id),
+                             case.get('section_id'), case.get('updated_on')))
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO template_index (case_id, template_id_field, project_id, "
+                                   "suite_id, template_id, section_id, updated_on) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany("DELETE FROM template_index WHERE case_id = ? AND template_id_field = ?", removed)
+
+        return
+
+    def rebuild(self, project_id: int, suite_id: int, template_id_field: str, cases) -> int:
+        """
+        Replaces the index entries of a project / suite with entries built from the provided test case data
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param template_id_field: The name of the field containing the template ID data
+        :param cases: An iterable of every test case in the suite
+        :return: Returns the number of cases indexed
+        """
+        rows = []
+
+        for case in cases:
+            template_id = case.get(template_id_field)
+            if template_id is not None and template_id != "":
+                rows.append((case['id'], template_id_field, project_id, suite_id, str(template_id),
+                             case.get('section_id'), case.get('updated_on')))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM template_index WHERE project_id = ? AND suite_id = ? AND "
+                               "template_id_field = ?", (project_id, suite_id, template_id_field))
+            self._conn.executemany("INSERT OR REPLACE INTO template_index (case_id, template_id_field, project_id, "
+                                   "suite_id, template_id, section_id, updated_on) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO indexed_suites (project_id, suite_id, template_id_field, "
+                               "built_on) VALUES (?, ?, ?, ?)",
+                               (project_id, suite_id, template_id_field, int(time.time())))
+
+        self._log.info("Rebuilt the template index for project ID {0} suite ID {1} with {2} test cases"
+                       .format(project_id, suite_id, len(rows)))
+
+        return len(rows)
+
+    def verify(self, project_id: int, suite_id: int, template_id_field: str, cases) -> IndexDriftReport:
+        """
+        Compares the index entries of a project / suite against the provided test case data
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param template_id_field: The name of the field containing the template ID data
+        :param cases: An iterable of every test case in the suite
+        :return: Returns an IndexDriftReport
+        """
+        report = IndexDriftReport()
+
+        with self._lock:
+            indexed = {case_id: (template_id, section_id) for case_id, template_id, section_id in self._conn.execute(
+                "SELECT case_id, template_id, section_id FROM template_index WHERE project_id = ? AND suite_id = ? AND "
+                "template_id_field = ?", (project_id, suite_id, template_id_field))}
+
+        seen = set()
+        for case in cases:
+            template_id = case.get(template_id_field)
+            if template_id is None or template_id == "":
+                continue
+
+            seen.add(case['id'])
+            entry = indexed.get(case['id'])
+            if entry is None:
+                report.missing.append(case['id'])
+            elif entry != (str(template_id), case.get('section_id')):
+                report.mismatched.append(case['id'])
+
+        report.stale = sorted(case_id for case_id in indexed.keys() if case_id not in seen)
+
+        return report
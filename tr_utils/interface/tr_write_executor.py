@@ -0,0 +1,144 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from tr_utils.interface.tr_metrics import submit_in_phase
+
+
+class WriteResult:
+    """
+    The outcome of a single test case write
+    """
+
+    def __init__(self, case_id: int, success: bool, error: str = "", response=None):
+        self.case_id = case_id
+        self.success = success
+        self.error = error
+        self.response = response
+
+    def __repr__(self):
+        return "WriteResult(case_id={0}, success={1}, error={2!r})".format(self.case_id, self.success, self.error)
+
+
+class WriteExecutor:
+    """
+    Executes test case writes through a bounded thread pool.
+
+    Writes are submitted together and run with at most max_workers requests in flight. Results are always returned,
+    and logged, in the order the writes were submitted regardless of the order they complete in.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, write_func, max_workers: int = 1):
+        """
+        :param write_func: Callable taking (case_id, payload) and returning the TestRail response dict
+        :param max_workers: The maximum number of writes in flight at once
+        """
+        self._write_func = write_func
+        self._max_workers = max(1, int(max_workers))
+
+        return
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def execute(self, updates: list, on_result=None) -> list:
+        """
+        Executes the provided writes
+        :param updates: A list of (case_id, payload dict) tuples
+        :param on_result: Optional callable invoked with each WriteResult, in submission order
+        :return: Returns a list of WriteResult in the same order as the updates
+        """
+        if len(updates) == 0:
+            return []
+
+        if self._max_workers == 1:
+            results = []
+            for case_id, payload in updates:
+                result = self._write(case_id, payload)
+                self._report(result, on_result)
+                results.append(result)
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(updates)),
+                                thread_name_prefix="tr_write") as pool:
+            futures = [submit_in_phase(pool, self._write, case_id, payload) for case_id, payload in updates]
+
+            results = []
+            for future in futures:
+                result = future.result()
+                self._report(result, on_result)
+                results.append(result)
+
+        return results
+
+    def _write(self, case_id: int, payload: dict) -> WriteResult:
+        """
+        Performs a single write, capturing any error as a failed WriteResult
+        :param case_id: The test case ID to write
+        :param payload: The field data to write
+        :return: Returns the WriteResult
+        """
+        try:
+            response = self._write_func(case_id, payload)
+        except Exception as e:
+            return WriteResult(case_id, False, str(e))
+
+        if isinstance(response, dict) and 'error' in response:
+            return WriteResult(case_id, False, str(response['error']), response)
+
+        return WriteResult(case_id, True, response=response)
+
+    def _report(self, result: WriteResult, on_result):
+        """
+        Logs a write result and passes it along to the result callback
+        :param result: The WriteResult
+        :param on_result: The optional result callback
+        :return:
+        """
+        if result.success is True:
+            self._log.debug("Updated test case ID: {0}".format(result.case_id))
+        else:
+            self._log.error("Failed to update test case ID: {0}. Error: {1}".format(result.case_id, result.error))
+
+        if on_result is not None:
+            on_result(result)
+
+        return
+
+
+def summarize_results(results: list) -> tuple:
+    """
+    Splits write results into successfully written and failed case IDs
+    :param results: A list of WriteResult
+    :return: Returns a tuple of (updated case ID strings, failed case ID strings)
+    """
+    updated = []
+    failed = []
+
+    for result in results:
+        if result.success is True:
+            updated.append(str(result.case_id))
+        else:
+            failed.append(str(result.case_id))
+
+    return updated, failed
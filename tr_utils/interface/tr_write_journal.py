@@ -0,0 +1,169 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import json
+import logging
+import os
+import threading
+import time
+
+from tr_utils.interface.tr_write_executor import WriteResult
+
+
+class WriteJournal:
+    """
+    Append only JSONL journal of test case write outcomes, used to resume an interrupted write phase.
+
+    The first line identifies the job the journal belongs to. Every following line records one write outcome and is
+    flushed and fsynced before the next write is reported, so a crash loses at most the writes still in flight.
+    Resuming loads the journal and keeps appending to it. The utilities skip the test cases it confirms as written:
+    template ID generation and plan apply skip them outright, the templater and pipeline skip a case only while its
+    template still has the digest journaled with its write, see record.
+    """
+
+    VERSION = 1
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, path: str, job: dict, resume: bool = False, fsync: bool = True):
+        """
+        :param path: The journal file path
+        :param job: JSON serializable description of the job, for example the utility and its parameters. A journal
+        can only be resumed by the job which wrote it
+        :param resume: Load and continue an existing journal rather than starting a new one
+        :param fsync: fsync every record. Disable only where durability does not matter, such as tests
+        """
+        self._path = path
+        self._job = json.loads(json.dumps(job))
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._completed = {}
+        self._failed = set()
+
+        if resume is True:
+            self._load()
+            self._file = open(path, "a")
+        else:
+            self._file = open(path, "w")
+            self._append({"journal": "tr_utils", "version": WriteJournal.VERSION, "job": self._job,
+                          "started": time.time()})
+
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def completed_case_ids(self) -> set:
+        """
+        Property for the test case IDs the journal confirms as written
+        :return: A set of case IDs
+        """
+        with self._lock:
+            return set(self._completed.keys())
+
+    def is_completed(self, case_id) -> bool:
+        with self._lock:
+            return int(case_id) in self._completed
+
+    def completed_digest(self, case_id):
+        """
+        Gets the template digest journaled with the last successful write of a test case
+        :param case_id: The test case ID
+        :return: Returns the digest string, or None if the case was not written or written without a digest
+        """
+        with self._lock:
+            return self._completed.get(int(case_id))
+
+    def record(self, result: WriteResult, digest: str = None):
+        """
+        Appends a write outcome to the journal. Suitable as the on_result callback of TestRailInterface.update_cases
+        :param result: The WriteResult
+        :param digest: Optional digest of the template the written changes were derived from, see TemplatePlan
+        :return:
+        """
+        entry = {"case_id": int(result.case_id), "success": bool(result.success), "error": str(result.error or ""),
+                 "time": time.time()}
+        if digest is not None:
+            entry['digest'] = digest
+
+        with self._lock:
+            self._append(entry)
+            if result.success is True:
+                self._completed[entry['case_id']] = digest
+                self._failed.discard(entry['case_id'])
+            else:
+                self._failed.add(entry['case_id'])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._file.closed is False:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _append(self, entry: dict):
+        self._file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self._file.flush()
+        if self._fsync is True:
+            os.fsync(self._file.fileno())
+
+    def _load(self):
+        """
+        Loads an existing journal, checking it belongs to this job. A partially written last line, left by a crash
+        mid record, is ignored
+        :return:
+        """
+        with open(self._path) as journal_file:
+            lines = journal_file.read().splitlines()
+
+        header = json.loads(lines[0]) if len(lines) > 0 else {}
+        if header.get('journal') != "tr_utils" or header.get('version') != WriteJournal.VERSION:
+            raise ValueError("{0} is not a tr_utils write journal".format(self._path))
+        if header.get('job') != self._job:
+            raise ValueError("Journal {0} was written by a different job: {1}".format(self._path, header.get('job')))
+
+        for line_number, line in enumerate(lines[1:], start=2):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                self._log.warning("Ignoring incomplete journal record on line {0} of {1}".format(line_number,
+                                                                                                self._path))
+                continue
+
+            if entry.get('success') is True:
+                self._completed[entry['case_id']] = entry.get('digest')
+                self._failed.discard(entry['case_id'])
+            else:
+                self._failed.add(entry['case_id'])
+
+        # A partial last line has no newline, start the next record on a line of its own
+        with open(self._path, "rb+") as journal_file:
+            journal_file.seek(0, os.SEEK_END)
+            if journal_file.tell() > 0:
+                journal_file.seek(-1, os.SEEK_END)
+                if journal_file.read(1) != b"\n":
+                    journal_file.write(b"\n")
+
+        self._log.info("Resuming from journal {0}: {1} test cases already written, {2} failed writes to retry"
+                       .format(self._path, len(self._completed), len(self._failed - self._completed.keys())))
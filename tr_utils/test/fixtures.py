@@ -16,9 +16,24 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # ********************************************************
 
+import warnings
+
+from ..interface.tr_interface import TestRailInterface
 from ..utils.tr_templater import TestRailTemplater
 
 
+def stub_interface(server, **kwargs) -> TestRailInterface:
+    """
+    Creates a TestRailInterface talking to a FakeTestRailServer, ignoring the warning about its plain HTTP URL
+    :param server: The started FakeTestRailServer
+    :param kwargs: Further TestRailInterface arguments
+    :return: Returns the TestRailInterface
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return TestRailInterface(server.url, "user", "key", **kwargs)
+
+
 class fixture_data:
 
     #region General Test Rail Data
@@ -0,0 +1,160 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import asyncio
+import copy
+import unittest
+
+from .fixtures import fixture_data
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_async_interface import AsyncHttpTransport, AsyncTestRailInterface, httpx
+from ..utils.tr_gen_template_ids import TemplateIDGen
+from ..utils.tr_templater import TestRailTemplater
+
+
+class _DroppingClient:
+    """
+    Stands in for an httpx.AsyncClient whose every request finds its connection dropped
+    """
+
+    def __init__(self):
+        self.requests = 0
+
+    async def request(self, method, url, json=None):
+        self.requests += 1
+        raise httpx.RemoteProtocolError("Server disconnected without sending a response")
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestAsyncTestRailInterface(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        self.server = FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=3).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _run(self, coro_func):
+        async def runner():
+            async with AsyncTestRailInterface(self.server.url, "user", "key", max_in_flight=4) as tr:
+                return await coro_func(tr)
+
+        return asyncio.run(runner())
+
+    def test_paginated_retrieval(self):
+        """
+        Test cases and sections are retrieved across every page
+        :return:
+        """
+        # Large enough for the first page to be sent compressed
+        self.server.cases[2]['custom_notes'] = "Long notes " * 200
+
+        async def retrieve(tr):
+            return await asyncio.gather(tr.retrieve_testcase_data(1, 1), tr.retrieve_sections_data(1, 1),
+                                        tr.suites_get_default_suite(1))
+
+        cases, sections, suite_id = self._run(retrieve)
+
+        self.assertEqual([1, 2, 3, 4], [case['id'] for case in cases])
+        self.assertEqual(6, len(sections))
+        self.assertEqual(1, suite_id)
+        self.assertEqual(2, len(self.server.requests_for("get_cases")))
+        # Compressed pages are requested and decoded
+        self.assertGreater(self.server.compressed_responses, 0)
+        self.assertEqual("Long notes " * 200, cases[1]['custom_notes'])
+
+    def test_only_idempotent_requests_retried(self):
+        """
+        Test a request whose connection drops is retried once when it is a GET, and not at all when it is a write
+        the server may already have processed
+        :return:
+        """
+        transport = AsyncHttpTransport(self.server.url, "user", "key")
+
+        for method, expected_requests in (("GET", 2), ("POST", 1)):
+            client = _DroppingClient()
+            with self.assertRaises(httpx.RemoteProtocolError):
+                asyncio.run(transport._send(client, method, "update_case/1", None))
+            self.assertEqual(expected_requests, client.requests)
+
+    def test_reuse_across_event_loops(self):
+        """
+        Test one interface can be used from consecutive asyncio.run calls, and close releases every loop's connections
+        :return:
+        """
+        tr = AsyncTestRailInterface(self.server.url, "user", "key", max_in_flight=2)
+
+        async def retrieve():
+            return await asyncio.gather(*[tr.retrieve_testcase_data(1, 1) for _ in range(4)])
+
+        first = asyncio.run(retrieve())
+        second = asyncio.run(retrieve())
+        self.assertEqual(2, len(tr.transport._loop_states))
+
+        asyncio.run(tr.close())
+
+        self.assertEqual([[1, 2, 3, 4]] * 4, [[case['id'] for case in cases] for cases in first])
+        self.assertEqual(first, second)
+        # The idle connections of the loops closed by the earlier runs are released as well
+        self.assertEqual(0, len(tr.transport._loop_states))
+
+    def test_update_case_error(self):
+        """
+        Test error responses are surfaced as failed write results
+        :return:
+        """
+        results = self._run(lambda tr: tr.update_cases([(1, {"title": "New title"}), (99, {"title": "Missing"})]))
+
+        self.assertTrue(results[0].success)
+        self.assertFalse(results[1].success)
+        self.assertEqual("New title", self.server.cases[1]["title"])
+
+    def test_execute_templater_async(self):
+        """
+        Test the async templater writes the templated steps to the derived cases
+        :return:
+        """
+        async def templater(tr):
+            return await TestRailTemplater(tr, 1, "custom_templateid", "custom_steps", section_ids_csv="1",
+                                           tr_suite_id=1).execute_templater_async()
+
+        self.assertEqual(0, self._run(templater))
+        self.assertEqual(self.fixture_data.case_one["custom_steps"], self.server.cases[3]["custom_steps"])
+        self.assertEqual("Step 2", self.server.cases[4]["custom_steps"][1]["content"])
+        self.assertEqual("Non-Template Step 3", self.server.cases[4]["custom_steps"][3]["content"])
+
+    def test_execute_id_gen_async(self):
+        """
+        Test the async template ID generation writes new template IDs under the child sections
+        :return:
+        """
+        async def id_gen(tr):
+            return await TemplateIDGen(tr, "custom_templateid", 1, 1, section_ids_csv="2").execute_id_gen_async()
+
+        self.assertEqual(0, self._run(id_gen))
+        self.assertEqual(32, len(self.server.cases[3]["custom_templateid"]))
+        self.assertEqual(32, len(self.server.cases[4]["custom_templateid"]))
+        self.assertEqual(1, self.server.cases[1]["custom_templateid"])
+        self.assertEqual([["custom_templateid"]] * 2,
+                         [list(request[3].keys()) for request in self.server.requests_for("update_case")])
+
+
+if __name__ == '__main__':
+    unittest.main()
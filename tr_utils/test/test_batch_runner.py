@@ -0,0 +1,189 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import argparse
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..commands.batch import BatchCommand
+from ..utils.tr_batch_runner import BatchRunner, format_report, load_batch_file
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        suite_one = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                                   self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        suite_two = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_templated_one])
+        for case in suite_two:
+            case['id'] += 10
+            case['suite_id'] = 2
+        suite_two[0]['custom_steps'] = [{"content": "Suite 2 step", "expected": ""}]
+
+        self.server = FakeTestRailServer(suite_one + suite_two, self.fixture_data.sections_list,
+                                         suites=[{"id": 1, "name": "Master"}, {"id": 2, "name": "Other"}],
+                                         page_size=2).start()
+        self.tr = stub_interface(self.server, write_concurrency=2)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def _write_batch_file(self, batch_data, file_name: str = "batch.json") -> str:
+        path = os.path.join(self.temp_dir.name, file_name)
+        with open(path, "w") as batch_file:
+            json.dump(batch_data, batch_file)
+        return path
+
+    def test_load_batch_file_validation(self):
+        """
+        Test batch files are validated job by job
+        :return:
+        """
+        path = self._write_batch_file([{"util": "templater", "project_id": 1, "template_id_field": "custom_templateid",
+                                        "fields": ["custom_steps", "title"], "case_ids": [1, 2]}])
+        batch_data = load_batch_file(path)
+        self.assertEqual({}, batch_data['settings'])
+        self.assertEqual("custom_steps,title", batch_data['jobs'][0].fields)
+        self.assertEqual("1,2", batch_data['jobs'][0].case_ids)
+
+        yaml_path = os.path.join(self.temp_dir.name, "batch.yaml")
+        with open(yaml_path, "w") as yaml_file:
+            yaml_file.write("settings:\n  dry_run: true\njobs:\n  - util: templateidgen\n    project_id: 1\n"
+                            "    template_id_field: custom_templateid\n    section_ids: [1, 2]\n")
+        try:
+            batch_data = load_batch_file(yaml_path)
+            self.assertTrue(batch_data['settings']['dry_run'])
+            self.assertEqual("1,2", batch_data['jobs'][0].section_ids)
+        except ValueError:
+            # PyYAML is optional
+            pass
+
+        for bad_job in ({"util": "unknown", "project_id": 1, "template_id_field": "f", "case_ids": "1"},
+                        {"util": "templateidgen", "project_id": 1, "template_id_field": "f"},
+                        {"util": "templater", "project_id": 1, "template_id_field": "f", "case_ids": "1"},
+                        {"util": "templateidgen", "project_id": 1, "template_id_field": "f", "case_ids": "1",
+                         "dry_run": "false"},
+                        {"util": "templateidgen", "project_id": 1, "template_id_field": "f", "section_ids": "1",
+                         "include_child_sections": 0}):
+            with self.assertRaises(ValueError):
+                load_batch_file(self._write_batch_file({"jobs": [bad_job]}))
+
+        with self.assertRaises(ValueError):
+            load_batch_file(self._write_batch_file({"settings": {"dry_run": "no"}, "jobs": []}))
+
+    def test_jobs_share_suite_data(self):
+        """
+        Test jobs on one suite share one fetch and run in order, while another suite runs alongside them
+        :return:
+        """
+        path = self._write_batch_file({"settings": {"max_parallel_suites": 2}, "jobs": [
+            {"name": "template suite 1", "util": "templater", "project_id": 1, "template_id_field": "custom_templateid",
+             "fields": "custom_steps,title", "case_ids": "1,2"},
+            {"name": "regenerate IDs", "util": "templateidgen", "project_id": 1, "suite_id": 1,
+             "template_id_field": "custom_templateid", "section_ids": [6], "include_child_sections": False},
+            {"name": "template suite 2", "util": "templater", "project_id": 1, "suite_id": 2,
+             "template_id_field": "custom_templateid", "fields": "custom_steps", "case_ids": "11"}]})
+        batch_data = load_batch_file(path)
+
+        results = BatchRunner(self.tr, batch_data['jobs'], batch_data['settings']['max_parallel_suites']).run()
+
+        self.assertEqual([0, 0, 0], [result.exit_code for result in results])
+        self.assertEqual([1, 1, 2], [result.suite_id for result in results])
+        self.assertEqual([3, 4], sorted(result.case_id for result in results[0].write_results))
+        self.assertEqual(self.fixture_data.case_one['custom_steps'], self.server.cases[3]['custom_steps'])
+        # The ID gen job ran after the templater job, over the same fetched cases
+        self.assertEqual(32, len(self.server.cases[4]['custom_templateid']))
+        self.assertEqual([{"content": "Suite 2 step", "expected": ""}], self.server.cases[13]['custom_steps'])
+
+        self.assertEqual(1, len(self.server.requests_for("get_suites")))
+        # Two pages of suite 1, fetched once for both of its jobs, and one page of suite 2
+        self.assertEqual(3, len(self.server.requests_for("get_cases")))
+        self.assertIn("template suite 2", format_report(results))
+
+    def test_suite_groups_overlap_requests(self):
+        """
+        Test the batch command sizes the request limit so suite groups run their requests alongside each other with
+        the default concurrency of 1
+        :return:
+        """
+        path = self._write_batch_file({"jobs": [
+            {"util": "templater", "project_id": 1, "suite_id": 1, "template_id_field": "custom_templateid",
+             "fields": "custom_steps", "case_ids": "1,2"},
+            {"util": "templater", "project_id": 1, "suite_id": 2, "template_id_field": "custom_templateid",
+             "fields": "custom_steps", "case_ids": "11"}]})
+        params = argparse.Namespace(jobfile=path, parallel=2, concurrency=1, requestconcurrency=None, poolsize=None,
+                                    report=None, dryrun=None)
+        self.assertIsNone(BatchCommand.prepare(params))
+        self.assertEqual(4, params.requestconcurrency)
+
+        self.server.latency = 0.2
+        tr = stub_interface(self.server, write_concurrency=params.concurrency,
+                            request_concurrency=params.requestconcurrency, pool_size=params.poolsize)
+
+        self.assertEqual(0, BatchCommand.execute_util(params, tr))
+        self.assertGreaterEqual(self.server.max_in_flight, 2)
+
+    def test_dry_run_and_failed_suite_lookup(self):
+        """
+        Test the dry run default and per job override, and that a failed suite lookup only fails its own jobs
+        :return:
+        """
+        self.server.suites = []
+        path = self._write_batch_file({"jobs": [
+            {"util": "templater", "project_id": 1, "template_id_field": "custom_templateid", "fields": "type_id",
+             "case_ids": "1"},
+            {"util": "templater", "project_id": 1, "suite_id": 1, "template_id_field": "custom_templateid",
+             "fields": "type_id", "case_ids": "1"},
+            {"util": "templater", "project_id": 1, "suite_id": 2, "template_id_field": "custom_templateid",
+             "fields": "type_id", "case_ids": "11", "dry_run": False}]})
+
+        results = BatchRunner(self.tr, load_batch_file(path)['jobs'], dry_run=True).run()
+
+        self.assertEqual([1, 0, 0], [result.exit_code for result in results])
+        self.assertIn("default suite", results[0].error)
+        self.assertEqual(2, self.server.cases[3]['type_id'])
+        self.assertEqual(1, self.server.cases[13]['type_id'])
+
+    def test_dry_run_job_does_not_hide_changes_from_later_jobs(self):
+        """
+        Test a dry run job's in memory changes to the shared suite data do not leak into a real job after it
+        :return:
+        """
+        job = {"util": "templater", "project_id": 1, "suite_id": 1, "template_id_field": "custom_templateid",
+               "fields": "custom_steps,title", "case_ids": "1,2"}
+        path = self._write_batch_file({"jobs": [dict(job, dry_run=True), dict(job, dry_run=False)]})
+
+        results = BatchRunner(self.tr, load_batch_file(path)['jobs']).run()
+
+        self.assertEqual([0, 0], [result.exit_code for result in results])
+        self.assertEqual([], results[0].write_results)
+        self.assertEqual([3, 4], sorted(result.case_id for result in results[1].write_results))
+        self.assertEqual(2, len(self.server.requests_for("update_case")))
+        self.assertEqual(self.fixture_data.case_one['custom_steps'], self.server.cases[3]['custom_steps'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import time
+import unittest
+
+from .fixtures import stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..bench.generators import SyntheticSuite, generate_suite
+from ..bench.runner import run_benchmark
+
+
+class TestBench(unittest.TestCase):
+    def test_generate_suite(self):
+        """
+        Test the generated suite has the requested size and fan-out, and is the same for the same seed
+        :return:
+        """
+        suite = generate_suite(1100, template_fanout=10, cases_per_section=50)
+
+        self.assertEqual(1100, len(suite))
+        self.assertEqual(100, suite.template_count)
+        self.assertEqual(100, len([case for case in suite.cases
+                                   if case['section_id'] == SyntheticSuite.template_section_id]))
+        self.assertEqual(suite.unassigned_count,
+                         len([case for case in suite.cases if case[SyntheticSuite.template_id_field] is None]))
+        self.assertTrue(0 < suite.stale_count < 1000)
+        # 1000 derived cases, 50 per leaf section, under one group section
+        self.assertEqual(2 + 1 + 20, len(suite.sections))
+        self.assertEqual(repr(suite), repr(generate_suite(1100, template_fanout=10, cases_per_section=50)))
+
+    def test_fake_server_throttles(self):
+        """
+        Test requests over the fake server's throttle rate are answered with 429 and retried by the interface
+        :return:
+        """
+        suite = generate_suite(50)
+        with FakeTestRailServer(suite.cases, suite.sections, page_size=5, throttle_rate=20) as server:
+            # The repeated reads are the load, keep them from being memoized
+            tr = stub_interface(server, read_memo=False)
+
+            started = time.monotonic()
+            for _ in range(3):
+                self.assertEqual(50, len(tr.retrieve_testcase_data(1, 1)))
+
+            self.assertGreater(server.throttled_count, 0)
+            self.assertEqual(server.throttled_count, tr.rate_controller.stats()['throttled'])
+            self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+    def test_run_benchmark(self):
+        """
+        Test a small end to end benchmark run of both utilities
+        :return:
+        """
+        templater = run_benchmark("templater", 220, template_fanout=10, page_size=50)
+        self.assertEqual(0, templater.exit_code)
+        # suite lookup, sections, 5 case pages and one write per stale case
+        self.assertEqual(1 + 1 + 5 + templater.settings['stale'], templater.request_count)
+        self.assertGreater(templater.requests_per_second, 0)
+
+        id_gen = run_benchmark("templateidgen", 220, template_fanout=10, page_size=50)
+        self.assertEqual(0, id_gen.exit_code)
+        # sections, 5 case pages and one write per case with no template ID
+        self.assertEqual(1 + 5 + id_gen.settings['unassigned'], id_gen.request_count)
+
+        with self.assertRaises(ValueError):
+            run_benchmark("unknown", 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import unittest
+
+from .fixtures import fixture_data
+from ..utils.tr_case_classifier import CaseClassifier
+
+
+class TestCaseClassifier(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.cases = [self.fixture_data.case_one, self.fixture_data.case_two, self.fixture_data.case_templated_one,
+                      self.fixture_data.case_templated_two]
+
+    def test_classify_by_sections(self):
+        """
+        Test template cases are found by section and derived cases are bucketed by template ID
+        :return:
+        """
+        classifier = CaseClassifier("custom_templateid", section_ids=[1, 3])
+        result = classifier.classify(self.cases)
+
+        self.assertEqual({1: self.fixture_data.case_one, 2: self.fixture_data.case_two}, result.template_cases)
+        self.assertEqual([self.fixture_data.case_templated_one], result.cases_to_update[1])
+        self.assertEqual([self.fixture_data.case_templated_two], result.cases_to_update[2])
+        self.assertEqual(4, result.cases_scanned)
+        self.assertFalse(result.has_duplicates)
+
+    def test_classify_by_case_ids(self):
+        """
+        Test template cases are found by case ID
+        :return:
+        """
+        classifier = CaseClassifier("custom_templateid", case_ids=["2"])
+        result = classifier.classify(iter(self.cases))
+
+        self.assertEqual([2], list(result.template_cases.keys()))
+        self.assertEqual({2}, result.template_case_ids)
+        self.assertEqual([self.fixture_data.case_templated_two], result.cases_to_update[2])
+
+    def test_duplicate_template_ids(self):
+        """
+        Test duplicate template IDs are reported and the first template case is kept
+        :return:
+        """
+        duplicate = dict(self.fixture_data.case_two, id=7, custom_templateid=1)
+        classifier = CaseClassifier("custom_templateid", case_ids=[1, 7])
+        result = classifier.classify(self.cases + [duplicate])
+
+        self.assertEqual(self.fixture_data.case_one, result.template_cases[1])
+        self.assertEqual({1: [7]}, result.duplicate_template_ids)
+        self.assertEqual([self.fixture_data.case_templated_one], result.cases_to_update[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
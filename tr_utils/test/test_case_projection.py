@@ -0,0 +1,112 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import gc
+import json
+import tracemalloc
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..bench.generators import SyntheticSuite, generate_suite
+from ..interface.tr_case_projection import CaseProjection, CaseRecord
+from ..utils.tr_gen_template_ids import TemplateIDGen
+
+
+class TestCaseProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+
+    def test_record_mapping_interface(self):
+        """
+        Test projected records behave like the raw case dicts for the projected fields only
+        :return:
+        """
+        record = CaseProjection(['section_id', 'custom_templateid', 'custom_missing']).project(
+            self.fixture_data.case_templated_one)
+
+        self.assertIsInstance(record, CaseRecord)
+        self.assertEqual(['id', 'section_id', 'custom_templateid'], record.keys())
+        self.assertEqual({"id": 3, "section_id": 5, "custom_templateid": 1}, record)
+        self.assertEqual(5, record['section_id'])
+        self.assertIsNone(record.get('custom_missing'))
+        self.assertFalse('title' in record)
+        with self.assertRaises(KeyError):
+            record['title']
+        with self.assertRaises(KeyError):
+            record.update({"title": "Not projected"})
+
+        record.update({"custom_templateid": 2, "custom_missing": "set"})
+        self.assertEqual(2, record['custom_templateid'])
+        self.assertEqual("set", record['custom_missing'])
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_invalid_field_names(self):
+        """
+        Test field names which cannot be record slots are rejected
+        :return:
+        """
+        for field in ("custom field", "_private", "keys"):
+            with self.assertRaises(ValueError):
+                CaseProjection([field])
+
+    def test_projection_memory(self):
+        """
+        Test projecting decoded test cases to the fields template ID generation reads retains at least 10x less
+        memory than the decoded cases
+        :return:
+        """
+        payload = json.dumps(generate_suite(2000).cases)
+        projection = CaseProjection(TemplateIDGen.get_case_fields(SyntheticSuite.template_id_field))
+
+        def retained(load):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                data = load()
+                return tracemalloc.get_traced_memory()[0], len(data)
+            finally:
+                tracemalloc.stop()
+
+        full_size, full_count = retained(lambda: json.loads(payload))
+        projected_size, projected_count = retained(lambda: list(projection.project_all(json.loads(payload))))
+
+        self.assertEqual(full_count, projected_count)
+        self.assertGreaterEqual(full_size / projected_size, 10)
+
+    def test_interface_projection(self):
+        """
+        Test the interface projects retrieved test cases, and test cases retrieved by ID
+        :return:
+        """
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        with FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2) as server:
+            tr = stub_interface(server, write_concurrency=2)
+
+            records = tr.retrieve_testcase_data(1, 1, fields=['section_id', 'custom_templateid'])
+            self.assertEqual([1, 2, 3, 4], [record['id'] for record in records])
+            self.assertTrue(all(record.keys() == ['id', 'section_id', 'custom_templateid'] for record in records))
+
+            by_ids = tr.retrieve_testcase_data_by_ids([4, 99], fields=['section_id'])
+            self.assertEqual([{"id": 4, "section_id": 6}], by_ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..utils.tr_change_plan import ChangePlan, ChangePlanApplier
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestChangePlan(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "plan.jsonl")
+
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        for case in cases:
+            case['updated_on'] = 1000
+        self.server = FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2).start()
+        self.tr = stub_interface(self.server, write_concurrency=2)
+
+        self.templater = TestRailTemplater(self.tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1,2")
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def test_plan_writes_nothing(self):
+        """
+        Test planning streams the per case deltas to the plan file without writing to TestRail
+        :return:
+        """
+        self.assertEqual(0, self.templater.execute_templater(plan_path=self.path))
+        self.assertEqual(0, len(self.server.requests_for("update_case")))
+
+        plan = ChangePlan(self.path)
+        self.assertEqual((1, 1, "custom_templateid", ["custom_steps"]),
+                         (plan.project_id, plan.suite_id, plan.template_id_field, plan.fields))
+
+        entries = sorted(plan.entries(), key=lambda entry: entry['case_id'])
+        self.assertEqual([3, 4], [entry['case_id'] for entry in entries])
+        self.assertEqual([1, 2], [entry['template_id'] for entry in entries])
+        self.assertEqual([1000, 1000], [entry['updated_on'] for entry in entries])
+        self.assertEqual(self.fixture_data.case_one['custom_steps'], entries[0]['changes']['custom_steps'])
+        self.assertEqual(32, len(entries[0]['template_digest']))
+
+    def test_apply_writes_plan(self):
+        """
+        Test applying a plan writes the planned changes
+        :return:
+        """
+        self.templater.execute_templater(plan_path=self.path)
+
+        applier = ChangePlanApplier(self.tr, self.path)
+        self.assertEqual(0, applier.execute_apply())
+        self.assertEqual(2, len(self.server.requests_for("update_case")))
+        self.assertEqual(self.fixture_data.case_one['custom_steps'], self.server.cases[3]['custom_steps'])
+        template_steps = self.fixture_data.case_two['custom_steps']
+        self.assertEqual(template_steps, self.server.cases[4]['custom_steps'][:len(template_steps)])
+
+        # The conflict check is a single filtered stream, not a request per planned case
+        self.assertEqual(0, len(self.server.requests_for("get_case/")))
+
+    def test_apply_skips_changed_targets(self):
+        """
+        Test applying a plan skips the test cases updated since planning
+        :return:
+        """
+        self.templater.execute_templater(plan_path=self.path)
+        self.server.cases[4]['title'] = "Edited after planning"
+        self.server.cases[4]['updated_on'] = int(time.time())
+
+        applier = ChangePlanApplier(self.tr, self.path)
+        self.assertEqual(6, applier.execute_apply())
+        self.assertEqual([4], applier.conflicted_case_ids)
+        self.assertEqual(["3"], [str(result.case_id) for result in applier.write_results])
+        self.assertEqual(self.fixture_data.case_templated_two['custom_steps'], self.server.cases[4]['custom_steps'])
+
+    def test_apply_aborts_on_failed_conflict_check(self):
+        """
+        Test applying a plan writes nothing when the check for test cases changed since planning fails
+        :return:
+        """
+        self.templater.execute_templater(plan_path=self.path)
+        self.server.cases[4]['custom_steps'] = [{"content": "Edited after planning", "expected": ""}]
+        self.server.cases[4]['updated_on'] = int(time.time())
+        self.server.injected_responses.append((400, {"error": "Field :suite_id is not a valid test suite."}))
+
+        applier = ChangePlanApplier(self.tr, self.path)
+        self.assertEqual(7, applier.execute_apply())
+        self.assertEqual(0, len(self.server.requests_for("update_case")))
+        self.assertEqual("Edited after planning", self.server.cases[4]['custom_steps'][0]['content'])
+
+    def test_apply_rejects_other_files(self):
+        """
+        Test applying a file which is not a change plan fails without writing
+        :return:
+        """
+        with open(self.path, "w") as plan_file:
+            plan_file.write(json.dumps({"journal": "tr_utils", "version": 1}) + "\n")
+
+        self.assertEqual(1, ChangePlanApplier(self.tr, self.path).execute_apply())
+        self.assertEqual(0, len(self.server.requests_for("update_case")))
+
+
+if __name__ == '__main__':
+    unittest.main()
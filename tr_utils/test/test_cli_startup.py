@@ -0,0 +1,167 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import os
+import subprocess
+import sys
+import types
+import unittest
+from unittest import mock
+import warnings
+
+from .fixtures import fixture_data
+from ..bench.fake_server import FakeTestRailServer
+from ..bench.startup import IMPORT_BUDGET_RATIO, measure_import_ratio, measure_import_times
+from .. import commands
+from ..commands.common import UtilCommand
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_CLI_PATH = os.path.join(_REPO_ROOT, "tr_utils_cli.py")
+
+
+def _run_python(code: str, *options) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + list(options) + ["-c", code], cwd=_REPO_ROOT, capture_output=True,
+                          text=True, timeout=60)
+
+
+@unittest.skipUnless(os.path.exists(_CLI_PATH), "tr_utils_cli.py is not part of this installation")
+class TestCliStartup(unittest.TestCase):
+
+    HEAVY_MODULES = ("requests", "testrail_api", "importlib.metadata", "tr_utils.interface.tr_interface",
+                     "tr_utils.utils.tr_templater", "tr_utils.utils.tr_gen_template_ids",
+                     "tr_utils.utils.tr_batch_runner")
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+
+    def test_heavy_modules_not_imported(self):
+        """
+        Test importing the CLI imports neither the interface, its HTTP dependencies nor any utility
+        :return:
+        """
+        imports = measure_import_times()
+
+        self.assertIn("tr_utils_cli", imports)
+        for module in self.HEAVY_MODULES:
+            self.assertNotIn(module, imports)
+
+    @unittest.skipIf(os.environ.get("TR_UTILS_SKIP_TIMING_TESTS"), "TR_UTILS_SKIP_TIMING_TESTS is set")
+    def test_import_time_budget(self):
+        """
+        Test importing the CLI stays within its import time budget, measured relative to importing argparse in a bare
+        interpreter so the budget holds on slow machines. Set TR_UTILS_SKIP_TIMING_TESTS to skip on noisy runners
+        :return:
+        """
+        self.assertLessEqual(measure_import_ratio("tr_utils_cli", "argparse"), IMPORT_BUDGET_RATIO)
+
+    def test_only_selected_command_imported(self):
+        """
+        Test parsing the arguments of a built-in utility imports only that utility's command module
+        :return:
+        """
+        result = _run_python("import sys, tr_utils_cli\n"
+                             "args = tr_utils_cli._setup_arg_parsers(['-trprojid', '1', 'templateindex', '-tfname', "
+                             "'custom_tr_template_id', '-rebuild'])\n"
+                             "print(args.util, args.tfname, args.rebuild, args.command.__name__)\n"
+                             "print(','.join(sorted(m for m in sys.modules if m.startswith('tr_utils.commands.'))))")
+        self.assertEqual(0, result.returncode, result.stderr)
+        self.assertEqual(["templateindex custom_tr_template_id True TemplateIndexCommand",
+                          "tr_utils.commands.common,tr_utils.commands.template_index"],
+                         result.stdout.splitlines())
+
+    def test_registry(self):
+        """
+        Test every built-in command loads as a UtilCommand, and unknown names and incomplete commands are rejected
+        :return:
+        """
+        self.assertEqual(list(commands.BUILTIN_COMMANDS.keys()),
+                         list(commands.available_commands(scan_entry_points=False).keys()))
+        for name in commands.BUILTIN_COMMANDS.keys():
+            self.assertTrue(issubclass(commands.load_command(name), UtilCommand))
+
+        with self.assertRaises(KeyError):
+            commands.load_command("no_such_utility")
+
+        class IncompleteCommand(UtilCommand):
+            @staticmethod
+            def setup_args(util_parser):
+                return
+
+        entry_point = types.SimpleNamespace(load=lambda: IncompleteCommand)
+        with mock.patch.object(commands, "_entry_points", return_value={"incomplete": entry_point}):
+            with self.assertRaises(TypeError):
+                commands.load_command("incomplete")
+
+    def test_entry_point_command_selected(self):
+        """
+        Test a command declared by an entry point is selectable when an option value matches a built-in command name
+        :return:
+        """
+        sys.path.insert(0, _REPO_ROOT)
+        try:
+            import tr_utils_cli
+        finally:
+            sys.path.remove(_REPO_ROOT)
+
+        class PluginCommand(UtilCommand):
+            @staticmethod
+            def setup_args(util_parser):
+                util_parser.add_argument("-tfname", type=str)
+
+            @staticmethod
+            def execute_util(util_params, tr_instance):
+                return 0
+
+        entry_point = types.SimpleNamespace(load=lambda: PluginCommand)
+        with mock.patch.object(commands, "_entry_points", return_value={"mycmd": entry_point}):
+            parsed_args = tr_utils_cli._setup_arg_parsers(["-trprojid", "1", "mycmd", "-tfname", "templater"])
+
+        self.assertIs(PluginCommand, parsed_args.command)
+        self.assertEqual("templater", parsed_args.tfname)
+
+    def test_dispatch(self):
+        """
+        Test the CLI dispatches to the selected utility
+        :return:
+        """
+        sys.path.insert(0, _REPO_ROOT)
+        try:
+            import tr_utils_cli
+        finally:
+            sys.path.remove(_REPO_ROOT)
+
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        with FakeTestRailServer(cases, self.fixture_data.sections_list) as server:
+            parsed_args = tr_utils_cli._setup_arg_parsers(["-trurl", server.url, "-truser", "user", "-trpass", "key",
+                                                           "-trprojid", "1", "-dryrun", "true", "templater",
+                                                           "-tcids", "1,2", "-tfname", "custom_templateid",
+                                                           "-f", "custom_steps"])
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                self.assertEqual(0, tr_utils_cli._select_and_execute_util(parsed_args))
+
+            self.assertGreater(len(server.requests_for("get_cases")), 0)
+            self.assertEqual(0, len(server.requests_for("update_case")))
+
+            parsed_args = tr_utils_cli._setup_arg_parsers(["templater", "-tcids", "1", "-f", "custom_steps"])
+            self.assertEqual(1, tr_utils_cli._select_and_execute_util(parsed_args))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import unittest
+from unittest import mock
+
+from ..bench.generators import SyntheticSuite, generate_suite
+from ..utils.tr_case_classifier import CaseClassifier
+from ..utils.tr_diff_pool import ProcessDiffEngine
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestProcessDiffEngine(unittest.TestCase):
+
+    def setUp(self):
+        suite = generate_suite(2000, template_fanout=20, steps_per_case=6)
+        self.fields = SyntheticSuite.template_fields_csv.split(',')
+        self.end_marker = TestRailTemplater.get_default_end_marker()
+        self.classification = CaseClassifier(SyntheticSuite.template_id_field,
+                                             section_ids=[SyntheticSuite.template_section_id]).classify(suite.cases)
+
+    @staticmethod
+    def _flatten(results) -> list:
+        return [(template_id, template_digest, case['id'], changes)
+                for template_id, template_digest, changed_cases in results for case, changes in changed_cases]
+
+    def _diff(self, diff_engine: ProcessDiffEngine) -> list:
+        return self._flatten(diff_engine.diff(self.classification.template_cases,
+                                              self.classification.cases_to_update))
+
+    def test_pool_matches_in_process(self):
+        """
+        Test diffing in worker processes returns the same changes, in the same order, as diffing in process
+        :return:
+        """
+        in_process = self._diff(ProcessDiffEngine(self.fields, self.end_marker, max_workers=1))
+        in_pool = self._diff(ProcessDiffEngine(self.fields, self.end_marker, max_workers=2, min_pool_cases=0))
+
+        self.assertGreater(len(in_process), 0)
+        self.assertEqual(in_process, in_pool)
+
+    def test_large_template_split_over_shards(self):
+        """
+        Test a template with more derived cases than fit a shard is split over several shards
+        :return:
+        """
+        template_id = next(iter(self.classification.template_cases.keys()))
+        template_cases = {template_id: self.classification.template_cases[template_id]}
+        cases = [copy.deepcopy(case) for case in self.classification.cases_to_update[template_id] * 10]
+        for case_id, case in enumerate(cases, start=1):
+            case['id'] = case_id
+        cases_to_update = {template_id: cases}
+
+        diff_engine = ProcessDiffEngine(self.fields, self.end_marker, max_workers=2, min_pool_cases=0)
+        shards = diff_engine._build_shards(template_cases, cases_to_update, len(cases))
+        self.assertEqual(ProcessDiffEngine.SHARDS_PER_WORKER * 2, len(shards))
+        self.assertEqual(cases[-1]['id'], shards[-1][-1][2][-1][0])
+
+        expected = self._flatten(ProcessDiffEngine(self.fields, self.end_marker, max_workers=1)
+                                 .diff(template_cases, cases_to_update))
+        self.assertEqual(expected, self._flatten(diff_engine.diff(template_cases, cases_to_update)))
+
+    def test_templater_diff_workers(self):
+        """
+        Test the templater applies the changes found by worker processes to the case data
+        :return:
+        """
+        templater_args = (None, 1, SyntheticSuite.template_id_field, SyntheticSuite.template_fields_csv, "1")
+        cases_to_update = copy.deepcopy(self.classification.cases_to_update)
+
+        expected = TestRailTemplater(*templater_args)._diff_test_cases(self.classification.template_cases,
+                                                                       cases_to_update)
+        with mock.patch.object(ProcessDiffEngine, "MIN_POOL_CASES", 0):
+            changes = TestRailTemplater(*templater_args, diff_workers=2)._diff_test_cases(
+                self.classification.template_cases, self.classification.cases_to_update)
+
+        self.assertEqual(expected, changes)
+        self.assertEqual(cases_to_update, self.classification.cases_to_update)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,7 +18,8 @@
 
 import unittest
 
-from .fixtures import fixture_data
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
 from ..interface.tr_interface import TestRailInterface
 
 
@@ -74,5 +75,34 @@ class TestTestRailInterface(unittest.TestCase):
 
     # endregion Sections Test
 
+    # region Pagination Test
+
+    def test_iter_testcase_data_pages(self):
+        """
+        Test test case data is streamed across every page
+        :return:
+        """
+        cases = [dict(self.fixture_data.case_one, id=case_id) for case_id in range(1, 8)]
+
+        with FakeTestRailServer(cases, page_size=3) as server:
+            tr = stub_interface(server)
+            streamed = [case['id'] for case in tr.iter_testcase_data(1, 1, page_size=3, prefetch=True)]
+
+            self.assertEqual(list(range(1, 8)), streamed)
+            self.assertEqual(3, len(server.requests_for("get_cases")))
+
+    def test_retrieve_unpaginated(self):
+        """
+        Test servers returning a plain list are read with a single request
+        :return:
+        """
+        with FakeTestRailServer(sections=self.fixture_data.sections_list) as server:
+            tr = stub_interface(server)
+
+            self.assertEqual(self.fixture_data.sections_list, tr.retrieve_sections_data(1, 1))
+            self.assertEqual(1, len(server.requests_for("get_sections")))
+
+    # endregion Pagination Test
+
 if __name__ == '__main__':
     unittest.main()
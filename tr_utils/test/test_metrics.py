@@ -0,0 +1,122 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_metrics import ApiCallHook, endpoint_name
+from ..utils.tr_templater import TestRailTemplater
+
+
+class _RecordingHook(ApiCallHook):
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_call(self, event):
+        self.before.append((event.endpoint, event.phase, event.status))
+
+    def after_call(self, event):
+        self.after.append(event)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        self.server = FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2).start()
+        self.tr = stub_interface(self.server, write_concurrency=2)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_endpoint_name(self):
+        self.assertEqual("get_cases", endpoint_name("http://tr/index.php?/api/v2/get_cases/1&suite_id=2"))
+        self.assertEqual("update_case", endpoint_name("http://tr/index.php?/api/v2/update_case/15"))
+        self.assertEqual("other", endpoint_name("http://tr/index.php"))
+
+    def test_hooks_fire_around_calls(self):
+        """
+        Test hooks see every call before and after it is made, with the phase, status, sizes and retries
+        :return:
+        """
+        hook = _RecordingHook()
+        self.tr.add_call_hook(hook)
+        self.server.injected_responses = [(429, {"Retry-After": "0"})]
+
+        with self.tr.phase("case_fetch"):
+            self.assertEqual(4, len(self.tr.retrieve_testcase_data(1, 1)))
+        self.tr.update_cases([(3, {"title": "New title"})])
+
+        self.assertEqual([("get_cases", "case_fetch", None)] * 2 + [("update_case", None, None)], hook.before)
+        self.assertEqual(1, hook.after[0].retries)
+        self.assertEqual(200, hook.after[0].status)
+        self.assertGreater(hook.after[0].bytes_in, 0)
+        self.assertGreater(hook.after[2].bytes_out, 0)
+        self.assertEqual("POST", hook.after[2].method)
+
+        self.tr.remove_call_hook(hook)
+        self.tr.suites_get_default_suite(1)
+        self.assertEqual(3, len(hook.after))
+
+    def test_templater_phases_exported(self):
+        """
+        Test the templater's calls are tagged with their phase and exported as JSON and Prometheus text
+        :return:
+        """
+        templater = TestRailTemplater(self.tr, 1, "custom_templateid", "custom_steps,title", section_ids_csv="1,2",
+                                      get_all_child_sections=False)
+        self.assertEqual(0, templater.execute_templater())
+
+        metrics = self.tr.metrics.to_dict()
+        self.assertEqual({"suite_lookup", "case_fetch", "write"}, set(metrics['phases'].keys()))
+        self.assertEqual(1, metrics['phases']['suite_lookup']['count'])
+        self.assertEqual(2, metrics['phases']['case_fetch']['count'])
+        # Only case 1 is in a template section, so only case 3 is templated
+        self.assertEqual(1, metrics['phases']['write']['count'])
+        self.assertEqual(4, metrics['totals']['count'])
+
+        update_case = [endpoint for endpoint in metrics['endpoints'] if endpoint['endpoint'] == "update_case"][0]
+        self.assertEqual({"200": 1}, update_case['statuses'])
+        self.assertEqual(1, update_case['latency_buckets']['+Inf'])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = os.path.join(temp_dir, "metrics.json")
+            prom_path = os.path.join(temp_dir, "metrics.prom")
+            self.tr.metrics.write_json(json_path)
+            self.tr.metrics.write_prometheus(prom_path)
+
+            with open(json_path) as json_file:
+                self.assertEqual(4, json.load(json_file)['totals']['count'])
+            with open(prom_path) as prom_file:
+                prom = prom_file.read()
+
+        self.assertIn('testrail_api_requests_total{endpoint="update_case",method="POST",status="200"} 1', prom)
+        self.assertIn('testrail_api_request_duration_seconds_bucket{endpoint="get_cases",method="GET",le="+Inf"} 2',
+                      prom)
+        self.assertIn('testrail_api_phase_requests_total{phase="write"} 1', prom)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import sys
+import unittest
+
+from ..bench.micro import DEFAULT_MAX_EXPONENT, ScalingResult, scaling_exponent
+from ..interface import tr_section_tree
+from ..interface.tr_section_tree import SectionTree
+from ..utils.tr_case_classifier import CaseClassifier
+
+
+class _OpCounter:
+    def __init__(self):
+        self.count = 0
+
+
+class _CountingDict(dict):
+    """ dict counting its key reads """
+
+    def __init__(self, data, counter: _OpCounter):
+        super().__init__(data)
+        self._counter = counter
+
+    def __getitem__(self, key):
+        self._counter.count += 1
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self._counter.count += 1
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self._counter.count += 1
+        return super().get(key, default)
+
+
+def _count_lines(counter: _OpCounter, module, func, *args):
+    """
+    Calls a function, counting the lines executed in a module's code while it runs, so the work done behind a public
+    API is counted without reaching into its internals
+    :return: Returns the function's return value
+    """
+    def local_tracer(frame, event, arg):
+        if event == "line":
+            counter.count += 1
+        return local_tracer
+
+    def tracer(frame, event, arg):
+        return local_tracer if frame.f_code.co_filename == module.__file__ else None
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        return func(*args)
+    finally:
+        sys.settrace(previous)
+
+
+class _CountingID(int):
+    """ ID counting its hashes and comparisons """
+
+    counter = None
+
+    def __hash__(self):
+        _CountingID.counter.count += 1
+        return super().__hash__()
+
+    def __eq__(self, other):
+        _CountingID.counter.count += 1
+        return super().__eq__(other)
+
+
+class TestMicroBench(unittest.TestCase):
+    # The timed scaling check of the hot paths is run with python -m tr_utils.bench.micro. The tests below count
+    # operations instead, so they are deterministic
+
+    SIZES = (1000, 4000, 16000)
+
+    def test_section_tree_expand_is_linear(self):
+        """
+        Test building and expanding deep and wide section trees reads each section, and runs the tree's code, a
+        constant number of times per section
+        :return:
+        """
+        def chain(size):
+            return [{"id": sec_id, "parent_id": sec_id - 1 if sec_id > 1 else None} for sec_id in range(1, size + 1)]
+
+        def wide(size):
+            return [{"id": sec_id, "parent_id": None if sec_id == 1 else 1 + (sec_id - 2) // 50}
+                    for sec_id in range(1, size + 1)]
+
+        for build in (chain, wide):
+            points = []
+            for size in self.SIZES:
+                counter = _OpCounter()
+                sections = [_CountingDict(section, counter) for section in build(size)]
+                tree = _count_lines(counter, tr_section_tree, SectionTree, sections)
+
+                self.assertEqual(size, len(_count_lines(counter, tr_section_tree, tree.expand, [1])))
+                self.assertEqual(size, len(_count_lines(counter, tr_section_tree, tree.expand, range(1, size + 1))))
+                points.append((size, counter.count))
+
+            self.assertLess(scaling_exponent(points), DEFAULT_MAX_EXPONENT, "{0}: {1}".format(build.__name__, points))
+
+    def test_classify_is_linear(self):
+        """
+        Test classifying a suite reads each case and hashes or compares each ID a constant number of times
+        :return:
+        """
+        points = []
+        for size in self.SIZES:
+            counter = _OpCounter()
+            _CountingID.counter = counter
+            template_count = size // 10
+            cases = [{"id": _CountingID(case_id), "section_id": _CountingID(1 if case_id <= template_count else 2),
+                      "custom_templateid": _CountingID(1 + case_id % template_count)}
+                     for case_id in range(1, size + 1)]
+            cases = [_CountingDict(case, counter) for case in cases]
+            counter.count = 0
+
+            classification = CaseClassifier("custom_templateid", section_ids=[1]).classify(cases)
+
+            self.assertEqual(template_count, len(classification.template_cases))
+            self.assertEqual(size - template_count, sum(len(bucket) for bucket in
+                                                        classification.cases_to_update.values()))
+            points.append((size, counter.count))
+
+        self.assertLess(scaling_exponent(points), DEFAULT_MAX_EXPONENT, str(points))
+
+    def test_scaling_exponent(self):
+        """
+        Test the fitted exponent of linear and quadratic timings
+        :return:
+        """
+        self.assertAlmostEqual(1.0, scaling_exponent([(1000, 0.001), (10000, 0.01), (100000, 0.1)]))
+        self.assertAlmostEqual(2.0, scaling_exponent([(1000, 0.001), (10000, 0.1), (100000, 10.0)]))
+
+        result = ScalingResult("quadratic", [(1000, 0.001, 0), (10000, 0.1, 0)])
+        self.assertTrue(result.is_superlinear())
+
+
+if __name__ == '__main__':
+    unittest.main()
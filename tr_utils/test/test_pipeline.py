@@ -0,0 +1,110 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..utils.tr_gen_template_ids import TemplateIDGen
+from ..utils.tr_pipeline import TemplatePipeline
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestTemplatePipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+
+        # A newly added template case, in a child section of the template section, without a template ID
+        case_new = copy.deepcopy(self.fixture_data.case_one)
+        case_new.update({"id": 5, "title": "Case 5", "section_id": 4, "custom_templateid": None})
+        self.cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                                    self.fixture_data.case_templated_one, self.fixture_data.case_templated_two,
+                                    case_new])
+
+    def _start(self):
+        server = FakeTestRailServer(copy.deepcopy(self.cases), self.fixture_data.sections_list, page_size=2).start()
+        self.addCleanup(server.stop)
+        tr = stub_interface(server, read_memo=False)
+
+        return server, tr
+
+    def test_pipeline(self):
+        """
+        Test the pipeline generates the missing template ID and templates the derived cases from one retrieval of
+        the suite, writing each test case once
+        :return:
+        """
+        server, tr = self._start()
+        pipeline = TemplatePipeline(tr, 1, "custom_templateid", "custom_steps", section_ids_csv="1")
+        self.assertEqual(0, pipeline.execute_pipeline())
+
+        # One retrieval each, of 6 sections and 5 test cases in pages of 2
+        self.assertEqual(3, len(server.requests_for("get_sections")))
+        self.assertEqual(3, len(server.requests_for("get_cases")))
+        self.assertEqual(["3", "4", "5"], sorted(str(result.case_id) for result in pipeline.write_results))
+        self.assertEqual(3, len(server.requests_for("update_case")))
+
+        self.assertEqual(32, len(server.cases[5]['custom_templateid']))
+        self.assertEqual(1, server.cases[1]['custom_templateid'])
+        self.assertEqual(self.fixture_data.case_one['custom_steps'], server.cases[3]['custom_steps'])
+
+    def test_pipeline_halves_reads(self):
+        """
+        Test the pipeline makes half the read requests of running template ID generation and then the templater
+        :return:
+        """
+        server, tr = self._start()
+        TemplateIDGen(tr, "custom_templateid", 1, None, section_ids_csv="1", overwrite_existing_id=False) \
+            .execute_id_gen()
+        TestRailTemplater(tr, 1, "custom_templateid", "custom_steps", section_ids_csv="1").execute_templater()
+        separate_reads = len(server.requests_for("get_cases")) + len(server.requests_for("get_sections"))
+
+        pipeline_server, pipeline_tr = self._start()
+        TemplatePipeline(pipeline_tr, 1, "custom_templateid", "custom_steps", section_ids_csv="1").execute_pipeline()
+        pipeline_reads = len(pipeline_server.requests_for("get_cases")) + \
+            len(pipeline_server.requests_for("get_sections"))
+
+        self.assertEqual(separate_reads, 2 * pipeline_reads)
+        self.assertEqual(len(server.requests_for("update_case")), len(pipeline_server.requests_for("update_case")))
+        for case_id in (3, 4):
+            self.assertEqual(server.cases[case_id]['custom_steps'], pipeline_server.cases[case_id]['custom_steps'])
+
+    def test_dry_run(self):
+        """
+        Test a dry run writes nothing
+        :return:
+        """
+        server, tr = self._start()
+        self.assertEqual(0, TemplatePipeline(tr, 1, "custom_templateid", "custom_steps",
+                                             case_ids_csv="1,2").execute_pipeline(dry_run=True))
+        self.assertEqual(0, len(server.requests_for("update_case")))
+
+    def test_merge_case_changes(self):
+        """
+        Test the changes of each stage merge into one change per test case, in first changed order
+        :return:
+        """
+        merged = TemplatePipeline._merge_case_changes([(5, {"custom_templateid": "a"}), (3, {"title": "x"})],
+                                                      [(3, {"custom_steps": []}), (5, {"title": "y"})])
+        self.assertEqual([(5, {"custom_templateid": "a", "title": "y"}), (3, {"title": "x", "custom_steps": []})],
+                         merged)
+
+
+if __name__ == '__main__':
+    unittest.main()
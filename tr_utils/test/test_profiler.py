@@ -0,0 +1,104 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+from .fixtures import stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..bench.generators import SyntheticSuite, generate_suite
+from ..interface.tr_interface import TestRailInterface
+from ..utils.tr_profiler import PhaseProfiler
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    def test_nested_phases_exclusive(self):
+        """
+        Test time spent in a nested phase is only charged to the nested phase
+        :return:
+        """
+        tr = TestRailInterface(skip_login=True)
+        profiler = PhaseProfiler()
+        tr.add_phase_listener(profiler)
+
+        with profiler:
+            with tr.phase("classify"):
+                time.sleep(0.05)
+                for _ in tr.phased([1, 2], "case_fetch"):
+                    pass
+                with tr.phase("case_fetch"):
+                    time.sleep(0.1)
+            time.sleep(0.02)
+
+        timings = profiler.timings()
+        self.assertEqual(1, timings['classify']['entries'])
+        self.assertEqual(4, timings['case_fetch']['entries'])
+        self.assertGreaterEqual(timings['case_fetch']['seconds'], 0.1)
+        self.assertLess(timings['classify']['seconds'], 0.1)
+        self.assertGreaterEqual(timings['untagged']['seconds'], 0.02)
+        self.assertAlmostEqual(profiler.total_seconds, sum(timing['seconds'] for timing in timings.values()),
+                               places=6)
+
+        with self.assertRaises(ValueError):
+            PhaseProfiler("unknown")
+
+    def test_profile_templater(self):
+        """
+        Test a profiled templater run reports every phase and writes both CPU profile formats
+        :return:
+        """
+        suite = generate_suite(3000, cases_per_section=100)
+
+        with FakeTestRailServer(suite.cases, suite.sections, page_size=250) as server, \
+                tempfile.TemporaryDirectory() as temp_dir:
+            for cpu_profiler, file_name in (("sample", "profile.collapsed"), ("cprofile", "profile.prof")):
+                tr = stub_interface(server)
+                profiler = PhaseProfiler(cpu_profiler, sample_interval=0.001)
+                tr.add_phase_listener(profiler)
+
+                templater = TestRailTemplater(tr, SyntheticSuite.project_id, SyntheticSuite.template_id_field,
+                                              SyntheticSuite.template_fields_csv,
+                                              section_ids_csv=str(SyntheticSuite.template_section_id))
+                with profiler:
+                    self.assertEqual(0, templater.execute_templater(dry_run=True))
+
+                timings = profiler.timings()
+                for phase in ("suite_lookup", "section_expansion", "case_fetch", "classify", "diff"):
+                    self.assertIn(phase, timings)
+                self.assertIn("case_fetch", profiler.report(tr.metrics))
+
+                path = os.path.join(temp_dir, file_name)
+                profiler.write_cpu_profile(path)
+                if cpu_profiler == "sample":
+                    with open(path) as collapsed_file:
+                        lines = collapsed_file.read().splitlines()
+                    self.assertGreater(len(lines), 0)
+                    for line in lines:
+                        stack, count = line.rsplit(" ", 1)
+                        self.assertIn(stack.split(";")[0], PhaseProfiler.CPU_PHASES)
+                        self.assertGreater(int(count), 0)
+                else:
+                    self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
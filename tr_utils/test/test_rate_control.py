@@ -0,0 +1,146 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import threading
+import time
+import types
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_rate_control import AdaptiveConcurrencyLimiter, RateController, TokenBucket
+
+
+class TestRateControl(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.server = FakeTestRailServer([self.fixture_data.case_one], page_size=10).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_retry_after_honored(self):
+        """
+        Test throttled requests wait for Retry-After and are retried, for writes as well as reads
+        :return:
+        """
+        tr = stub_interface(self.server, write_concurrency=4)
+        self.server.injected_responses = [(429, {"Retry-After": "0.2"}), (429, {"Retry-After": "0"})]
+
+        started = time.monotonic()
+        results = tr.update_cases([(1, {"title": "Throttled"})])
+
+        self.assertTrue(results[0].success)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual("Throttled", self.server.cases[1]["title"])
+
+        stats = tr.rate_controller.stats()
+        self.assertEqual(2, stats['throttled'])
+        self.assertEqual(2, stats['retries'])
+        # 4 halved twice, then one slot regained by the successful retry
+        self.assertEqual(2, stats['concurrency_limit'])
+
+    def test_server_errors_retried_for_reads_only(self):
+        """
+        Test 5xx responses are retried for idempotent reads but not for writes
+        :return:
+        """
+        tr = stub_interface(self.server)
+        tr.rate_controller._backoff_base = 0.01
+
+        self.server.injected_responses = [(503, {}), (502, {})]
+        self.assertEqual(1, len(tr.retrieve_testcase_data(1, 1)))
+
+        self.server.injected_responses = [(503, {})]
+        self.assertFalse(tr.update_cases([(1, {"title": "Not retried"})])[0].success)
+        self.assertEqual(3, tr.rate_controller.stats()['server_errors'])
+
+    def test_token_bucket_rate(self):
+        """
+        Test the token bucket holds requests to the configured rate after the initial burst
+        :return:
+        """
+        bucket = TokenBucket(rate=50, burst=1)
+        started = time.monotonic()
+        for i in range(0, 11):
+            bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+    def test_aimd_limit(self):
+        """
+        Test the concurrency limit halves when throttled and recovers additively
+        :return:
+        """
+        limiter = AdaptiveConcurrencyLimiter(8)
+        limiter.on_throttled()
+        limiter.on_throttled()
+        self.assertEqual(2, limiter.limit)
+
+        for i in range(0, 3):
+            limiter.on_success()
+        self.assertEqual(3, limiter.limit)
+
+        for i in range(0, 100):
+            limiter.on_success()
+        self.assertEqual(8, limiter.limit)
+
+    def test_burst_of_throttles_counted_once(self):
+        """
+        Test requests throttled together cut the concurrency limit once and count the pause once
+        :return:
+        """
+        controller = RateController(max_concurrency=8)
+        in_flight = threading.Barrier(4)
+        throttled = set()
+
+        def send():
+            if threading.get_ident() not in throttled:
+                throttled.add(threading.get_ident())
+                in_flight.wait()
+                return types.SimpleNamespace(status_code=429, headers={"Retry-After": "0.2"})
+            return types.SimpleNamespace(status_code=200, headers={})
+
+        threads = [threading.Thread(target=controller.execute, args=(send, True)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = controller.stats()
+        self.assertEqual(4, stats['throttled'])
+        self.assertEqual(4, stats['retries'])
+        # 8 halved once, the successful retries regain less than a slot
+        self.assertEqual(4, stats['concurrency_limit'])
+        self.assertTrue(0.15 <= stats['backoff_seconds'] < 0.3, stats['backoff_seconds'])
+
+    def test_retry_after_http_date(self):
+        """
+        Test Retry-After given as an HTTP date is understood
+        :return:
+        """
+        controller = RateController()
+        delay = controller._parse_retry_after(time.strftime("%a, %d %b %Y %H:%M:%S GMT",
+                                                            time.gmtime(time.time() + 30)))
+
+        self.assertTrue(25 <= delay <= 31)
+        self.assertEqual(controller._DEFAULT_RETRY_AFTER, controller._parse_retry_after("soon"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import copy
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_read_memo import ReadMemo
+
+
+def _response(content: bytes, status_code: int = 200) -> requests.Response:
+    response = requests.Response()
+    response._content = content
+    response.status_code = status_code
+    return response
+
+
+class TestReadMemo(unittest.TestCase):
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+
+    def test_coalesces_concurrent_reads(self):
+        """
+        Test identical reads in flight at once are sent once, every caller getting its own copy of the response
+        :return:
+        """
+        memo = ReadMemo()
+        release = threading.Event()
+        sent = []
+
+        def send():
+            sent.append(1)
+            release.wait(5)
+            return _response(b'{"id": 1}')
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(memo.fetch, "get_case", "get_case/1", {}, send) for _ in range(8)]
+            while memo.misses + memo.coalesced < 8:
+                threading.Event().wait(0.01)
+            release.set()
+            responses = [future.result() for future in futures]
+
+        self.assertEqual(1, len(sent))
+        self.assertEqual(8, len(set(id(response) for response in responses)))
+        self.assertTrue(all(response.json() == {"id": 1} for response in responses))
+        self.assertEqual(7, memo.coalesced)
+
+        kept = memo.fetch("get_case", "get_case/1", {}, send)
+        self.assertNotIn(id(kept), set(id(response) for response in responses))
+        self.assertEqual({"id": 1}, kept.json())
+        self.assertEqual(1, memo.hits)
+        self.assertIsNot(responses[0], memo.fetch("get_case", "get_case/1", {"suite_id": 1}, send))
+
+    def test_two_threads_read_same_key(self):
+        """
+        Test two threads reading the same key at once get separate responses, also when the response is not kept
+        :return:
+        """
+        for status_code, content in ((200, b'{"id": 1}'), (404, b'{"error": "Not found"}')):
+            memo = ReadMemo()
+            release = threading.Event()
+            sent = []
+
+            def send():
+                sent.append(1)
+                release.wait(5)
+                return _response(content, status_code)
+
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                first = pool.submit(memo.fetch, "get_case", "get_case/1", {}, send)
+                while memo.misses < 1:
+                    threading.Event().wait(0.01)
+                second = pool.submit(memo.fetch, "get_case", "get_case/1", {}, send)
+                while memo.coalesced < 1:
+                    threading.Event().wait(0.01)
+                release.set()
+                first, second = first.result(), second.result()
+
+            self.assertEqual(1, len(sent))
+            self.assertIsNot(first, second)
+            self.assertEqual((status_code, content), (first.status_code, first.content))
+            self.assertEqual((status_code, content), (second.status_code, second.content))
+
+            # Changes a caller makes to its response do not reach the other
+            first.encoding = "latin-1"
+            first.headers["X-Changed"] = "1"
+            self.assertIsNone(second.encoding)
+            self.assertNotIn("X-Changed", second.headers)
+            self.assertEqual(1 if status_code == 200 else 0, len(memo))
+
+    def test_budget_errors_and_invalidation(self):
+        """
+        Test the byte budget evicts least recently used responses, failures are not kept and invalidation drops the
+        kept responses, as well as the responses of reads in flight
+        :return:
+        """
+        memo = ReadMemo(max_bytes=10)
+        for case_id in range(3):
+            memo.fetch("get_case", "get_case/{0}".format(case_id), {}, lambda: _response(b"1234"))
+        self.assertEqual((2, 8), (len(memo), memo.size))
+
+        memo.fetch("get_case", "get_case/9", {}, lambda: _response(b"{}", 404))
+        with self.assertRaises(ConnectionError):
+            memo.fetch("get_case", "get_case/8", {}, self._raise_connection_error)
+        self.assertEqual(2, len(memo))
+
+        def send_invalidated():
+            memo.invalidate("get_cases")
+            return _response(b"[]")
+
+        memo.fetch("get_cases", "get_cases/1", {}, send_invalidated)
+        self.assertEqual(2, len(memo))
+
+        memo.invalidate("get_case", "get_case/2")
+        self.assertEqual(1, len(memo))
+
+    @staticmethod
+    def _raise_connection_error():
+        raise ConnectionError("Connection reset")
+
+    def test_interface_memoizes_reads(self):
+        """
+        Test repeated interface reads are served from the memo until a test case write invalidates them
+        :return:
+        """
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        with FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2) as server:
+            tr = stub_interface(server)
+
+            request_counts = []
+            for _ in range(2):
+                self.assertEqual(1, tr.suites_get_default_suite(1))
+                self.assertEqual(len(self.fixture_data.sections_list), len(tr.retrieve_sections_data(1, 1)))
+                first = tr.retrieve_testcase_data(1, 1)
+                self.assertEqual(4, len(first))
+                request_counts.append(server.request_count)
+
+            self.assertEqual(request_counts[0], request_counts[1])
+            self.assertEqual(1, len(server.requests_for("get_suites")))
+            self.assertEqual(2, len(server.requests_for("get_cases")))
+            self.assertEqual(server.request_count, tr.metrics.to_dict()['totals']['count'])
+
+            # Memoized responses decode to new objects every time, changes to one read do not leak into the next
+            first[0]['title'] = "Changed locally"
+            self.assertEqual("Case 1", tr.retrieve_testcase_data(1, 1)[0]['title'])
+
+            tr.update_case(3, {"title": "Changed remotely"})
+            self.assertEqual("Changed remotely", tr.retrieve_testcase_data(1, 1)[2]['title'])
+            self.assertEqual(4, len(server.requests_for("get_cases")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import unittest
+
+from .fixtures import fixture_data
+from ..interface.tr_section_tree import SectionTree
+
+
+class TestSectionTree(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.tree = SectionTree(self.fixture_data.sections_list)
+
+    def test_descendants_preorder(self):
+        """
+        Test descendants are returned in pre-order without the parent section
+        :return:
+        """
+        self.assertEqual([3, 4], self.tree.get_descendants(self.fixture_data.section_one["id"]))
+        self.assertEqual([], self.tree.get_descendants(self.fixture_data.section_grandchild_two["id"]))
+
+    def test_is_descendant(self):
+        """
+        Test the interval check for sections under a root
+        :return:
+        """
+        self.assertTrue(self.tree.is_descendant(4, 1))
+        self.assertTrue(self.tree.is_descendant(1, 1))
+        self.assertFalse(self.tree.is_descendant(1, 1, include_self=False))
+        self.assertFalse(self.tree.is_descendant(5, 1))
+        self.assertFalse(self.tree.is_descendant(1, 4))
+
+    def test_expand_overlapping_roots(self):
+        """
+        Test overlapping roots are de-duplicated, regardless of the order they are provided in
+        :return:
+        """
+        secs = self.tree.expand([3, 1, 4])
+
+        self.assertEqual([1, 3, 4], secs)
+
+    def test_expand_unknown_root(self):
+        """
+        Test roots missing from the sections data are kept without any descendants
+        :return:
+        """
+        secs = self.tree.expand(["2", 99])
+
+        self.assertEqual([2, 5, 6, 99], secs)
+
+    def test_deep_tree(self):
+        """
+        Test a deep section chain does not hit the recursion limit
+        :return:
+        """
+        depth = 20000
+        sections = [{"id": 1, "parent_id": None}]
+        sections.extend({"id": i, "parent_id": i - 1} for i in range(2, depth + 1))
+        tree = SectionTree(sections)
+
+        self.assertEqual(depth - 1, len(tree.get_descendants(1)))
+        self.assertTrue(tree.is_descendant(depth, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
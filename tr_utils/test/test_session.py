@@ -0,0 +1,74 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        cases = []
+        for case_id in range(1, 41):
+            case = dict(self.fixture_data.case_one)
+            case['id'] = case_id
+            case['custom_steps_separated'] = [{"content": "Step {0} ".format(i) * 20, "expected": ""}
+                                              for i in range(10)]
+            cases.append(case)
+        self.server = FakeTestRailServer(cases, page_size=10).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_pool_sized_to_concurrency(self):
+        """
+        Test the session's pool defaults to the write concurrency plus one, and can be set explicitly
+        :return:
+        """
+        self.assertEqual(5, stub_interface(self.server, write_concurrency=4)._session.pool_size)
+        self.assertEqual(12, stub_interface(self.server, write_concurrency=4, pool_size=12)._session.pool_size)
+
+    def test_connections_reused(self):
+        """
+        Test concurrent requests are served over the pooled keep-alive connections rather than new connections
+        :return:
+        """
+        tr = stub_interface(self.server, write_concurrency=4)
+        case_data = tr.retrieve_testcase_data_by_ids(list(range(1, 41)))
+
+        self.assertEqual(40, len(case_data))
+        self.assertEqual(40, len(self.server.requests))
+        self.assertLessEqual(len(self.server.connections), tr._session.pool_size)
+
+    def test_responses_compressed(self):
+        """
+        Test large responses are requested, and decoded, gzip compressed
+        :return:
+        """
+        tr = stub_interface(self.server)
+        case_data = tr.retrieve_testcase_data(1, 1)
+
+        self.assertEqual(40, len(case_data))
+        self.assertEqual(4, self.server.compressed_responses)
+        self.assertEqual(10, len(case_data[0]['custom_steps_separated']))
+
+
+if __name__ == '__main__':
+    unittest.main()
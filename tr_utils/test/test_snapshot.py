@@ -0,0 +1,110 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import shutil
+import tempfile
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_snapshot import SuiteSnapshot
+
+
+class TestSuiteSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.snapshot_dir = tempfile.mkdtemp()
+        cases = [dict(self.fixture_data.case_one, id=case_id, updated_on=100) for case_id in range(1, 6)]
+        self.server = FakeTestRailServer(cases, page_size=2).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_incremental_refresh(self):
+        """
+        Test later runs only request cases updated since the last sync
+        :return:
+        """
+        tr = stub_interface(self.server, snapshot_dir=self.snapshot_dir)
+        self.assertEqual(5, len(tr.retrieve_testcase_data(1, 1)))
+
+        stub_interface(self.server, snapshot_dir=self.snapshot_dir).update_case(2, {"title": "Changed"})
+        self.server.requests.clear()
+
+        tr = stub_interface(self.server, snapshot_dir=self.snapshot_dir)
+        cases = {case['id']: case for case in tr.retrieve_testcase_data(1, 1)}
+
+        self.assertEqual("Changed", cases[2]["title"])
+        self.assertEqual(5, len(cases))
+        self.assertEqual(1, len(self.server.requests_for("get_cases")))
+        self.assertIn("updated_after", self.server.requests_for("get_cases")[0][2])
+
+    def test_reconcile_deletions(self):
+        """
+        Test deleted cases are removed by the reconcile pass
+        :return:
+        """
+        stub_interface(self.server, snapshot_dir=self.snapshot_dir).retrieve_testcase_data(1, 1)
+        del self.server.cases[3]
+
+        tr = stub_interface(self.server, snapshot_dir=self.snapshot_dir)
+        snapshot = SuiteSnapshot(self.snapshot_dir, 1, 1, reconcile_interval=0)
+        snapshot.refresh(lambda **filters: tr._iter_server_testcase_data(1, 1, raise_errors=True, **filters))
+
+        self.assertEqual([1, 2, 4, 5], sorted(case['id'] for case in snapshot.cases()))
+
+    def test_rejected_write_drops_deleted_case(self):
+        """
+        Test a write rejected because the case was deleted drops the case from the snapshot before the next reconcile
+        :return:
+        """
+        stub_interface(self.server, snapshot_dir=self.snapshot_dir).retrieve_testcase_data(1, 1)
+        del self.server.cases[3]
+
+        tr = stub_interface(self.server, snapshot_dir=self.snapshot_dir)
+        self.assertEqual(5, len(tr.retrieve_testcase_data(1, 1)))
+        with self.assertRaises(Exception):
+            tr.update_case(3, {"title": "Changed"})
+
+        self.assertEqual([1, 2, 4, 5], sorted(case['id'] for case in tr.retrieve_testcase_data(1, 1)))
+        self.server.requests.clear()
+        tr = stub_interface(self.server, snapshot_dir=self.snapshot_dir)
+        self.assertEqual([1, 2, 4, 5], sorted(case['id'] for case in tr.retrieve_testcase_data(1, 1)))
+        self.assertEqual(1, len(self.server.requests_for("get_cases")))
+
+    def test_failed_refresh_keeps_snapshot(self):
+        """
+        Test a failed refresh does not advance the snapshot
+        :return:
+        """
+        stub_interface(self.server, snapshot_dir=self.snapshot_dir).retrieve_testcase_data(1, 1)
+        snapshot = SuiteSnapshot(self.snapshot_dir, 1, 1)
+        snapshot.load()
+        synced_at = snapshot.synced_at
+
+        def failing_fetch(**filters):
+            raise ConnectionError("Server unavailable")
+
+        self.assertFalse(snapshot.refresh(failing_fetch))
+        snapshot.load()
+        self.assertEqual(synced_at, snapshot.synced_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
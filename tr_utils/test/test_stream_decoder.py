@@ -0,0 +1,146 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+import json
+import tracemalloc
+import unittest
+
+from .fixtures import stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..bench.generators import SyntheticSuite, generate_suite
+from ..interface.tr_case_projection import CaseProjection
+from ..interface.tr_stream_decoder import StreamedPage
+
+
+def _chunked(payload: bytes, size: int):
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+class TestStreamDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.suite = generate_suite(120, seed=3)
+        self.suite.cases[0]['title'] = "Ünïcode tïtle ✓"
+        self.page = {"offset": 0, "limit": 250, "size": len(self.suite.cases),
+                     "_links": {"next": None, "prev": None}, "cases": self.suite.cases}
+
+    def test_decodes_any_chunking(self):
+        """
+        Test pages decode the same whatever the chunk boundaries, including ones splitting numbers and multi byte
+        characters
+        :return:
+        """
+        payload = json.dumps(self.page, ensure_ascii=False, indent=1).encode('utf-8')
+
+        for size in (1, 3, 7, 64, 4096, len(payload)):
+            page = StreamedPage(_chunked(payload, size), "cases")
+            self.assertEqual(len(self.suite.cases), page.get('size'))
+            self.assertIsNone(page.next_offset(0))
+            self.assertEqual(self.suite.cases, list(page.items()))
+
+    def test_fields_after_items(self):
+        """
+        Test page fields sent after the items are decoded once the items are consumed
+        :return:
+        """
+        page_data = {"cases": self.suite.cases[:5], "offset": 10, "_links": {"next": "/api/v2/get_cases/1&offset=15"}}
+        page = StreamedPage(_chunked(json.dumps(page_data).encode('utf-8'), 100), "cases")
+
+        self.assertIsNone(page.get('offset'))
+        self.assertEqual(self.suite.cases[:5], list(page.items()))
+        self.assertEqual(10, page.get('offset'))
+        self.assertIsNotNone(page.get('_links')['next'])
+
+    def test_bare_list_and_projection(self):
+        """
+        Test bare arrays, as sent before TestRail 6.7, stream their items, projected when a projection is given
+        :return:
+        """
+        projection = CaseProjection(['section_id'])
+        page = StreamedPage(_chunked(json.dumps(self.suite.cases).encode('utf-8'), 500), "cases", projection)
+
+        self.assertTrue(page.is_list)
+        self.assertEqual([{"id": case['id'], "section_id": case['section_id']} for case in self.suite.cases],
+                         list(page.items()))
+
+    def test_truncated_body(self):
+        """
+        Test a body cut off mid item raises rather than ending the items early
+        :return:
+        """
+        payload = json.dumps(self.page).encode('utf-8')
+        page = StreamedPage(_chunked(payload[:len(payload) // 2], 1000), "cases")
+
+        with self.assertRaises(ValueError):
+            list(page.items())
+
+        with self.assertRaises(ValueError):
+            StreamedPage(iter([b'"not a page"']), "cases")
+
+    def test_streamed_projection_peak_memory(self):
+        """
+        Test streaming a page with projection peaks well below decoding the page whole
+        :return:
+        """
+        payload = json.dumps(self.page).encode('utf-8')
+        fields = ['section_id', SyntheticSuite.template_id_field]
+
+        def peak(decode):
+            tracemalloc.start()
+            try:
+                result = decode()
+                return tracemalloc.get_traced_memory()[1], result
+            finally:
+                tracemalloc.stop()
+
+        buffered_peak, buffered = peak(
+            lambda: list(CaseProjection(fields).project_all(json.loads(payload.decode('utf-8'))['cases'])))
+        streamed_peak, streamed = peak(
+            lambda: list(StreamedPage(_chunked(payload, 16 * 1024), "cases", CaseProjection(fields)).items()))
+
+        self.assertEqual(buffered, streamed)
+        self.assertLess(streamed_peak * 3, buffered_peak)
+
+    def test_interface_stream_decode(self):
+        """
+        Test the interface's streamed test case retrieval matches the buffered one across pages, with prefetching
+        and projection, and surfaces error responses
+        :return:
+        """
+        with FakeTestRailServer(self.suite.cases, self.suite.sections, page_size=25) as server:
+            buffered_tr = stub_interface(server)
+            streamed_tr = stub_interface(server, stream_decode=True)
+
+            expected = buffered_tr.retrieve_testcase_data(1, 1)
+            self.assertEqual(expected, streamed_tr.retrieve_testcase_data(1, 1))
+            self.assertEqual(expected, list(streamed_tr.iter_testcase_data(1, 1, page_size=25, prefetch=True)))
+
+            projected = streamed_tr.retrieve_testcase_data(1, 1, fields=['section_id'])
+            self.assertEqual([{"id": case['id'], "section_id": case['section_id']} for case in expected], projected)
+
+            by_section = streamed_tr.retrieve_testcase_data_by_sections(1, 1, [SyntheticSuite.template_section_id])
+            self.assertEqual([case for case in expected if case['section_id'] == SyntheticSuite.template_section_id],
+                             by_section)
+
+            server.injected_responses.append((400, {"error": "Field :suite_id is not a valid test suite."}))
+            with self.assertRaises(ValueError):
+                list(streamed_tr._iter_server_testcase_data(1, 1, raise_errors=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import argparse
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..commands.template_index import TemplateIndexCommand
+from ..interface.tr_template_index import TemplateIndex
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestTemplateIndex(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.index_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.index_dir, "template_index.db")
+        self.cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                                    self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+
+    def tearDown(self):
+        shutil.rmtree(self.index_dir)
+
+    def test_rebuild_and_lookup(self):
+        """
+        Test the index maps template IDs to case IDs after a rebuild
+        :return:
+        """
+        template_index = TemplateIndex(self.index_path)
+        self.assertFalse(template_index.is_built(1, 1, "custom_templateid"))
+
+        self.assertEqual(4, template_index.rebuild(1, 1, "custom_templateid", self.cases))
+
+        self.assertTrue(template_index.is_built(1, 1, "custom_templateid"))
+        self.assertEqual({1: [1, 3], 2: [2, 4], 9: []},
+                         template_index.get_case_ids(1, 1, "custom_templateid", [1, 2, 9]))
+        template_index.close()
+
+    def test_fields_indexed_independently(self):
+        """
+        Test rebuilding the index of one template ID field leaves another field's index of the suite intact
+        :return:
+        """
+        template_index = TemplateIndex(self.index_path)
+        template_index.rebuild(1, 1, "custom_templateid", self.cases)
+        other_cases = [dict(case, custom_other_id=10 + case['id'] % 2) for case in self.cases[:2]]
+
+        self.assertEqual(2, template_index.rebuild(1, 1, "custom_other_id", other_cases))
+
+        self.assertTrue(template_index.is_built(1, 1, "custom_templateid"))
+        self.assertEqual({1: [1, 3], 2: [2, 4]}, template_index.get_case_ids(1, 1, "custom_templateid", [1, 2]))
+        self.assertEqual({10: [2], 11: [1], 1: []}, template_index.get_case_ids(1, 1, "custom_other_id", [10, 11, 1]))
+        self.assertFalse(template_index.verify(1, 1, "custom_templateid", self.cases).has_drift)
+        template_index.close()
+
+    def test_verify_drift(self):
+        """
+        Test verify reports missing, stale and mismatched entries
+        :return:
+        """
+        template_index = TemplateIndex(self.index_path)
+        template_index.rebuild(1, 1, "custom_templateid", self.cases)
+
+        cases = copy.deepcopy(self.cases[1:])
+        cases[0]["custom_templateid"] = 5
+        cases.append(dict(self.fixture_data.case_one, id=10))
+        report = template_index.verify(1, 1, "custom_templateid", cases)
+
+        self.assertEqual([10], report.missing)
+        self.assertEqual([1], report.stale)
+        self.assertEqual([2], report.mismatched)
+
+        template_index.upsert_cases(1, 1, "custom_templateid", cases + [dict(self.cases[0], custom_templateid=None)])
+        self.assertFalse(template_index.verify(1, 1, "custom_templateid", cases).has_drift)
+        template_index.close()
+
+    def test_failed_fetch_leaves_index_unchanged(self):
+        """
+        Test a suite fetch failing mid-stream neither rebuilds nor verifies the index against the truncated suite
+        :return:
+        """
+        with FakeTestRailServer(self.cases, self.fixture_data.sections_list, page_size=2) as server:
+            tr = stub_interface(server, template_index_path=self.index_path, read_memo=False)
+            tr.template_index.rebuild(1, 1, "custom_templateid", self.cases)
+
+            for rebuild in (True, False):
+                first_page = FakeTestRailServer._page_envelope("cases", self.cases[:2], 0, 2, len(self.cases))
+                server.injected_responses = [(200, first_page), (400, {"error": "Field :offset is not valid."})]
+                params = argparse.Namespace(trprojid=1, trsuiteid=1, tfname="custom_templateid", rebuild=rebuild)
+
+                self.assertEqual(1, TemplateIndexCommand.execute_util(params, tr))
+                self.assertEqual({1: [1, 3], 2: [2, 4]},
+                                 tr.template_index.get_case_ids(1, 1, "custom_templateid", [1, 2]))
+
+            tr.template_index.close()
+
+    def test_templater_uses_index(self):
+        """
+        Test a templater run by case ID fetches only the indexed cases instead of the whole suite
+        :return:
+        """
+        with FakeTestRailServer(self.cases, self.fixture_data.sections_list) as server:
+            tr = stub_interface(server, template_index_path=self.index_path)
+            tr.template_index.rebuild(1, 1, "custom_templateid", self.cases)
+
+            templater = TestRailTemplater(tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1", tr_suite_id=1)
+
+            self.assertEqual(0, templater.execute_templater())
+            self.assertEqual([], server.requests_for("get_cases"))
+            self.assertEqual(2, len(server.requests_for("get_case/")))
+            self.assertEqual(self.fixture_data.case_one["custom_steps"], server.cases[3]["custom_steps"])
+            tr.template_index.close()
+
+    def test_templater_section_fetch(self):
+        """
+        Test templates fetched by section with a filtered request and derived cases found through the index
+        :return:
+        """
+        with FakeTestRailServer(self.cases, self.fixture_data.sections_list) as server:
+            tr = stub_interface(server, write_concurrency=4, template_index_path=self.index_path)
+            tr.template_index.rebuild(1, 1, "custom_templateid", self.cases)
+
+            templater = TestRailTemplater(tr, 1, "custom_templateid", "custom_steps", section_ids_csv="1",
+                                          tr_suite_id=1, fetch_templates_by_section=True)
+
+            self.assertEqual(0, templater.execute_templater())
+            self.assertEqual(["1", "3", "4"], sorted(request[2]["section_id"]
+                                                     for request in server.requests_for("get_cases")))
+            self.assertEqual(2, len(server.requests_for("get_case/")))
+            self.assertEqual([3, 4], [result.case_id for result in templater.write_results])
+            tr.template_index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import unittest
+
+from .fixtures import fixture_data
+from ..utils.tr_template_plan import TemplatePlan, find_end_marker_step
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestTemplatePlan(unittest.TestCase):
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.end_marker = TestRailTemplater.get_default_end_marker()
+
+    def test_steps_replaced(self):
+        """
+        Test a steps field without an end marker is replaced by the template steps
+        :return:
+        """
+        plan = TemplatePlan(self.fixture_data.case_one, ["custom_steps"], self.end_marker)
+        changes = plan.diff(self.fixture_data.case_templated_one)
+
+        self.assertEqual({"custom_steps": self.fixture_data.case_one["custom_steps"]}, changes)
+
+    def test_steps_after_end_marker_kept(self):
+        """
+        Test steps following the end marker are kept when the templated steps are updated
+        :return:
+        """
+        plan = TemplatePlan(self.fixture_data.case_two, ["custom_steps"], self.end_marker)
+        changes = plan.diff(self.fixture_data.case_templated_two)
+        case_steps = self.fixture_data.case_templated_two["custom_steps"]
+
+        self.assertEqual(self.fixture_data.case_two["custom_steps"] + case_steps[2:], changes["custom_steps"])
+        self.assertEqual(2, find_end_marker_step(case_steps, self.end_marker))
+
+    def test_in_sync_case(self):
+        """
+        Test a case already in sync with the template produces no changes
+        :return:
+        """
+        plan = TemplatePlan(self.fixture_data.case_two, ["custom_steps", "type_id"], self.end_marker)
+        in_sync = dict(self.fixture_data.case_templated_two, type_id=1)
+        in_sync["custom_steps"] = self.fixture_data.case_two["custom_steps"] + in_sync["custom_steps"][2:]
+
+        self.assertEqual({}, plan.diff(in_sync))
+        in_sync["custom_steps"][0] = dict(in_sync["custom_steps"][0], content="Edited")
+        self.assertIn("custom_steps", plan.diff(in_sync))
+
+    def test_string_replacement(self):
+        """
+        Test only the text before the end marker of a string field is templated
+        :return:
+        """
+        plan = TemplatePlan(self.fixture_data.case_one, ["custom_notes"], self.end_marker)
+        case = dict(self.fixture_data.case_templated_one,
+                    custom_notes="Old notes{0} Keep these".format(self.end_marker))
+
+        self.assertEqual({"custom_notes": "Some notes!{0} Keep these".format(self.end_marker)}, plan.diff(case))
+        self.assertEqual({}, plan.diff(self.fixture_data.case_templated_one))
+
+    def test_scalar_field(self):
+        """
+        Test scalar fields are replaced when they differ
+        :return:
+        """
+        plan = TemplatePlan(self.fixture_data.case_one, ["priority_id"], self.end_marker)
+
+        self.assertEqual({"priority_id": 1}, plan.diff(self.fixture_data.case_templated_one))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,16 +16,125 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # ********************************************************
 
+import argparse
+import copy
 import unittest
 
-from .fixtures import fixture_data
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..commands.templater import TemplaterCommand
+from ..interface.tr_interface import TestRailInterface
+from ..utils.tr_templater import TestRailTemplater
 
 
 class TestTemplaterUtil(unittest.TestCase):
     def setUp(self):
         self.fixture_data = fixture_data()
+        self.tr = TestRailInterface(skip_login=True)
+        self.templater = TestRailTemplater(self.tr, self.fixture_data.project_id, "custom_templateid",
+                                           "custom_steps,title", case_ids_csv="1,2")
 
+    def test_dry_run_updates_case_data(self):
+        """
+        Test a dry run templates the case data without writing to TestRail
+        :return:
+        """
+        case_one = dict(self.fixture_data.case_templated_one)
+        case_two = dict(self.fixture_data.case_templated_two)
+        classification = self.templater._classify_cases([self.fixture_data.case_one, self.fixture_data.case_two,
+                                                         case_one, case_two])
 
+        updated = self.templater._update_test_cases(classification.template_cases, classification.cases_to_update,
+                                                    dry_run=True)
+
+        self.assertEqual([], updated)
+        self.assertEqual(self.fixture_data.case_one["custom_steps"], case_one["custom_steps"])
+        self.assertEqual(4, len(case_two["custom_steps"]))
+        self.assertEqual("Step 2", case_two["custom_steps"][1]["content"])
+
+
+    def test_execute_templater_paginated(self):
+        """
+        Test the templater streams a paginated suite and writes the templated cases
+        :return:
+        """
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+
+        with FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2) as server:
+            tr = stub_interface(server, write_concurrency=2)
+
+            templater = TestRailTemplater(tr, self.fixture_data.project_id, "custom_templateid", "custom_steps",
+                                          section_ids_csv="1")
+
+            self.assertEqual(0, templater.execute_templater())
+            self.assertEqual([3, 4], [result.case_id for result in templater.write_results])
+            self.assertEqual(self.fixture_data.case_one["custom_steps"], server.cases[3]["custom_steps"])
+            self.assertEqual("Non-Template Step 3", server.cases[4]["custom_steps"][3]["content"])
+
+            # Only the templated fields are sent back
+            for method, endpoint, params, body in server.requests_for("update_case"):
+                self.assertEqual(["custom_steps"], list(body.keys()))
+
+    def _run_command(self, **options):
+        """
+        Runs the templater command over section 1 of the fixture suite
+        :param options: Command arguments overriding the defaults
+        :return: Returns the FakeTestRailServer after the run
+        """
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+
+        with FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2) as server:
+            tr = stub_interface(server)
+
+            args = dict(trprojid=1, trsuiteid=1, tfname="custom_templateid", fields="custom_steps", secids="1",
+                        tcids=None, nochildren=False, markeroverride=None, sectionfetch=False, plan=None,
+                        diffworkers=None, dryrun=None, journal=None, resume=None)
+            args.update(options)
+
+            self.assertEqual(0, TemplaterCommand.execute_util(argparse.Namespace(**args), tr))
+            self.assertEqual(0, len(server.requests_for("get_suites")))
+            return server
+
+    def test_command_includes_child_sections_by_default(self):
+        """
+        Test the templater command templates from the child sections of the given sections by default
+        :return:
+        """
+        server = self._run_command()
+
+        self.assertEqual(self.fixture_data.case_one["custom_steps"], server.cases[3]["custom_steps"])
+        self.assertEqual("Step 2", server.cases[4]["custom_steps"][1]["content"])
+        self.assertNotEqual(0, len(server.requests_for("get_sections")))
+
+    def test_command_excludes_child_sections_when_asked(self):
+        """
+        Test the templater command only templates from the given sections with -nochildren
+        :return:
+        """
+        server = self._run_command(nochildren=True)
+
+        self.assertEqual(self.fixture_data.case_one["custom_steps"], server.cases[3]["custom_steps"])
+        self.assertEqual(self.fixture_data.case_templated_two["custom_steps"], server.cases[4]["custom_steps"])
+        self.assertEqual(0, len(server.requests_for("get_sections")))
+
+    def test_nochildren_flag(self):
+        """
+        Test child sections are included unless -nochildren, or the deprecated -incchildren false, is given
+        :return:
+        """
+        parser = argparse.ArgumentParser()
+        TemplaterCommand.setup_args(parser)
+
+        self.assertFalse(parser.parse_args(["-secids", "1", "-fields", "custom_steps"]).nochildren)
+        self.assertTrue(parser.parse_args(["-secids", "1", "-fields", "custom_steps", "-nochildren"]).nochildren)
+
+        # The deprecated -incchildren maps onto -nochildren
+        self.assertTrue(parser.parse_args(["-secids", "1", "-fields", "custom_steps", "-incchildren", "False"])
+                        .nochildren)
+        self.assertFalse(parser.parse_args(["-secids", "1", "-fields", "custom_steps", "-incchildren", "true"])
+                         .nochildren)
 
 
 if __name__ == '__main__':
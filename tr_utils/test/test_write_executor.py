@@ -0,0 +1,81 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import random
+import threading
+import time
+import unittest
+
+from ..interface.tr_write_executor import WriteExecutor, summarize_results
+
+
+class TestWriteExecutor(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _write(self, case_id, payload):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(random.uniform(0, 0.005))
+
+        with self.lock:
+            self.in_flight -= 1
+
+        if case_id % 5 == 0:
+            return {"error": "Field is read only"}
+        if case_id % 7 == 0:
+            raise ValueError("Connection reset")
+
+        return dict(payload, id=case_id)
+
+    def test_results_in_submission_order(self):
+        """
+        Test results are returned and reported in submission order with writes bounded by max_workers
+        :return:
+        """
+        executor = WriteExecutor(self._write, max_workers=4)
+        reported = []
+        updates = [(case_id, {"title": "Case {0}".format(case_id)}) for case_id in range(1, 41)]
+
+        results = executor.execute(updates, reported.append)
+
+        self.assertEqual(list(range(1, 41)), [result.case_id for result in results])
+        self.assertEqual(results, reported)
+        self.assertLessEqual(self.max_in_flight, 4)
+
+    def test_failures_collected(self):
+        """
+        Test error responses and exceptions are collected as failed results
+        :return:
+        """
+        executor = WriteExecutor(self._write, max_workers=1)
+        results = executor.execute([(1, {}), (5, {}), (7, {})])
+        updated, failed = summarize_results(results)
+
+        self.assertEqual(["1"], updated)
+        self.assertEqual(["5", "7"], failed)
+        self.assertEqual("Field is read only", results[1].error)
+        self.assertEqual("Connection reset", results[2].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+# ******************* LICENSE ***************************
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# ********************************************************
+
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from .fixtures import fixture_data, stub_interface
+from ..bench.fake_server import FakeTestRailServer
+from ..interface.tr_write_executor import WriteResult
+from ..interface.tr_write_journal import WriteJournal
+from ..utils.tr_gen_template_ids import TemplateIDGen
+from ..utils.tr_pipeline import TemplatePipeline
+from ..utils.tr_templater import TestRailTemplater
+
+
+class TestWriteJournal(unittest.TestCase):
+    _JOB = {"util": "templateidgen", "project_id": 1, "section_ids": "5,6"}
+
+    def setUp(self):
+        self.fixture_data = fixture_data()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "journal.jsonl")
+
+        cases = copy.deepcopy([self.fixture_data.case_one, self.fixture_data.case_two,
+                               self.fixture_data.case_templated_one, self.fixture_data.case_templated_two])
+        self.server = FakeTestRailServer(cases, self.fixture_data.sections_list, page_size=2).start()
+        self.tr = stub_interface(self.server)
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def _read_entries(self) -> list:
+        with open(self.path) as journal_file:
+            return [json.loads(line) for line in journal_file.read().splitlines()]
+
+    def test_resume_ignores_partial_record(self):
+        """
+        Test a resumed journal restores the confirmed writes, ignoring a record cut off by a crash
+        :return:
+        """
+        with WriteJournal(self.path, self._JOB, fsync=False) as journal:
+            journal.record(WriteResult(3, True))
+            journal.record(WriteResult(4, False, "Injected status 503"))
+        with open(self.path, "a") as journal_file:
+            journal_file.write('{"case_id":5,"succ')
+
+        with WriteJournal(self.path, self._JOB, resume=True, fsync=False) as journal:
+            self.assertEqual({3}, journal.completed_case_ids)
+            self.assertTrue(journal.is_completed("3"))
+            journal.record(WriteResult(4, True))
+            self.assertEqual({3, 4}, journal.completed_case_ids)
+
+        with WriteJournal(self.path, self._JOB, resume=True, fsync=False) as journal:
+            self.assertEqual({3, 4}, journal.completed_case_ids)
+
+        with self.assertRaises(ValueError):
+            WriteJournal(self.path, dict(self._JOB, section_ids="5"), resume=True)
+
+    def test_id_gen_resume(self):
+        """
+        Test a resumed ID gen run keeps the template IDs of the cases an interrupted run wrote
+        :return:
+        """
+        with WriteJournal(self.path, self._JOB, fsync=False) as journal:
+            journal.record(WriteResult(3, True))
+
+        with WriteJournal(self.path, self._JOB, resume=True, fsync=False) as journal:
+            id_gen = TemplateIDGen(self.tr, "custom_templateid", 1, 1, section_ids_csv="5,6", write_journal=journal)
+            self.assertEqual(0, id_gen.execute_id_gen())
+
+        self.assertEqual([("POST", "update_case/4")],
+                         [(method, endpoint) for method, endpoint, _, _ in self.server.requests_for("update_case")])
+        self.assertEqual(1, self.server.cases[3]['custom_templateid'])
+        self.assertEqual([4], [entry['case_id'] for entry in self._read_entries()[2:]])
+
+    def test_templater_journals_writes(self):
+        """
+        Test the templater journals each write with its template digest, and a resumed run skips the journaled cases
+        whose template is unchanged while rewriting those whose template changed
+        :return:
+        """
+        job = {"util": "templater", "case_ids": "1,2"}
+        with WriteJournal(self.path, job, fsync=False) as journal:
+            templater = TestRailTemplater(self.tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1,2",
+                                          write_journal=journal)
+            self.assertEqual(0, templater.execute_templater())
+
+        entries = self._read_entries()
+        self.assertEqual(job, entries[0]['job'])
+        self.assertEqual([3, 4], sorted(entry['case_id'] for entry in entries[1:]))
+        self.assertTrue(all(entry['success'] for entry in entries[1:]))
+        self.assertTrue(all(len(entry['digest']) > 0 for entry in entries[1:]))
+
+        # Template 1 changes after the interrupted run. Case 4 is undone server side, a resumed run still trusts the
+        # journal for it as its template is unchanged
+        new_steps = [{"content": "Changed template step", "expected": ""}]
+        self.server.cases[1]['custom_steps'] = new_steps
+        self.server.cases[4]['custom_steps'] = []
+        with WriteJournal(self.path, job, resume=True, fsync=False) as journal:
+            templater = TestRailTemplater(self.tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1,2",
+                                          write_journal=journal)
+            self.assertEqual(0, templater.execute_templater())
+
+        self.assertEqual(["update_case/3", "update_case/3", "update_case/4"],
+                         sorted(request[1] for request in self.server.requests_for("update_case")))
+        self.assertEqual(new_steps, self.server.cases[3]['custom_steps'])
+        self.assertEqual([], self.server.cases[4]['custom_steps'])
+
+    def test_pipeline_resume(self):
+        """
+        Test a resumed pipeline run skips the templated cases the journal confirms as written from an unchanged
+        template
+        :return:
+        """
+        job = {"util": "pipeline", "case_ids": "1,2"}
+        with WriteJournal(self.path, job, fsync=False) as journal:
+            pipeline = TemplatePipeline(self.tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1,2",
+                                        tr_suite_id=1, write_journal=journal)
+            self.assertEqual(0, pipeline.execute_pipeline())
+
+        self.server.cases[3]['custom_steps'] = []
+        with WriteJournal(self.path, job, resume=True, fsync=False) as journal:
+            pipeline = TemplatePipeline(self.tr, 1, "custom_templateid", "custom_steps", case_ids_csv="1,2",
+                                        tr_suite_id=1, write_journal=journal)
+            self.assertEqual(0, pipeline.execute_pipeline())
+
+        self.assertEqual(2, len(self.server.requests_for("update_case")))
+        self.assertEqual([], self.server.cases[3]['custom_steps'])
+
+
+if __name__ == '__main__':
+    unittest.main()
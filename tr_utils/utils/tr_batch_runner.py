@@ -0,0 +1,377 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_metrics import submit_in_phase
+from tr_utils.interface.tr_write_executor import summarize_results
+from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+def _bool_option(data: dict, key: str, default, where: str):
+    """
+    Reads a true / false option of the batch file, rejecting other values rather than guessing at them
+    :param data: The job entry or settings of the batch file
+    :param key: The option name
+    :param default: The value when the option is not set
+    :param where: The part of the batch file, for the error message
+    :return: Returns the option value, or the default
+    """
+    value = data.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, bool):
+        raise ValueError("{0}: {1} must be true or false, got {2!r}".format(where, key, value))
+    return value
+
+
+class BatchJob:
+    """
+    A single templater or templateidgen job of a batch file
+    """
+
+    UTILITIES = ("templater", "templateidgen")
+
+    def __init__(self, job_data: dict, number: int):
+        """
+        :param job_data: The job entry of the batch file
+        :param number: The 1 based position of the job in the batch file
+        """
+        def csv(value):
+            if value is None:
+                return None
+            if isinstance(value, (list, tuple)):
+                return ",".join(str(item) for item in value)
+            return str(value)
+
+        self.number = number
+        self.util = job_data.get('util')
+        self.name = str(job_data.get('name', "{0} {1}".format(self.util, number)))
+        self.project_id = job_data.get('project_id')
+        self.suite_id = job_data.get('suite_id')
+        self.template_id_field = job_data.get('template_id_field')
+        self.fields = csv(job_data.get('fields'))
+        self.section_ids = csv(job_data.get('section_ids'))
+        self.case_ids = csv(job_data.get('case_ids'))
+        self.end_marker = job_data.get('end_marker')
+
+        where = "Job {0}".format(number)
+        self.include_child_sections = _bool_option(job_data, 'include_child_sections', True, where)
+        self.fetch_templates_by_section = _bool_option(job_data, 'fetch_templates_by_section', False, where)
+        self.overwrite_existing_id = _bool_option(job_data, 'overwrite_existing_id', True, where)
+        self.dry_run = _bool_option(job_data, 'dry_run', None, where)
+
+        if self.util not in BatchJob.UTILITIES:
+            raise ValueError("Job {0}: util must be one of {1}".format(number, ", ".join(BatchJob.UTILITIES)))
+        if self.project_id is None or self.template_id_field is None:
+            raise ValueError("Job {0}: project_id and template_id_field are required".format(number))
+        if (self.section_ids is None) == (self.case_ids is None):
+            raise ValueError("Job {0}: exactly one of section_ids and case_ids is required".format(number))
+        if self.util == "templater" and self.fields is None:
+            raise ValueError("Job {0}: templater jobs require fields".format(number))
+
+        self.project_id = int(self.project_id)
+        self.suite_id = int(self.suite_id) if self.suite_id is not None else None
+
+
+class BatchJobResult:
+    """
+    The outcome of a single batch job
+    """
+
+    def __init__(self, job: BatchJob, suite_id, exit_code: int, seconds: float, write_results: list = None,
+                 error: str = ""):
+        self.job = job
+        self.suite_id = suite_id
+        self.exit_code = exit_code
+        self.seconds = seconds
+        self.write_results = write_results or []
+        self.error = error
+
+    def to_dict(self) -> dict:
+        updated, failed = summarize_results(self.write_results)
+
+        return {"job": self.job.number, "name": self.job.name, "util": self.job.util,
+                "project_id": self.job.project_id, "suite_id": self.suite_id, "exit_code": self.exit_code,
+                "seconds": round(self.seconds, 3), "cases_updated": len(updated), "cases_failed": len(failed),
+                "failed_case_ids": failed, "error": self.error}
+
+
+def load_batch_file(path: str) -> dict:
+    """
+    Loads a JSON or YAML batch file. YAML files require PyYAML
+    :param path: The batch file path. Files ending in .yml or .yaml are read as YAML
+    :return: Returns a dict with the 'jobs' as BatchJob instances and the optional 'settings' dict
+    """
+    with open(path) as batch_file:
+        if os.path.splitext(path)[1].lower() in (".yml", ".yaml"):
+            if yaml is None:
+                raise ValueError("Reading YAML batch file {0} requires PyYAML, install it or use JSON".format(path))
+            batch_data = yaml.safe_load(batch_file)
+        else:
+            batch_data = json.load(batch_file)
+
+    if isinstance(batch_data, list):
+        batch_data = {"jobs": batch_data}
+    if not isinstance(batch_data, dict) or not isinstance(batch_data.get('jobs'), list):
+        raise ValueError("Batch file {0} must contain a list of jobs".format(path))
+
+    settings = batch_data.get('settings') or {}
+    if not isinstance(settings, dict):
+        raise ValueError("Batch file {0}: settings must be a mapping".format(path))
+    _bool_option(settings, 'dry_run', False, "Batch file {0} settings".format(path))
+
+    return {"settings": settings,
+            "jobs": [BatchJob(job_data, number) for number, job_data in enumerate(batch_data['jobs'], start=1)]}
+
+
+class _SharedSuiteInterface:
+    """
+    TestRailInterface stand-in handed to every job of one project / suite. The suite's sections and test cases are
+    fetched once and served to each job from memory, every other call goes to the shared interface.
+
+    Each job gets its own copy of the shared test cases, so changes a job makes to its cases in memory, on a dry run or
+    ahead of a failed write, do not leak into the jobs after it. Successful writes, for example template IDs assigned by
+    a templateidgen job, are applied to the shared test cases and seen by the jobs after it. The shared test cases are
+    projected to the fields any job of the group reads.
+    """
+
+    def __init__(self, tr_instance: TestRailInterface, project_id: int, suite_id: int, fields: list = None):
+        self._tr = tr_instance
+        self._project_id = project_id
+        self._suite_id = suite_id
+        self._fields = fields
+        self._lock = threading.Lock()
+        self._sections_data = None
+        self._test_case_data = None
+        self._test_cases_by_id = None
+
+    def __getattr__(self, name):
+        return getattr(self._tr, name)
+
+    def _is_shared(self, project_id, suite_id) -> bool:
+        return int(project_id) == self._project_id and suite_id is not None and int(suite_id) == self._suite_id
+
+    def suites_get_default_suite(self, tr_proj_id: int) -> int:
+        if int(tr_proj_id) == self._project_id:
+            return self._suite_id
+
+        return self._tr.suites_get_default_suite(tr_proj_id)
+
+    def retrieve_sections_data(self, project_id: int, suite_id: int) -> list:
+        if self._is_shared(project_id, suite_id) is False:
+            return self._tr.retrieve_sections_data(project_id, suite_id)
+
+        with self._lock:
+            if self._sections_data is None:
+                self._sections_data = self._tr.retrieve_sections_data(project_id, suite_id)
+
+            return self._sections_data
+
+    def retrieve_testcase_data(self, project_id: int, suite_id: int, fields: list = None) -> list:
+        return list(self.iter_testcase_data(project_id, suite_id, fields=fields))
+
+    def iter_testcase_data(self, project_id: int, suite_id: int, page_size: int = None, prefetch: bool = False,
+                           fields: list = None, raise_errors: bool = False, **filters):
+        if len(filters) > 0 or self._is_shared(project_id, suite_id) is False:
+            return self._tr.iter_testcase_data(project_id, suite_id, page_size, prefetch, fields, raise_errors,
+                                               **filters)
+
+        # The group's fields cover the fields of every job, the fields requested by one job are a subset
+        with self._lock:
+            if self._test_case_data is None:
+                self._test_case_data = list(self._tr.iter_testcase_data(project_id, suite_id, page_size, prefetch,
+                                                                        self._fields, raise_errors))
+                self._test_cases_by_id = {case['id']: case for case in self._test_case_data}
+
+            return iter([copy.copy(case) for case in self._test_case_data])
+
+    def update_case(self, case_id: int, case_data: dict) -> dict:
+        response = self._tr.update_case(case_id, case_data)
+        if isinstance(response, dict) and 'error' not in response:
+            self._apply_case_update(case_id, case_data)
+
+        return response
+
+    def update_cases(self, updates: list, on_result=None) -> list:
+        write_results = self._tr.update_cases(updates, on_result)
+        for (case_id, case_data), write_result in zip(updates, write_results):
+            if write_result.success is True:
+                self._apply_case_update(case_id, case_data)
+
+        return write_results
+
+    def _apply_case_update(self, case_id: int, case_data: dict):
+        """
+        Applies the fields of a successful write to the shared test case, so the jobs after the writing job see them
+        :param case_id: The ID of the written test case
+        :param case_data: The written test case fields
+        :return:
+        """
+        with self._lock:
+            if self._test_cases_by_id is None or int(case_id) not in self._test_cases_by_id:
+                return
+
+            shared_case = self._test_cases_by_id[int(case_id)]
+            for field, value in case_data.items():
+                try:
+                    shared_case[field] = value
+                except KeyError:
+                    # Not a projected field of the shared test cases, no job of the group reads it
+                    pass
+
+        return
+
+
+class BatchRunner:
+    """
+    Runs a batch of templater and templateidgen jobs in one process, over one TestRailInterface and so one connection
+    pool and one rate budget.
+
+    Jobs are grouped by project / suite. The jobs of a group run one after another, in batch file order, over data
+    fetched once for the group. Groups run in parallel.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, tr_instance: TestRailInterface, jobs: list, max_parallel_suites: int = 4,
+                 dry_run: bool = False):
+        """
+        :param tr_instance: The shared TestRailInterface
+        :param jobs: A list of BatchJob
+        :param max_parallel_suites: The maximum number of project / suite groups run at once
+        :param dry_run: Default dry run setting of jobs not setting dry_run themselves
+        """
+        self._tr = tr_instance
+        self._jobs = jobs
+        self._max_parallel_suites = max(1, int(max_parallel_suites))
+        self._dry_run = dry_run
+        self._default_suites = {}
+
+        return
+
+    def run(self) -> list:
+        """
+        Runs every job
+        :return: Returns a list of BatchJobResult, in batch file order
+        """
+        groups = {}
+        results = {}
+
+        with self._tr.phase("suite_lookup"):
+            for job in self._jobs:
+                suite_id = job.suite_id if job.suite_id is not None else self._default_suite(job.project_id)
+                if suite_id is None or suite_id < 0:
+                    results[job.number] = BatchJobResult(job, None, 1, 0.0,
+                                                         error="Failed to resolve the default suite of project "
+                                                               "{0}".format(job.project_id))
+                    continue
+                groups.setdefault((job.project_id, suite_id), []).append(job)
+
+        self._log.info("Running {0} batch jobs over {1} project / suite groups".format(len(self._jobs), len(groups)))
+
+        if len(groups) > 0:
+            with ThreadPoolExecutor(max_workers=min(self._max_parallel_suites, len(groups)),
+                                    thread_name_prefix="tr_batch") as pool:
+                futures = [submit_in_phase(pool, self._run_group, project_id, suite_id, group_jobs)
+                           for (project_id, suite_id), group_jobs in groups.items()]
+                for future in futures:
+                    for result in future.result():
+                        results[result.job.number] = result
+
+        return [results[job.number] for job in self._jobs]
+
+    def _default_suite(self, project_id: int):
+        if project_id not in self._default_suites:
+            self._default_suites[project_id] = self._tr.suites_get_default_suite(project_id)
+
+        return self._default_suites[project_id]
+
+    def _run_group(self, project_id: int, suite_id: int, jobs: list) -> list:
+        fields = []
+        for job in jobs:
+            if job.util == "templater":
+                fields += TestRailTemplater.get_case_fields(job.template_id_field, job.fields)
+            else:
+                fields += TemplateIDGen.get_case_fields(job.template_id_field)
+        shared_tr = _SharedSuiteInterface(self._tr, project_id, suite_id, list(dict.fromkeys(fields)))
+
+        return [self._run_job(job, shared_tr, suite_id) for job in jobs]
+
+    def _run_job(self, job: BatchJob, shared_tr: _SharedSuiteInterface, suite_id: int) -> BatchJobResult:
+        dry_run = self._dry_run if job.dry_run is None else job.dry_run
+        self._log.info("Starting batch job {0} '{1}' on project {2} suite {3}. Dry Run: {4}"
+                       .format(job.number, job.name, job.project_id, suite_id, dry_run))
+
+        started = time.perf_counter()
+        try:
+            if job.util == "templater":
+                util = TestRailTemplater(shared_tr, job.project_id, job.template_id_field, job.fields,
+                                         section_ids_csv=job.section_ids, case_ids_csv=job.case_ids,
+                                         tr_suite_id=suite_id, end_marker_override=job.end_marker,
+                                         get_all_child_sections=job.include_child_sections,
+                                         fetch_templates_by_section=job.fetch_templates_by_section)
+                exit_code = util.execute_templater(dry_run)
+            else:
+                util = TemplateIDGen(shared_tr, job.template_id_field, job.project_id, suite_id,
+                                     section_ids_csv=job.section_ids, case_ids_csv=job.case_ids,
+                                     overwrite_existing_id=job.overwrite_existing_id,
+                                     get_all_child_sections=job.include_child_sections)
+                exit_code = util.execute_id_gen(dry_run)
+        except Exception as e:
+            self._log.exception("Batch job {0} '{1}' failed. Exception: {2}".format(job.number, job.name, e))
+            return BatchJobResult(job, suite_id, 1, time.perf_counter() - started, error=str(e))
+
+        return BatchJobResult(job, suite_id, exit_code, time.perf_counter() - started, util.write_results)
+
+
+def format_report(results: list) -> str:
+    """
+    Formats batch results as a table
+    :param results: A list of BatchJobResult
+    :return: Returns the report text
+    """
+    lines = ["{0:>4}  {1:<30}{2:<15}{3:>8}{4:>8}{5:>6}{6:>10}{7:>9}{8:>10}".format(
+        "job", "name", "util", "project", "suite", "exit", "updated", "failed", "seconds")]
+    for result in results:
+        row = result.to_dict()
+        lines.append("{0:>4}  {1:<30}{2:<15}{3:>8}{4:>8}{5:>6}{6:>10}{7:>9}{8:>10.2f}".format(
+            row['job'], row['name'][:29], row['util'], row['project_id'], str(row['suite_id']), row['exit_code'],
+            row['cases_updated'], row['cases_failed'], row['seconds']))
+        if row['error'] != "":
+            lines.append("      error: {0}".format(row['error']))
+
+    return "\n".join(lines)
+
+
+def write_report(results: list, path: str):
+    with open(path, "w") as report_file:
+        json.dump([result.to_dict() for result in results], report_file, indent=2)
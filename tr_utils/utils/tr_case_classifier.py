@@ -0,0 +1,124 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+
+
+class CaseClassification:
+    """
+    Result of a single classification pass over a suite's test case data.
+    """
+
+    def __init__(self):
+        self.template_cases = {}
+        """ template ID -> template test case """
+
+        self.cases_to_update = {}
+        """ template ID -> list of test cases deriving from the template """
+
+        self.template_case_ids = set()
+        """ IDs of every test case identified as a template case, including duplicates """
+
+        self.duplicate_template_ids = {}
+        """ template ID -> list of case IDs for template cases sharing an already claimed template ID """
+
+        self.cases_scanned = 0
+
+    @property
+    def has_duplicates(self) -> bool:
+        return len(self.duplicate_template_ids) > 0
+
+
+class CaseClassifier:
+    """
+    Classifies test cases into template cases and the cases deriving from them in a single pass.
+
+    Template cases are identified by case ID or by residing in one of the provided sections. Every other case carrying
+    a template ID is bucketed by that ID while scanning, so the cases to update are known as soon as the scan finishes
+    without a second pass over the suite.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, template_id_field: str, section_ids: list = None, case_ids: list = None):
+        """
+        :param template_id_field: The name of the field containing the template ID data
+        :param section_ids: Section IDs containing template test cases. Expected to already include child sections
+        :param case_ids: Case IDs of template test cases
+        """
+        self._template_id_field = template_id_field
+        self._section_ids = {int(sec_id) for sec_id in section_ids} if section_ids is not None else set()
+        self._case_ids = {int(case_id) for case_id in case_ids} if case_ids is not None else set()
+
+        return
+
+    def classify(self, test_case_data) -> CaseClassification:
+        """
+        Classifies the provided test case data
+        :param test_case_data: An iterable of test case dicts, see TestRailInterface.retrieve_testcase_data
+        :return: Returns a populated CaseClassification
+        """
+        result = CaseClassification()
+        candidates = {}
+
+        try:
+            for test_case in test_case_data:
+                result.cases_scanned += 1
+                template_id = test_case[self._template_id_field]
+
+                if test_case['id'] in self._case_ids or test_case['section_id'] in self._section_ids:
+                    self._add_template_case(result, template_id, test_case)
+                elif template_id is not None:
+                    bucket = candidates.get(template_id)
+                    if bucket is None:
+                        candidates[template_id] = [test_case]
+                    else:
+                        bucket.append(test_case)
+
+        except Exception as e:
+            self._log.exception("Exception hit when classifying test cases! Exception: {0}".format(e))
+
+        for template_id in result.template_cases.keys():
+            result.cases_to_update[template_id] = candidates.get(template_id, [])
+
+        for template_id, case_ids in result.duplicate_template_ids.items():
+            self._log.error("Template ID: {0} is used by multiple template cases! Using case ID {1} as the template and "
+                            "ignoring case IDs: {2}".format(template_id, result.template_cases[template_id]['id'],
+                                                            str.join(',', [str(case_id) for case_id in case_ids])))
+
+        return result
+
+    def _add_template_case(self, result: CaseClassification, template_id, test_case: dict):
+        """
+        Records a template case, tracking duplicate template IDs rather than overwriting the first template found.
+        :param result: The classification being populated
+        :param template_id: The template ID of the case
+        :param test_case: The template test case
+        :return:
+        """
+        result.template_case_ids.add(test_case['id'])
+
+        if template_id is None or template_id == "":
+            self._log.warning("Template case ID: {0} has no template ID set and will be ignored!"
+                              .format(test_case['id']))
+        elif template_id in result.template_cases:
+            result.duplicate_template_ids.setdefault(template_id, []).append(test_case['id'])
+        else:
+            result.template_cases[template_id] = test_case
+
+        return
@@ -0,0 +1,297 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+import json
+import logging
+import time
+
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_write_executor import summarize_results
+from tr_utils.interface.tr_write_journal import WriteJournal
+
+
+class ChangePlanWriter:
+    """
+    Streams a change plan to a JSONL file. The first line describes the suite and templated fields the plan was
+    computed for, every following line holds the field deltas of one test case along with the template digest and
+    the target's updated_on at planning time.
+    """
+
+    VERSION = 1
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, path: str, project_id: int, suite_id: int, template_id_field: str, fields: list,
+                 as_of: float = None):
+        """
+        :param path: The plan file path
+        :param project_id: The TestRail project ID
+        :param suite_id: The TestRail suite ID
+        :param template_id_field: The name of the template ID field
+        :param fields: The templated field names
+        :param as_of: Time the planned test case data was current at, usually when retrieving it began. Apply
+        checks for test cases updated since. Defaults to now
+        """
+        self._path = path
+        self._entry_count = 0
+        self._file = open(path, "w")
+        self._append({"plan": "tr_utils", "version": ChangePlanWriter.VERSION, "project_id": int(project_id),
+                      "suite_id": int(suite_id), "template_id_field": template_id_field, "fields": list(fields),
+                      "as_of": as_of if as_of is not None else time.time(), "created": time.time()})
+
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def entry_count(self) -> int:
+        return self._entry_count
+
+    def add(self, case_id: int, template_id, template_digest: str, updated_on: int, changes: dict):
+        """
+        Appends the planned changes of a test case
+        :param case_id: The target test case ID
+        :param template_id: The template ID the target derives from
+        :param template_digest: The TemplatePlan digest of the template case the changes were computed from
+        :param updated_on: The target's updated_on when planned
+        :param changes: The changed fields dict
+        :return:
+        """
+        self._append({"case_id": int(case_id), "template_id": template_id, "template_digest": template_digest,
+                      "updated_on": updated_on, "changes": changes})
+        self._entry_count += 1
+
+    def close(self):
+        if self._file.closed is False:
+            self._file.close()
+            self._log.info("Wrote {0} planned test case changes to {1}".format(self._entry_count, self._path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _append(self, entry: dict):
+        self._file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+
+class ChangePlan:
+    """
+    Reads a change plan written by ChangePlanWriter. Entries are streamed from the file rather than loaded at once.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: The plan file path
+        :raises ValueError: If the file is not a tr_utils change plan
+        """
+        self._path = path
+
+        with open(path) as plan_file:
+            line = plan_file.readline()
+
+        try:
+            self._header = json.loads(line)
+        except ValueError:
+            self._header = {}
+        if self._header.get('plan') != "tr_utils" or self._header.get('version') != ChangePlanWriter.VERSION:
+            raise ValueError("{0} is not a tr_utils change plan".format(path))
+
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def project_id(self) -> int:
+        return self._header['project_id']
+
+    @property
+    def suite_id(self) -> int:
+        return self._header['suite_id']
+
+    @property
+    def template_id_field(self) -> str:
+        return self._header['template_id_field']
+
+    @property
+    def fields(self) -> list:
+        return self._header['fields']
+
+    @property
+    def as_of(self) -> float:
+        return self._header['as_of']
+
+    def entries(self):
+        """
+        Streams the planned test case changes
+        :return: Returns a generator of entry dicts with case_id, template_id, template_digest, updated_on and changes
+        """
+        with open(self._path) as plan_file:
+            plan_file.readline()
+            for line in plan_file:
+                if len(line.strip()) > 0:
+                    yield json.loads(line)
+
+
+class ChangePlanApplier:
+    """
+    Applies a change plan as a pure write pipeline. Test cases updated on the server since the plan was computed
+    are skipped rather than overwritten with changes based on stale data; re-plan to pick them up.
+    """
+
+    _SYNC_SKEW = 300
+    """ Seconds subtracted from the plan time to cover clock differences between the planning host and the server """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, tr_instance: TestRailInterface, plan_path: str, write_journal: WriteJournal = None):
+        """
+        :param tr_instance: The instance of TestRailInterface
+        :param plan_path: The change plan file written by the templater
+        :param write_journal: Optional WriteJournal recording every write outcome. Test cases the journal confirms as
+        written, by an interrupted earlier apply of the same plan, are skipped
+        """
+        self._tr = tr_instance
+        self._plan_path = plan_path
+        self._write_journal = write_journal
+        self._write_results = []
+        self._conflicted_case_ids = []
+
+        return
+
+    @property
+    def write_results(self) -> list:
+        """
+        Property for the write results of the last apply
+        :return: A list of WriteResult, one per test case written
+        """
+        return self._write_results
+
+    @property
+    def conflicted_case_ids(self) -> list:
+        """
+        Property for the test case IDs skipped by the last apply because they changed since planning
+        :return: A list of case IDs
+        """
+        return self._conflicted_case_ids
+
+    def execute_apply(self, dry_run: bool = False) -> int:
+        """
+        Applies the change plan
+        :param dry_run: When set to True the plan is checked against the server but nothing is written
+        :return: Returns 0 on success, 1 if the plan cannot be read, 2 if any write failed, 6 if test cases were
+        skipped because they changed since planning and 7 if the check for changes since planning failed, in which case
+        nothing is written
+        """
+        self._write_results = []
+        self._conflicted_case_ids = []
+
+        try:
+            plan = ChangePlan(self._plan_path)
+        except Exception as e:
+            self._log.error("Failed to read change plan {0}: {1}. Exiting!".format(self._plan_path, e))
+            return 1
+
+        try:
+            with self._tr.phase("conflict_check"):
+                updated_on = self._retrieve_updated_since(plan)
+        except Exception as e:
+            self._log.error("Failed to check suite ID: {0} for test cases updated since planning: {1}. Exiting without "
+                            "writing!".format(plan.suite_id, e))
+            return 7
+
+        completed = self._write_journal.completed_case_ids if self._write_journal is not None else set()
+        updates = []
+        journaled = 0
+        for entry in plan.entries():
+            case_id = entry['case_id']
+            if case_id in completed:
+                journaled += 1
+            elif case_id in updated_on and updated_on[case_id] != entry['updated_on']:
+                self._conflicted_case_ids.append(case_id)
+            else:
+                updates.append((case_id, entry['changes']))
+
+        if journaled > 0:
+            self._log.info("Skipping {0} test cases already written according to journal {1}"
+                           .format(journaled, self._write_journal.path))
+        if len(self._conflicted_case_ids) > 0:
+            self._log.warning("Skipping {0} test cases changed since the plan was computed: {1}"
+                              .format(len(self._conflicted_case_ids),
+                                      str.join(',', [str(case_id) for case_id in self._conflicted_case_ids])))
+
+        self._log.info("Applying {0} planned test case changes from {1}. Dry Run: {2}".format(len(updates),
+                                                                                              self._plan_path,
+                                                                                              dry_run))
+        if dry_run is True:
+            return 6 if len(self._conflicted_case_ids) > 0 else 0
+
+        on_result = self._write_journal.record if self._write_journal is not None else None
+        with self._tr.phase("write"):
+            self._write_results = self._tr.update_cases(updates, on_result)
+
+        cases_updated, cases_failed = summarize_results(self._write_results)
+        self._update_template_index(plan)
+        self._log.info("Updated {0} test cases. The following test case IDs have been updated {1}".
+                       format(len(cases_updated), str.join(',', cases_updated)))
+
+        if len(cases_failed) > 0:
+            self._log.error("Failed to update {0} test cases. The following test case IDs failed to update {1}"
+                            .format(len(cases_failed), str.join(',', cases_failed)))
+            return 2
+
+        return 6 if len(self._conflicted_case_ids) > 0 else 0
+
+    # region Private Functions
+
+    def _retrieve_updated_since(self, plan: ChangePlan) -> dict:
+        """
+        Retrieves the updated_on of every test case in the plan's suite updated since the plan was computed, with a
+        single filtered get_cases stream rather than a request per planned test case
+        :param plan: The ChangePlan
+        :return: Returns a dict of case ID -> updated_on
+        :raises Exception: If any page of the stream fails, a partial result would hide conflicts
+        """
+        updated_after = max(0, int(plan.as_of) - self._SYNC_SKEW)
+        self._log.info("Checking suite ID: {0} for test cases updated since planning".format(plan.suite_id))
+
+        return {case['id']: case.get('updated_on')
+                for case in self._tr.iter_testcase_data(plan.project_id, plan.suite_id, prefetch=True,
+                                                        raise_errors=True, updated_after=updated_after)}
+
+    def _update_template_index(self, plan: ChangePlan):
+        """
+        Updates the template index, when one is in use, with the test case data returned by successful writes
+        :param plan: The applied ChangePlan
+        :return:
+        """
+        template_index = self._tr.template_index
+        if template_index is None:
+            return
+
+        template_index.upsert_cases(plan.project_id, plan.suite_id, plan.template_id_field,
+                                    [result.response for result in self._write_results
+                                     if result.success is True and isinstance(result.response, dict)])
+
+        return
+
+    # endregion
@@ -0,0 +1,221 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+import multiprocessing
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from tr_utils.utils.tr_template_plan import TemplatePlan
+
+
+def _diff_shard(fields: tuple, end_marker: str, shard: list) -> list:
+    """
+    Diffs one shard of templates in a worker process
+    :param fields: The field names to template
+    :param end_marker: The end of template marker string
+    :param shard: A list of (template_id, template row, list of case rows). A row is a tuple of the case ID followed
+    by the value of each templated field
+    :return: Returns a list of (template_id, template digest, list of (case_id, changed fields dict)), one per shard
+    entry, holding only the cases with changes
+    """
+    keys = ('id',) + fields
+    ret_val = []
+
+    for template_id, template_row, case_rows in shard:
+        template_plan = TemplatePlan(dict(zip(keys, template_row)), fields, end_marker)
+
+        case_changes = []
+        for case_row in case_rows:
+            changes = template_plan.diff(dict(zip(keys, case_row)))
+            if len(changes) > 0:
+                case_changes.append((case_row[0], changes))
+
+        ret_val.append((template_id, template_plan.digest, case_changes))
+
+    return ret_val
+
+
+class ProcessDiffEngine:
+    """
+    Diffs the cases deriving from template cases across a pool of worker processes.
+
+    Comparing steps lists is pure Python work bound to one core. The engine shards the work by template ID, splitting
+    templates with many derived cases over several shards, and diffs the shards in worker processes. Each template and
+    case is shipped as a tuple of its ID and templated field values only, and workers return the changed fields of
+    the cases with changes only.
+
+    Shards are contiguous runs of templates and results are read back in shard order, so the changes come back in the
+    same order as an in process diff. Work too small to repay starting the workers is diffed in process.
+
+    Workers are spawned rather than forked by default. The diff runs while prefetch, write and profiler threads are
+    alive, and a forked worker could inherit one of their locks in a held state.
+    """
+
+    MIN_POOL_CASES = 5000
+    """ Fewest cases to update for which worker processes are started """
+
+    SHARDS_PER_WORKER = 4
+    """ Shards created per worker, so a worker finishing early picks up more of the work """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, fields: list, end_marker: str, max_workers: int = None, min_pool_cases: int = None,
+                 mp_context=None):
+        """
+        :param fields: The field names to template
+        :param end_marker: The end of template marker string
+        :param max_workers: The number of worker processes. None uses one per CPU
+        :param min_pool_cases: Fewest cases to update for which worker processes are started. None uses
+        MIN_POOL_CASES
+        :param mp_context: Optional multiprocessing context the workers are started with. None uses spawn
+        """
+        self._fields = tuple(fields)
+        self._row_getter = operator.itemgetter('id', *self._fields)
+        self._end_marker = end_marker
+        self._max_workers = max(1, int(max_workers)) if max_workers is not None else (os.cpu_count() or 1)
+        self._min_pool_cases = min_pool_cases if min_pool_cases is not None else self.MIN_POOL_CASES
+        self._mp_context = mp_context if mp_context is not None else multiprocessing.get_context("spawn")
+
+        return
+
+    def diff(self, template_test_cases: dict, cases_to_update: dict):
+        """
+        Diffs every case to update against its template. The case data is not modified
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :return: Returns a generator of (template_id, template digest, list of (test case, changed fields dict)),
+        holding only the cases with changes
+        """
+        case_count = sum(len(cases_to_update[template_id]) for template_id in template_test_cases.keys()
+                         if template_id in cases_to_update)
+
+        if self._max_workers == 1 or case_count < self._min_pool_cases:
+            return self._diff_in_process(template_test_cases, cases_to_update)
+
+        return self._diff_in_pool(self._build_shards(template_test_cases, cases_to_update, case_count),
+                                  cases_to_update, case_count)
+
+    # region Private Functions
+
+    def _diff_in_process(self, template_test_cases: dict, cases_to_update: dict):
+        """
+        Diffs the test cases in this process, without reducing them to rows
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :return: Returns a generator of the results, see diff
+        """
+        for template_id, template_data in template_test_cases.items():
+            if template_id in cases_to_update:
+                template_plan = TemplatePlan(template_data, self._fields, self._end_marker)
+
+                changed_cases = []
+                for case_to_update in cases_to_update[template_id]:
+                    changes = template_plan.diff(case_to_update)
+                    if len(changes) > 0:
+                        changed_cases.append((case_to_update, changes))
+
+                yield template_id, template_plan.digest, changed_cases
+
+    def _diff_in_pool(self, shards: list, cases_to_update: dict, case_count: int):
+        """
+        Diffs the shards in worker processes
+        :param shards: The shards, see _diff_shard
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :param case_count: The number of cases to update
+        :return: Returns a generator of the shard results, see diff
+        """
+        workers = min(self._max_workers, len(shards))
+        self._log.info("Diffing {0} test cases in {1} shards over {2} worker processes"
+                       .format(case_count, len(shards), workers))
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=self._mp_context) as pool:
+            futures = [pool.submit(_diff_shard, self._fields, self._end_marker, shard) for shard in shards]
+            yield from self._resolve_cases((future.result() for future in futures), cases_to_update)
+
+    def _build_shards(self, template_test_cases: dict, cases_to_update: dict, case_count: int) -> list:
+        """
+        Packs the templates and their cases to update into shards of about equal case counts
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :param case_count: The number of cases to update
+        :return: Returns a list of shards, see _diff_shard
+        """
+        shard_size = max(1, -(-case_count // (self._max_workers * self.SHARDS_PER_WORKER)))
+        shards = []
+        shard = []
+        shard_cases = 0
+
+        for template_id, template_data in template_test_cases.items():
+            cases = cases_to_update.get(template_id)
+            if cases is None:
+                continue
+
+            template_row = self._to_row(template_data, strict=True)
+            for start in range(0, max(1, len(cases)), shard_size):
+                case_rows = [self._to_row(case) for case in cases[start:start + shard_size]]
+                shard.append((template_id, template_row, case_rows))
+                shard_cases += len(case_rows)
+
+                if shard_cases >= shard_size:
+                    shards.append(shard)
+                    shard = []
+                    shard_cases = 0
+
+        if len(shard) > 0:
+            shards.append(shard)
+
+        return shards
+
+    def _to_row(self, case_data, strict: bool = False) -> tuple:
+        """
+        Reduces a test case to its ID and the values of the templated fields
+        :param case_data: The test case data, a dict or a CaseRecord
+        :param strict: Raise a KeyError for a missing field, as compiling a template does, rather than using None
+        :return: Returns the row tuple
+        """
+        try:
+            return self._row_getter(case_data)
+        except KeyError:
+            if strict is True:
+                raise
+
+        return (case_data['id'],) + tuple(case_data.get(field) for field in self._fields)
+
+    @staticmethod
+    def _resolve_cases(results, cases_to_update: dict):
+        """
+        Maps the case IDs of shard results back to the test cases
+        :param results: An iterable of shard results, see _diff_shard
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :return: Returns a generator of the results with test cases in place of case IDs, see diff
+        """
+        # The pieces of a template split over several shards come back one after another
+        resolved_template_id = None
+        cases = None
+
+        for shard_result in results:
+            for template_id, template_digest, case_changes in shard_result:
+                if len(case_changes) > 0 and (cases is None or template_id != resolved_template_id):
+                    resolved_template_id = template_id
+                    cases = {case['id']: case for case in cases_to_update[template_id]}
+
+                yield template_id, template_digest, [(cases[case_id], changes) for case_id, changes in case_changes]
+
+    # endregion
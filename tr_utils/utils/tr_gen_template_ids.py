@@ -16,10 +16,13 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # ********************************************************
 
+import asyncio
 import logging
 import uuid
 
 from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_write_executor import summarize_results
+from tr_utils.interface.tr_write_journal import WriteJournal
 
 
 class TemplateIDGen:
@@ -33,7 +36,7 @@ class TemplateIDGen:
 
     def __init__(self, tr_instance: TestRailInterface, template_id_field: str, tr_proj_id: int, tr_suite_id: int,
                  section_ids_csv: str = None, case_ids_csv: str = None, overwrite_existing_id: bool = True,
-                 get_all_child_sections: bool = True):
+                 get_all_child_sections: bool = True, write_journal: WriteJournal = None):
         """
         Template ID gen ctor
 
@@ -45,15 +48,19 @@ class TemplateIDGen:
         :param case_ids_csv: If search for cases by case ID, the list of case IDs to update
         :param overwrite_existing_id: Overwrite existing data found in the template_id_field
         :param get_all_child_sections: If searching by section_ids, include all descendant sections in the search
+        :param write_journal: Optional WriteJournal recording every write outcome. Test cases the journal confirms as
+        written, by an interrupted earlier run of the same job, keep the template ID they were given
         """
         self._tr = tr_instance
         self._tr_proj_id = tr_proj_id
-        self._tr_suite_id = tr_suite_id
+        self._tr_suite_id = int(tr_suite_id) if tr_suite_id is not None else None
         self._template_id_field_name = template_id_field
         self._section_ids = section_ids_csv
         self._case_ids_to_template = case_ids_csv
         self._override_existing_id = overwrite_existing_id
         self._get_all_child_sections = get_all_child_sections
+        self._write_results = []
+        self._write_journal = write_journal
 
         if self._section_ids is not None:
             self._section_ids = self._section_ids.split(',')
@@ -63,29 +70,187 @@ class TemplateIDGen:
 
         return
 
+    @staticmethod
+    def get_case_fields(template_id_field: str) -> list:
+        """
+        Gets the test case fields the template ID generation reads. Retrieved test case data is projected to these
+        fields
+        :param template_id_field: The TestRail case field the unique ID is written to
+        :return: Returns a list of field names
+        """
+        return ['id', 'section_id', template_id_field]
+
+    @property
+    def write_results(self) -> list:
+        """
+        Property for the write results of the last template ID generation
+        :return: A list of WriteResult, one per test case written
+        """
+        return self._write_results
+
     def execute_id_gen(self, dry_run: bool = False) -> int:
         """
         Executes the template ID generation utility.
         :param dry_run: If True, does not write any data to the TestRail database.
         :return:
         """
-        test_case_data = self._tr.tr.cases.get_cases(int(self._tr_proj_id), suite_id=self._tr_suite_id)
+        self._write_results = []
+
+        if self._tr_suite_id is None:
+            with self._tr.phase("suite_lookup"):
+                self._tr_suite_id = self._tr.suites_get_default_suite(int(self._tr_proj_id))
+
+        sections_data = None
+        if self.needs_sections_data() is True:
+            with self._tr.phase("section_expansion"):
+                sections_data = self._tr.retrieve_sections_data(int(self._tr_proj_id), self._tr_suite_id)
+
+        test_case_data = self._tr.iter_testcase_data(int(self._tr_proj_id), self._tr_suite_id, prefetch=True,
+                                                     fields=self.get_case_fields(self._template_id_field_name))
+        test_case_data = self._tr.phased(test_case_data, "case_fetch")
+
+        with self._tr.phase("classify"):
+            cases_to_update = self._skip_journaled_cases(self._find_cases_to_update(test_case_data, sections_data))
+
+        if dry_run is True:
+            self._log.info("Dry run, skipping template ID generation for {0} test cases".format(len(cases_to_update)))
+            return 0
+
+        on_result = self._write_journal.record if self._write_journal is not None else None
+        with self._tr.phase("write"):
+            write_results = self._tr.update_cases(self._assign_template_ids(cases_to_update), on_result)
+
+        return self._process_write_results(write_results)
+
+    async def execute_id_gen_async(self, dry_run: bool = False) -> int:
+        """
+        Executes the template ID generation utility using an AsyncTestRailInterface.
+        :param dry_run: If True, does not write any data to the TestRail database.
+        :return:
+        """
+        self._write_results = []
+
+        if self._tr_suite_id is None:
+            self._tr_suite_id = await self._tr.suites_get_default_suite(int(self._tr_proj_id))
+
+        if self.needs_sections_data() is True:
+            test_case_data, sections_data = await asyncio.gather(
+                self._tr.retrieve_testcase_data(int(self._tr_proj_id), suite_id=self._tr_suite_id),
+                self._tr.retrieve_sections_data(int(self._tr_proj_id), self._tr_suite_id))
+        else:
+            test_case_data = await self._tr.retrieve_testcase_data(int(self._tr_proj_id), suite_id=self._tr_suite_id)
+            sections_data = None
+
+        cases_to_update = self._find_cases_to_update(test_case_data, sections_data)
 
-        if self._get_all_child_sections is True:
-            self._section_ids = self._get_child_sections()
+        if dry_run is True:
+            self._log.info("Dry run, skipping template ID generation for {0} test cases".format(len(cases_to_update)))
+            return 0
 
-        cases_to_update = self._get_cases_to_update(test_case_data, self._section_ids, self._case_ids_to_template)
+        write_results = await self._tr.update_cases(self._assign_template_ids(cases_to_update))
+
+        return self._process_write_results(write_results)
+
+    def generate_template_ids(self, test_case_data, sections_data: list = None) -> list:
+        """
+        Generates template IDs for the matching test cases of already retrieved test case data, without writing them.
+        The template IDs are set on the test case data in place, so later stages over the same data see them
+        :param test_case_data: The source test cases, a list or an iterable streaming the test cases
+        :param sections_data: The raw sections data, or None to skip expanding child sections
+        :return: Returns a list of (case_id, template ID field dict) tuples to write
+        """
+        cases_to_update = self._skip_journaled_cases(self._find_cases_to_update(test_case_data, sections_data))
+
+        return self._assign_template_ids(cases_to_update)
+
+    def needs_sections_data(self) -> bool:
+        """
+        Determines if section data is required to expand the section IDs into their child sections
+        :return: Returns True if section data should be retrieved
+        """
+        return self._get_all_child_sections is True and self._section_ids is not None
+
+    def _find_cases_to_update(self, test_case_data, sections_data: list = None) -> list:
+        """
+        Expands the section IDs, when section data is provided, and identifies the test cases to generate IDs for
+        :param test_case_data: The source test cases, a list or an iterable streaming the test cases
+        :param sections_data: The raw sections data, or None to skip expanding child sections
+        :return: Returns a list of test cases to generate template IDs for
+        """
+        if sections_data is not None:
+            self._section_ids = self._get_child_sections(sections_data)
+
+        return self._get_cases_to_update(test_case_data, self._section_ids, self._case_ids_to_template)
+
+    def _skip_journaled_cases(self, cases_to_update: list) -> list:
+        """
+        Removes the test cases the write journal confirms as already written
+        :param cases_to_update: The test cases to generate template IDs for
+        :return: Returns the filtered list
+        """
+        if self._write_journal is None:
+            return cases_to_update
+
+        completed = self._write_journal.completed_case_ids
+        ret_val = [test_case for test_case in cases_to_update if test_case['id'] not in completed]
+        if len(ret_val) != len(cases_to_update):
+            self._log.info("Skipping {0} test cases already written according to journal {1}"
+                           .format(len(cases_to_update) - len(ret_val), self._write_journal.path))
+
+        return ret_val
+
+    def _assign_template_ids(self, cases_to_update: list) -> list:
+        """
+        Generates a new unique template ID for each of the provided test cases
+        :param cases_to_update: The test cases to generate template IDs for
+        :return: Returns a list of (case_id, template ID field dict) tuples to write
+        """
+        updates = []
 
         for test_case in cases_to_update:
-            if dry_run is False:
-                template_id = uuid.uuid4().hex
-                self._log.debug("Template ID: {0} generated for CaseID: {1}", template_id, test_case['id'])
-                test_case[self._template_id_field_name] = template_id
-                self._tr.tr.cases.update_case(test_case['id'], **test_case)
-        # TODO: cf: Error code setting and handling for failed steps.
+            template_id = uuid.uuid4().hex
+            self._log.debug("Template ID: {0} generated for CaseID: {1}".format(template_id, test_case['id']))
+            test_case[self._template_id_field_name] = template_id
+            updates.append((test_case['id'], {self._template_id_field_name: template_id}))
+
+        return updates
+
+    def _process_write_results(self, write_results: list) -> int:
+        """
+        Records and logs the write results
+        :param write_results: A list of WriteResult
+        :return: Returns 0 if every write succeeded, otherwise 2
+        """
+        self._write_results = write_results
+        cases_updated, cases_failed = summarize_results(write_results)
+        self._update_template_index(write_results)
+
+        self._log.info("Updated {0} test cases. The following test case IDs have been updated {1}".
+                       format(len(cases_updated), str.join(',', cases_updated)))
+
+        if len(cases_failed) > 0:
+            self._log.error("Failed to update {0} test cases. The following test case IDs failed to update {1}"
+                            .format(len(cases_failed), str.join(',', cases_failed)))
+            return 2
 
         return 0
 
+    def _update_template_index(self, write_results: list):
+        """
+        Adds the newly generated template IDs to the template index, when one is in use
+        :param write_results: A list of WriteResult
+        :return:
+        """
+        template_index = self._tr.template_index
+        if template_index is None:
+            return
+
+        template_index.upsert_cases(int(self._tr_proj_id), self._tr_suite_id, self._template_id_field_name,
+                                    [result.response for result in write_results
+                                     if result.success is True and isinstance(result.response, dict)])
+
+        return
+
     def _get_cases_to_update(self, test_case_data: list, section_ids: list = None,
                              test_case_ids: list = None) -> list:
         """
@@ -108,12 +273,14 @@ class TemplateIDGen:
         try:
             # dupe code to avoid unneeded if checks
             if section_ids is not None:
+                section_ids = {int(sec_id) for sec_id in section_ids}
                 for test_case in test_case_data:
                     sec_id = test_case['section_id']
-                    if sec_id is not None and str(sec_id) in section_ids:
+                    if sec_id is not None and int(sec_id) in section_ids:
                         if test_case[self._template_id_field_name] is None or self._override_existing_id is True:
                             cases_to_update.append(test_case)
             else:
+                test_case_ids = {int(case_id) for case_id in test_case_ids}
                 for test_case in test_case_data:
                     if test_case['id'] in test_case_ids:
                         if test_case[self._template_id_field_name] is None or self._override_existing_id is True:
@@ -124,24 +291,21 @@ class TemplateIDGen:
 
         cases_len = len(cases_to_update)
         if cases_len > 0:
-            self._log.info("Found {0} cases to generate template IDs for", cases_len)
+            self._log.info("Found {0} cases to generate template IDs for".format(cases_len))
 
         return cases_to_update
 
-    def _get_child_sections(self) -> list:
+    def _get_child_sections(self, sections_data: list) -> list:
         """
         Retrieve all descendants of the provided section ids
+        :param sections_data: The raw sections data for the suite
         :return: Returns a list of section ids
         """
         new_sec_ids = []
 
         try:
-            sections = self._tr.tr.sections.get_sections(int(self._tr_proj_id), suite_id=self._tr_suite_id)
-            for section_id in self._section_ids:
-                new_sec_ids.append(section_id)
-                child_secs = self._tr.get_child_sections([int(section_id)], sections)
-                if len(child_secs) > 0:
-                    new_sec_ids.extend(child_secs)
+            section_tree = self._tr.build_section_tree(sections_data)
+            new_sec_ids = self._tr.get_child_sections(self._section_ids, section_tree)
 
         except Exception as e:
             self._log.exception("Exception caught when retrieving source test cases for templater! Exception: {0}"
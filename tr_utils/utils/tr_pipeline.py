@@ -0,0 +1,214 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import logging
+
+from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_write_executor import summarize_results
+from tr_utils.interface.tr_write_journal import WriteJournal
+from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
+from tr_utils.utils.tr_templater import TestRailTemplater
+
+
+class TemplatePipeline:
+    """
+    Runs template ID generation followed by the templater over a single snapshot of the suite.
+
+    Running templateidgen and then templater retrieves the suite's test cases and sections twice. The pipeline
+    retrieves them once, assigns the missing template IDs in memory, then classifies and diffs the same data with the
+    new template IDs in place. The changes of both stages are merged by case ID, so each test case is written with a
+    single update_case request.
+
+    Both stages use the same section IDs or case IDs. Existing template IDs are never overwritten, a new template ID
+    would detach the test cases already deriving from the template case.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, tr_instance: TestRailInterface, tr_proj_id: int, template_id_field: str,
+                 template_fields_csv: str, section_ids_csv: str = None, case_ids_csv: str = None,
+                 tr_suite_id: int = None, end_marker_override: str = None, get_all_child_sections: bool = True,
+                 write_journal: WriteJournal = None):
+        """
+        :param tr_instance: Initialized instance of TestRailInterface
+        :param tr_proj_id: The TestRail project ID to work on
+        :param template_id_field: The name of the field containing the template ID data
+        :param template_fields_csv: A CSV formatted string containing the field names to template
+        :param section_ids_csv: A CSV formatted string of the section IDs containing the template test cases
+        :param case_ids_csv: A CSV formatted string of the template test case IDs
+        :param tr_suite_id: The suite ID within the TestRail project ID, if applicable
+        :param end_marker_override: An override of the templater's default end marker
+        :param get_all_child_sections: If templating by section IDs, include all descendant sections
+        :param write_journal: Optional WriteJournal recording every write outcome with the digest of the template
+        written. A resumed run skips the templated changes of the test cases the journal confirms as written from a
+        template with the same digest. Cases given a template ID by the interrupted run already hold it
+        """
+        self._tr = tr_instance
+        self._tr_proj_id = int(tr_proj_id) if tr_proj_id is not None else None
+        self._tr_suite_id = int(tr_suite_id) if tr_suite_id is not None else None
+        self._template_id_field_name = template_id_field
+        self._template_fields_csv = template_fields_csv
+        self._write_journal = write_journal
+        self._write_results = []
+
+        self._id_gen = TemplateIDGen(tr_instance, template_id_field, self._tr_proj_id, self._tr_suite_id,
+                                     section_ids_csv, case_ids_csv, overwrite_existing_id=False,
+                                     get_all_child_sections=get_all_child_sections)
+        self._templater = TestRailTemplater(tr_instance, self._tr_proj_id, template_id_field, template_fields_csv,
+                                            section_ids_csv, case_ids_csv, self._tr_suite_id,
+                                            end_marker_override=end_marker_override,
+                                            get_all_child_sections=get_all_child_sections,
+                                            write_journal=write_journal)
+
+        return
+
+    @property
+    def write_results(self) -> list:
+        """
+        Property for the write results of the last pipeline execution
+        :return: A list of WriteResult, one per test case written
+        """
+        return self._write_results
+
+    def execute_pipeline(self, dry_run: bool = False) -> int:
+        """
+        Executes template ID generation and the templater over one retrieval of the suite
+        :param dry_run: If True, does not write any data to the TestRail database.
+        :return: Returns 0 on success, 1 on missing parameters, otherwise 2 if any write failed
+        """
+        self._write_results = []
+
+        if self._verify_params() is False:
+            self._log.error("Pipeline missing or failed to parse the required parameters. Please check logs. Exiting!")
+            return 1
+
+        if self._tr_suite_id is None:
+            with self._tr.phase("suite_lookup"):
+                self._tr_suite_id = self._tr.suites_get_default_suite(self._tr_proj_id)
+
+        sections_data = None
+        if self._templater.needs_sections_data() is True:
+            with self._tr.phase("section_expansion"):
+                sections_data = self._tr.retrieve_sections_data(self._tr_proj_id, self._tr_suite_id)
+
+        # Both stages walk the data, the snapshot is kept in memory rather than streamed
+        self._log.info("Retrieving test case data for project {0} using suite ID: {1}".format(self._tr_proj_id,
+                                                                                              self._tr_suite_id))
+        with self._tr.phase("case_fetch"):
+            test_case_data = list(self._tr.iter_testcase_data(self._tr_proj_id, self._tr_suite_id, prefetch=True,
+                                                              fields=self._get_case_fields()))
+        self._log.info("Found {0} test cases!".format(len(test_case_data)))
+
+        with self._tr.phase("classify"):
+            id_changes = self._id_gen.generate_template_ids(test_case_data, sections_data)
+        template_changes = self._templater.diff_test_case_data(test_case_data, sections_data)
+
+        case_changes = self._merge_case_changes(id_changes, template_changes)
+        self._log.info("Generated {0} template IDs and found {1} templated changes, {2} test cases to write"
+                       .format(len(id_changes), len(template_changes), len(case_changes)))
+
+        if dry_run is True:
+            self._log.info("Dry run, skipping writes for {0} test cases".format(len(case_changes)))
+            return 0
+
+        on_result = self._record_write if self._write_journal is not None else None
+        with self._tr.phase("write"):
+            write_results = self._tr.update_cases(case_changes, on_result)
+
+        return self._process_write_results(write_results)
+
+    # region Private Functions
+
+    def _get_case_fields(self) -> list:
+        """
+        Gets the test case fields read by either stage
+        :return: Returns a list of field names
+        """
+        fields = TemplateIDGen.get_case_fields(self._template_id_field_name) + \
+            TestRailTemplater.get_case_fields(self._template_id_field_name, self._template_fields_csv)
+
+        return list(dict.fromkeys(fields))
+
+    @staticmethod
+    def _merge_case_changes(*stage_changes) -> list:
+        """
+        Merges the changes of each stage into one change per test case. Later stages win on a field both change
+        :param stage_changes: Lists of (case_id, changed fields dict) tuples, in stage order
+        :return: Returns a list of (case_id, changed fields dict) tuples, in the order test cases were first changed
+        """
+        merged = {}
+        for changes in stage_changes:
+            for case_id, fields in changes:
+                merged.setdefault(case_id, {}).update(fields)
+
+        return list(merged.items())
+
+    def _record_write(self, result):
+        """
+        Journals a write outcome with the digest of the template written, if the write holds templated changes
+        :param result: The WriteResult
+        :return:
+        """
+        self._write_journal.record(result, self._templater.template_digest(result.case_id))
+
+    def _process_write_results(self, write_results: list) -> int:
+        """
+        Records and logs the write results, and updates the template index when one is in use
+        :param write_results: A list of WriteResult
+        :return: Returns 0 if every write succeeded, otherwise 2
+        """
+        self._write_results = write_results
+        cases_updated, cases_failed = summarize_results(write_results)
+
+        template_index = self._tr.template_index
+        if template_index is not None:
+            template_index.upsert_cases(self._tr_proj_id, self._tr_suite_id, self._template_id_field_name,
+                                        [result.response for result in write_results
+                                         if result.success is True and isinstance(result.response, dict)])
+
+        self._log.info("Updated {0} test cases. The following test case IDs have been updated {1}".
+                       format(len(cases_updated), str.join(',', cases_updated)))
+
+        if len(cases_failed) > 0:
+            self._log.error("Failed to update {0} test cases. The following test case IDs failed to update {1}"
+                            .format(len(cases_failed), str.join(',', cases_failed)))
+            return 2
+
+        return 0
+
+    def _verify_params(self) -> bool:
+        """
+        Verifies the required parameters for the pipeline are populated.
+        :return: Returns False if required parameters are missing or invalid.
+        """
+        if self._tr_proj_id is None:
+            self._log.error("Missing TestRail project ID. This is required for the pipeline.")
+            return False
+
+        if self._template_id_field_name is None:
+            self._log.error("Missing template ID field name! This value is needed to generate and find template IDs.")
+            return False
+
+        if self._template_fields_csv is None or len(self._template_fields_csv) == 0:
+            self._log.error("Missing field names to template. This value is needed to set field values in the templated"
+                            " test cases")
+            return False
+
+        return True
+
+    # endregion
@@ -0,0 +1,261 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+
+
+class PhaseProfiler:
+    """
+    Times the phases of a utility run, see TestRailInterface.phase. Register it with
+    TestRailInterface.add_phase_listener and wrap the run in start / stop.
+
+    Phase time is exclusive: while a nested phase runs, for example case_fetch pulling the next page of a suite stream
+    during classify, the time counts toward the nested phase only. Time outside of any phase is reported as untagged.
+
+    The CPU-bound phases can additionally be profiled, either with cProfile or with a sampling profiler. The sampling
+    profiler writes collapsed stacks, one 'phase;frame;frame count' line per distinct stack, for flamegraph tools.
+    """
+
+    CPU_PHASES = ("section_expansion", "classify", "diff")
+    CPU_PROFILERS = ("cprofile", "sample")
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, cpu_profiler: str = None, sample_interval: float = 0.005, cpu_phases: tuple = None):
+        """
+        :param cpu_profiler: None, 'cprofile' or 'sample'
+        :param sample_interval: Seconds between stack samples of the sampling profiler
+        :param cpu_phases: The phases to CPU profile. Defaults to CPU_PHASES
+        """
+        if cpu_profiler is not None and cpu_profiler not in PhaseProfiler.CPU_PROFILERS:
+            raise ValueError("Unknown CPU profiler {0}, expected one of {1}"
+                             .format(cpu_profiler, ", ".join(PhaseProfiler.CPU_PROFILERS)))
+
+        self._cpu_profiler = cpu_profiler
+        self._sample_interval = sample_interval
+        self._cpu_phases = frozenset(cpu_phases if cpu_phases is not None else PhaseProfiler.CPU_PHASES)
+        self._lock = threading.Lock()
+        self._stacks = threading.local()
+        self._seconds = {}
+        self._entries = {}
+        self._started = None
+        self._stopped = None
+
+        self._cprofile = cProfile.Profile() if cpu_profiler == "cprofile" else None
+        self._cprofile_thread = None
+        self._sampled_threads = {}
+        """ thread ID -> CPU phase currently running on that thread, read by the sampler """
+        self._samples = {}
+        self._sampler = None
+        self._sampling = threading.Event()
+
+        return
+
+    # region Phase Listener
+
+    def phase_entered(self, name: str):
+        now = time.perf_counter()
+        stack = self._thread_stack()
+
+        if len(stack) > 0:
+            self._charge(stack[-1][0], now - stack[-1][1])
+        stack.append([name, now])
+
+        with self._lock:
+            self._entries[name] = self._entries.get(name, 0) + 1
+
+        self._cpu_phase_changed(name)
+
+    def phase_exited(self, name: str):
+        now = time.perf_counter()
+        stack = self._thread_stack()
+        if len(stack) == 0:
+            return
+
+        top_name, top_started = stack.pop()
+        self._charge(top_name, now - top_started)
+
+        if len(stack) > 0:
+            stack[-1][1] = now
+        self._cpu_phase_changed(stack[-1][0] if len(stack) > 0 else None)
+
+    # endregion Phase Listener
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._stopped = None
+
+        if self._cpu_profiler == "sample":
+            self._sampling.set()
+            self._sampler = threading.Thread(target=self._sample_loop, name="tr_profile_sampler", daemon=True)
+            self._sampler.start()
+
+        return self
+
+    def stop(self):
+        self._stopped = time.perf_counter()
+
+        if self._sampler is not None:
+            self._sampling.clear()
+            self._sampler.join()
+            self._sampler = None
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def total_seconds(self) -> float:
+        if self._started is None:
+            return 0.0
+
+        return (self._stopped if self._stopped is not None else time.perf_counter()) - self._started
+
+    def timings(self) -> dict:
+        """
+        :return: Returns a dict of phase name -> {'seconds': exclusive seconds, 'entries': times entered}, with the
+        time outside of any phase under 'untagged'
+        """
+        with self._lock:
+            ret_val = {name: {"seconds": seconds, "entries": self._entries.get(name, 0)}
+                       for name, seconds in self._seconds.items()}
+
+        tagged = sum(timing['seconds'] for timing in ret_val.values())
+        ret_val["untagged"] = {"seconds": max(0.0, self.total_seconds - tagged), "entries": 0}
+
+        return ret_val
+
+    def report(self, metrics=None) -> str:
+        """
+        Formats the phase timings as a table
+        :param metrics: Optional MetricsCollector to add the API calls and API latency made in each phase
+        :return: Returns the report text
+        """
+        phase_calls = metrics.to_dict()['phases'] if metrics is not None else {}
+        total = self.total_seconds
+
+        lines = ["{0:<20}{1:>12}{2:>8}{3:>10}{4:>12}{5:>14}".format("phase", "seconds", "%", "entries",
+                                                                     "api calls", "api seconds")]
+        for name, timing in sorted(self.timings().items(), key=lambda item: -item[1]['seconds']):
+            calls = phase_calls.get(name if name != "untagged" else "none", {})
+            lines.append("{0:<20}{1:>12.3f}{2:>8.1f}{3:>10}{4:>12}{5:>14.3f}".format(
+                name, timing['seconds'], 100.0 * timing['seconds'] / total if total > 0 else 0.0, timing['entries'],
+                calls.get('count', 0), calls.get('latency_sum', 0.0)))
+        lines.append("{0:<20}{1:>12.3f}".format("total", total))
+
+        return "\n".join(lines)
+
+    def write_cpu_profile(self, path: str):
+        """
+        Writes the CPU profile: pstats data for cProfile, collapsed stacks for the sampling profiler
+        :param path: The output file path
+        :return:
+        """
+        if self._cpu_profiler == "cprofile":
+            self._cprofile.dump_stats(path)
+        elif self._cpu_profiler == "sample":
+            with self._lock:
+                samples = sorted(self._samples.items())
+            with open(path, "w") as collapsed_file:
+                for stack, count in samples:
+                    collapsed_file.write("{0} {1}\n".format(stack, count))
+        else:
+            return
+
+        self._log.info("Wrote the {0} CPU profile to {1}".format(self._cpu_profiler, path))
+
+    # region Private Functions
+
+    def _thread_stack(self) -> list:
+        stack = getattr(self._stacks, "stack", None)
+        if stack is None:
+            stack = self._stacks.stack = []
+
+        return stack
+
+    def _charge(self, name: str, seconds: float):
+        with self._lock:
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+
+    def _cpu_phase_changed(self, name):
+        """
+        Starts or stops CPU profiling of the calling thread as its innermost phase changes
+        :param name: The calling thread's innermost phase, None outside of any phase
+        :return:
+        """
+        profile = name in self._cpu_phases
+
+        if self._cprofile is not None:
+            # A cProfile.Profile must not be enabled on two threads at once, only the first thread to enter a CPU
+            # phase is profiled
+            with self._lock:
+                if self._cprofile_thread is None and profile is True:
+                    self._cprofile_thread = threading.get_ident()
+                if self._cprofile_thread != threading.get_ident():
+                    return
+            if profile is True:
+                self._cprofile.enable()
+            else:
+                self._cprofile.disable()
+        elif self._cpu_profiler == "sample":
+            with self._lock:
+                if profile is True:
+                    self._sampled_threads[threading.get_ident()] = name
+                else:
+                    self._sampled_threads.pop(threading.get_ident(), None)
+
+    def _sample_loop(self):
+        while self._sampling.is_set():
+            with self._lock:
+                sampled_threads = dict(self._sampled_threads)
+
+            if len(sampled_threads) > 0:
+                frames = sys._current_frames()
+                for thread_id, phase_name in sampled_threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._record_sample(phase_name, frame)
+
+            time.sleep(self._sample_interval)
+
+    def _record_sample(self, phase_name: str, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append("{0} ({1}:{2})".format(code.co_name, os.path.basename(code.co_filename),
+                                                code.co_firstlineno))
+            frame = frame.f_back
+        names.append(phase_name)
+
+        stack = ";".join(reversed(names))
+        with self._lock:
+            self._samples[stack] = self._samples.get(stack, 0) + 1
+
+    # endregion Private Functions
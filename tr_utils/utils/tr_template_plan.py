@@ -0,0 +1,195 @@
+######################## LICENSE ########################
+# MIT License
+# Copyright (c) 2019 Corefracture, cf, Chris Coleman
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the
+# Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#########################################################
+
+import hashlib
+import json
+
+
+def field_digest(value) -> str:
+    """
+    Creates a stable digest of a normalized field value
+    :param value: A JSON serializable field value
+    :return: Returns the hex digest string
+    """
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def normalize_steps(steps: list, count: int = None) -> list:
+    """
+    Reduces a steps field to the content and expected pairs the templater compares on
+    :param steps: The steps data list
+    :param count: Only normalize the first 'count' steps. None normalizes all steps
+    :return: Returns a list of [content, expected] pairs
+    """
+    if count is not None:
+        steps = steps[:count]
+
+    return [[step.get('content'), step.get('expected')] for step in steps]
+
+
+def find_end_marker_step(steps: list, end_marker: str) -> int:
+    """
+    Finds the index of the first step whose content contains the end marker
+    :param steps: The steps data list
+    :param end_marker: The end marker string
+    :return: Returns the step index, or -1 if the marker is not found
+    """
+    contents = [step.get('content') or "" for step in steps]
+
+    # Most cases never contain a marker, rule that out with a single substring search first
+    if end_marker not in "\n".join(contents):
+        return -1
+
+    for i in range(0, len(contents)):
+        if end_marker in contents[i]:
+            return i
+
+    return -1
+
+
+def handle_string_replacement(template_data: str, case_data: str, end_marker: str) -> str:
+    """
+    Replaces the templated portion of a string, the text before the end marker, with the template data
+    :param template_data: The template string
+    :param case_data: The case string containing the end marker
+    :param end_marker: The end marker string
+    :return: Returns the new string, or an empty string if the templated portion is already up to date
+    """
+    ret_val = "{0}{1}{2}"
+
+    splits = case_data.split(end_marker)
+    if len(splits) > 1:
+        if template_data == splits[0]:
+            return ""
+        ret_val = ret_val.format(template_data, end_marker, splits[1])
+
+    return ret_val
+
+
+class TemplatePlan:
+    """
+    A template test case compiled for repeated comparison against the cases deriving from it.
+
+    Each templated field is normalized once when the plan is built, and digested once for the plan's digest. The
+    templated steps of a target case are normalized and compared against the template's normalized steps directly,
+    a list comparison that stops at the first differing step. String and scalar fields are compared directly.
+    """
+
+    _STEPS = "steps"
+    _STRING = "string"
+    _VALUE = "value"
+
+    def __init__(self, template_case: dict, fields: list, end_marker: str):
+        """
+        :param template_case: The template test case data
+        :param fields: The field names to template
+        :param end_marker: The end of template marker string
+        """
+        self.case_id = template_case['id']
+        self._end_marker = end_marker
+        self._fields = []
+        self.field_digests = {}
+
+        for field in fields:
+            value = template_case[field]
+
+            if type(value) is list:
+                kind = TemplatePlan._STEPS
+                normalized = normalize_steps(value)
+            elif type(value) is str:
+                kind = TemplatePlan._STRING
+                normalized = value
+            else:
+                kind = TemplatePlan._VALUE
+                normalized = value
+
+            self.field_digests[field] = field_digest(normalized)
+            self._fields.append((field, kind, value, normalized))
+
+        # No case matches templated steps holding the end marker, its first marker would fall within the templated steps
+        self._steps_hold_marker = {field: find_end_marker_step(value, end_marker) > -1
+                                   for field, kind, value, normalized in self._fields if kind == TemplatePlan._STEPS}
+
+        self.digest = field_digest(self.field_digests)
+        """ Digest covering every templated field of the template case """
+
+        return
+
+    @property
+    def fields(self) -> list:
+        return [field[0] for field in self._fields]
+
+    def diff(self, case_data: dict) -> dict:
+        """
+        Compares a target case against the template
+        :param case_data: The target test case data. The case data is not modified
+        :return: Returns a dict of field name -> new field value for every field requiring an update
+        """
+        changes = {}
+
+        for field, kind, value, normalized in self._fields:
+            case_value = case_data.get(field)
+
+            if kind == TemplatePlan._STEPS:
+                if self._steps_match(field, case_value, normalized) is True:
+                    continue
+
+                end_marker_index = -1
+                if type(case_value) is list:
+                    end_marker_index = find_end_marker_step(case_value, self._end_marker)
+
+                if end_marker_index == -1:
+                    changes[field] = value
+                else:
+                    new_steps = []
+                    new_steps.extend(value)
+                    new_steps.extend(case_value[end_marker_index:])
+                    changes[field] = new_steps
+
+            elif kind == TemplatePlan._STRING:
+                if case_value != value and type(case_value) is str and self._end_marker in case_value:
+                    new_str_data = handle_string_replacement(value, case_value, self._end_marker)
+                    if new_str_data != "":
+                        changes[field] = new_str_data
+
+            elif case_value != value:
+                changes[field] = value
+
+        return changes
+
+    def _steps_match(self, field: str, case_steps, normalized_template: list) -> bool:
+        """
+        Checks if the templated steps of a target case steps field are in sync with the template
+        :param field: The steps field name
+        :param case_steps: The target case steps data
+        :param normalized_template: The normalized template steps, see normalize_steps
+        :return: Returns True if the templated steps match
+        """
+        template_len = len(normalized_template)
+        if type(case_steps) is not list or len(case_steps) < template_len or self._steps_hold_marker[field] is True:
+            return False
+
+        if normalize_steps(case_steps, template_len) != normalized_template:
+            return False
+
+        # The templated steps equal the template's and so hold no end marker. The steps after them must either start
+        # with the marker or not contain it at all
+        return len(case_steps) == template_len or \
+            find_end_marker_step(case_steps[template_len:], self._end_marker) in (-1, 0)
@@ -16,9 +16,18 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # ********************************************************
 
+import asyncio
+import itertools
 import logging
+import time
 
 from tr_utils.interface.tr_interface import TestRailInterface
+from tr_utils.interface.tr_write_executor import summarize_results
+from tr_utils.interface.tr_write_journal import WriteJournal
+from tr_utils.utils.tr_case_classifier import CaseClassification, CaseClassifier
+from tr_utils.utils.tr_change_plan import ChangePlanWriter
+from tr_utils.utils.tr_diff_pool import ProcessDiffEngine
+from tr_utils.utils.tr_template_plan import TemplatePlan
 
 
 class TestRailTemplater:
@@ -73,9 +82,21 @@ class TestRailTemplater:
 
         return
 
+    @staticmethod
+    def get_case_fields(template_id_field: str, template_fields_csv: str) -> list:
+        """
+        Gets the test case fields the templater reads. Retrieved test case data is projected to these fields
+        :param template_id_field: The name of the field containing the template ID data
+        :param template_fields_csv: A CSV formatted string containing the field names to template
+        :return: Returns a list of field names
+        """
+        return ['id', 'section_id', 'updated_on', template_id_field] + template_fields_csv.split(',')
+
     def __init__(self, tr_instance: TestRailInterface, tr_proj_id: int, template_id_field: str,
                  template_fields_csv: str, section_ids_csv: str = None, case_ids_csv: str = None,
-                 tr_suite_id: int = None, end_marker_override: str = None, get_all_child_sections: bool = True):
+                 tr_suite_id: int = None, end_marker_override: str = None, get_all_child_sections: bool = True,
+                 fetch_templates_by_section: bool = False, write_journal: WriteJournal = None,
+                 diff_workers: int = None):
         """
         :param tr_instance: The instance of TestRailInterface. The test rail interface allows for communication
         to the test rail server, as well as some small utility functions
@@ -95,19 +116,38 @@ class TestRailTemplater:
         case_ids_csv parameter instead of the section_ids parameter if your test cases and template cases reside
         in the same section
 
-        :param end_marker_override: An override of the default end marker. See the _end_marker class variable
+        :param end_marker_override: An override of the default end marker for this templater. See the _end_marker
+        class variable
+
+        :param fetch_templates_by_section: When templating by section, retrieve the template cases with a filtered
+        get_cases request per section instead of scanning the whole suite for them. Derived test cases are then found
+        through the template index when one is built.
+
+        :param write_journal: Optional WriteJournal recording every write outcome with the digest of the template
+        written. A resumed run skips the test cases the journal confirms as written from a template with the same
+        digest, a case whose template changed since is diffed again
+
+        :param diff_workers: Diff the test cases in this many worker processes, sharded by template ID. None or 1
+        diffs in process. See ProcessDiffEngine
         """
+        self._write_results = []
+        self._write_journal = write_journal
+        self._diff_workers = diff_workers
+        self._case_digests = {}
 
         try:
+            # Overridden per instance so templaters with different markers can run side by side
             if end_marker_override is not None:
-                TestRailTemplater._set_default_end_marker(end_marker_override)
+                self._end_marker = end_marker_override
 
             self._tr = tr_instance
             self._tr_proj_id = tr_proj_id
             self._tr_suite_id = tr_suite_id
             self._template_id_field_name = template_id_field
             self._fields_to_template = template_fields_csv.split(',')
+            self._case_fields = self.get_case_fields(template_id_field, template_fields_csv)
             self._get_all_child_sections = get_all_child_sections
+            self._fetch_templates_by_section = fetch_templates_by_section
 
             self._template_src_section_ids = []
             if section_ids_csv is not None:
@@ -124,250 +164,422 @@ class TestRailTemplater:
 
         return
 
-    def execute_templater(self, dry_run: bool = False) -> int:
+    @property
+    def write_results(self) -> list:
+        """
+        Property for the write results of the last templater execution
+        :return: A list of WriteResult, one per test case written
+        """
+        return self._write_results
+
+    def execute_templater(self, dry_run: bool = False, plan_path: str = None) -> int:
         """
         Executes the templater utility
         :param dry_run: When set to True dry_run prevents changes from being written to the test rail database
+        :param plan_path: When set the changes are written to this change plan file instead of the TestRail server,
+        to be applied later with ChangePlanApplier
         :return:
         """
+        planned_at = time.time()
 
         # Assume the project is using single suite mode and grab the default suite for the project
         if self._tr_suite_id is None:
-            self._tr_suite_id = self._tr.suites_get_default_suite(self._tr_proj_id)
+            with self._tr.phase("suite_lookup"):
+                self._tr_suite_id = self._tr.suites_get_default_suite(self._tr_proj_id)
+
+        if self._verify_params() is False:
+            self._log.error("Templater missing or failed to parse the required parameters. Please check logs. Exiting!")
+            return 1
+
+        if self.needs_sections_data() is True:
+            with self._tr.phase("section_expansion"):
+                sections_data = self._tr.retrieve_sections_data(self._tr_proj_id, self._tr_suite_id)
+                self._expand_template_sections(sections_data)
+
+        # Streamed test case data is fetched while it is classified, the page reads keep the case_fetch phase
+        test_case_data = self._tr.phased(self._retrieve_testcase_data(), "case_fetch")
+        with self._tr.phase("classify"):
+            classification = self._classify_test_case_data(test_case_data)
+        self._log.info("Found {0} test cases!".format(classification.cases_scanned))
+
+        if plan_path is not None:
+            return self._plan_test_cases(classification.template_cases, classification.cases_to_update, plan_path,
+                                         planned_at)
+
+        self._log.info("Beginning test case update process. Dry Run: {0}".format(dry_run))
+        case_ids_updated = self._update_test_cases(classification.template_cases, classification.cases_to_update,
+                                                   dry_run)
+
+        return self._log_update_summary(case_ids_updated)
+
+    async def execute_templater_async(self, dry_run: bool = False) -> int:
+        """
+        Executes the templater utility using an AsyncTestRailInterface. Case and section data are fetched
+        concurrently and all writes are issued together, bounded by the async interface's in-flight limit.
+        :param dry_run: When set to True dry_run prevents changes from being written to the test rail database
+        :return:
+        """
+
+        if self._tr_suite_id is None:
+            self._tr_suite_id = await self._tr.suites_get_default_suite(self._tr_proj_id)
 
         if self._verify_params() is False:
             self._log.error("Templater missing or failed to parse the required parameters. Please check logs. Exiting!")
             return 1
 
-        # Retrieve all test case data from the target project / suite
         self._log.info("Retrieving test case data for project {0} using suite ID: {1}".format(self._tr_proj_id,
                                                                                               self._tr_suite_id))
-        test_case_data = self._tr.retrieve_testcase_data(self._tr_proj_id, suite_id=self._tr_suite_id)
+        if self.needs_sections_data() is True:
+            test_case_data, sections_data = await asyncio.gather(
+                self._tr.retrieve_testcase_data(self._tr_proj_id, suite_id=self._tr_suite_id),
+                self._tr.retrieve_sections_data(self._tr_proj_id, self._tr_suite_id))
+        else:
+            test_case_data = await self._tr.retrieve_testcase_data(self._tr_proj_id, suite_id=self._tr_suite_id)
+            sections_data = None
         self._log.info("Found {0} test cases!".format(len(test_case_data)))
 
-        if self._get_all_child_sections is True and len(self._template_src_section_ids) > 0:
-            sections_data = self._tr.retrieve_sections_data(self._tr_proj_id, self._tr_suite_id)
-            self._template_src_section_ids = self._tr.get_child_sections(self._template_src_section_ids, sections_data)
+        if sections_data is not None:
+            self._expand_template_sections(sections_data)
 
+        classification = self._classify_test_case_data(test_case_data)
 
-        if self._template_src_case_ids is None or len(self._template_src_case_ids) > 0:
-            # Get the template test cases from the source test case data
-            self._log.info("Beginning to search for template test cases under the provided section IDs")
-            template_case_data = self._get_template_cases_from_secs(test_case_data, self._template_src_section_ids,
-                                                                    self._template_id_field_name)
-            self._template_src_case_ids = self._tr.get_case_ids_from_case_data(list(template_case_data.values()))
-            self._log.info("Found {0} template test cases!".format(len(template_case_data)))
-        else:
-            self._log.info("Beginning to search for template test cases with the provided template test case ids")
-            template_case_data = self._get_template_cases_from_case_ids(self._template_src_case_ids, test_case_data,
-                                                                        self._template_id_field_name)
+        self._log.info("Beginning test case update process. Dry Run: {0}".format(dry_run))
+        self._write_results = []
+        case_changes = self._diff_test_cases(classification.template_cases, classification.cases_to_update)
 
-        self._log.info("Beginning to search for test cases to update that have matching template ID values")
-        test_cases_to_update = self._get_cases_to_update(list(template_case_data.keys()), self._template_src_case_ids,
-                                                         test_case_data, self._template_id_field_name)
+        case_ids_updated = []
+        if dry_run is False:
+            write_results = await self._tr.update_cases(case_changes)
+            case_ids_updated = self._process_write_results(write_results)
 
-        self._log.info("Beginning test case update process. Dry Run: {0}".format(dry_run))
-        case_ids_updated = self._update_test_cases(template_case_data, test_cases_to_update, dry_run)
+        return self._log_update_summary(case_ids_updated)
 
-        self._log.info("Updated {0} test cases. The following test case IDs have been updated {1}".
-                       format(len(case_ids_updated), str.join(',', case_ids_updated)))
+    def diff_test_case_data(self, test_case_data, sections_data: list = None) -> list:
+        """
+        Classifies already retrieved test case data and applies the template cases to the cases deriving from them,
+        without writing the changes. The case data is updated in place
+        :param test_case_data: The source test cases
+        :param sections_data: The raw sections data, or None to skip expanding the template sections
+        :return: Returns a list of (case_id, changed fields dict) tuples
+        """
+        if sections_data is not None:
+            self._expand_template_sections(sections_data)
 
-        return 0
+        with self._tr.phase("classify"):
+            classification = self._classify_test_case_data(test_case_data)
+        with self._tr.phase("diff"):
+            return self._diff_test_cases(classification.template_cases,
+                                         self._skip_journaled_cases(classification.template_cases,
+                                                                    classification.cases_to_update))
+
+    def needs_sections_data(self) -> bool:
+        """
+        Determines if section data is required to expand the template section IDs into their child sections
+        :return: Returns True if section data should be retrieved
+        """
+        return self._get_all_child_sections is True and len(self._template_src_section_ids) > 0
 
     # region Private Functions
 
-    def _update_test_cases(self, template_test_cases: dict, cases_to_update: dict,
-                           dry_run: bool) -> list:
+    def _template_index_is_built(self) -> bool:
+        """
+        Determines if a template index has been built for this suite and template ID field
+        :return: Returns True if derived test cases can be found through the template index
+        """
+        template_index = self._tr.template_index
+        if template_index is None:
+            return False
+
+        return template_index.is_built(self._tr_proj_id, self._tr_suite_id, self._template_id_field_name)
+
+    def _retrieve_testcase_data(self):
+        """
+        Retrieves the test case data to classify, using the narrowest fetch available:
+        -   Template cases by section with get_cases(section_id=...), when fetching templates by section
+        -   Template cases by ID with get_case, when templating by case ID and a template index is built
+        -   Otherwise the whole suite is streamed
+        :return: Returns an iterable of test case data
         """
+        if self._fetch_templates_by_section is True and len(self._template_src_section_ids) > 0:
+            self._log.info("Retrieving template test cases for project {0} from {1} sections"
+                           .format(self._tr_proj_id, len(self._template_src_section_ids)))
+            template_cases = self._tr.retrieve_testcase_data_by_sections(self._tr_proj_id, self._tr_suite_id,
+                                                                         self._template_src_section_ids,
+                                                                         fields=self._case_fields)
+            return self._retrieve_derived_testcase_data(template_cases)
+
+        if len(self._template_src_case_ids) > 0 and self._template_index_is_built() is True:
+            self._log.info("Retrieving template test cases for project {0} by case ID".format(self._tr_proj_id))
+            template_cases = self._tr.retrieve_testcase_data_by_ids(self._template_src_case_ids,
+                                                                    fields=self._case_fields)
+            return self._retrieve_derived_testcase_data(template_cases)
+
+        # Stream all test case data from the target project / suite straight into classification
+        self._log.info("Retrieving test case data for project {0} using suite ID: {1}".format(self._tr_proj_id,
+                                                                                              self._tr_suite_id))
+        return self._tr.iter_testcase_data(self._tr_proj_id, self._tr_suite_id, prefetch=True,
+                                           fields=self._case_fields)
 
-        :param template_test_cases:
-        :param cases_to_update:
-        :return:
+    def _retrieve_derived_testcase_data(self, template_cases: list):
+        """
+        Retrieves the test cases deriving from the provided template cases. TestRail cannot filter get_cases by a
+        custom field, so the derived cases come from the template index when one is built, otherwise from a suite
+        stream with the already retrieved template cases skipped.
+        :param template_cases: The template test case data
+        :return: Returns an iterable of the template test cases followed by the derived test cases
         """
-        cases_updated = []
+        template_case_ids = {case['id'] for case in template_cases}
 
-        try:
-            for template_id, template_data in template_test_cases.items():
-                if template_id in cases_to_update:
-                    for case_to_update in cases_to_update[template_id]:
-                        change_made = False
-
-                        for field in self._fields_to_template:
-                            template_field_data = template_data[field]
-
-                            if type(template_field_data) is list:
-                                end_template_after_step_index = self._check_for_endmarker_step(case_to_update[field])
-                                if self._is_steps_list_same(case_to_update[field], template_field_data,
-                                                            end_template_after_step_index) is False:
-                                    if end_template_after_step_index == -1:
-                                        case_to_update[field] = template_field_data
-                                        change_made = True
-                                    else:
-                                        new_steps = []
-                                        new_steps.extend(template_field_data)
-                                        case_steps = case_to_update[field]
-
-                                        for i in range(end_template_after_step_index, len(case_steps)):
-                                            new_steps.append(case_steps[i])
-
-                                        case_to_update[field] = new_steps
-                                        change_made = True
-
-                            elif type(template_field_data) is str:
-                                if case_to_update[field] != template_field_data:
-                                    if self._end_marker in case_to_update[field]:
-                                        new_str_data = self._handle_string_replacement(template_field_data,
-                                                                                       case_to_update[field])
-                                        if new_str_data != "":
-                                            case_to_update[field] = new_str_data
-                                            change_made = True
-                            else:
-                                if case_to_update[field] != template_field_data:
-                                    case_to_update[field] = template_field_data
-                                    change_made = True
-
-                        if dry_run is False and change_made is True:
-                            if self._update_test_case(case_to_update) is True:
-                                cases_updated.append(str(case_to_update['id']))
+        if self._template_index_is_built() is False:
+            self._log.info("No template index built for suite ID: {0}, scanning the suite for derived test cases"
+                           .format(self._tr_suite_id))
+            suite_cases = self._tr.iter_testcase_data(self._tr_proj_id, self._tr_suite_id, prefetch=True,
+                                                      fields=self._case_fields)
+            return itertools.chain(template_cases,
+                                   (case for case in suite_cases if case['id'] not in template_case_ids))
 
-        except Exception as e:
-            self._log.exception("Exception caught when attempting to update test case data! Exception: {0}".format(e))
+        template_ids = [case[self._template_id_field_name] for case in template_cases
+                        if case.get(self._template_id_field_name) is not None]
+        indexed = self._tr.template_index.get_case_ids(self._tr_proj_id, self._tr_suite_id,
+                                                       self._template_id_field_name, template_ids)
 
-        return cases_updated
+        target_case_ids = []
+        for case_ids in indexed.values():
+            target_case_ids.extend(case_id for case_id in case_ids if case_id not in template_case_ids)
 
-    def _update_test_case(self, case_data) -> bool:
+        self._log.info("Found {0} indexed test cases for {1} template IDs".format(len(target_case_ids),
+                                                                                 len(template_ids)))
+
+        return template_cases + self._tr.retrieve_testcase_data_by_ids(target_case_ids, fields=self._case_fields)
+
+    def _expand_template_sections(self, sections_data: list):
         """
-        Initiaties the update call to the TestRail server
-        :param case_data: The test case data for the test case to update
-        :return: Returns True on success, otherwise false
+        Expands the template section IDs to include all of their child sections
+        :param sections_data: The raw sections data
+        :return:
         """
-        update_result = self._tr.tr.cases.update_case(case_data['id'], **case_data)
+        section_tree = self._tr.build_section_tree(sections_data)
+        self._template_src_section_ids = self._tr.get_child_sections(self._template_src_section_ids, section_tree)
 
-        return 'error' not in update_result
+        return
 
-    def _is_steps_list_same(self, case_data_steps: list, template_data_steps: list, end_marker_index: int) -> bool:
+    def _classify_test_case_data(self, test_case_data) -> CaseClassification:
         """
-        Helper method to determine if there are custom steps added after an end marker has been
-        found in a Test Steps field type.
-        :param case_data_steps: The steps data list object
-        :param template_data_steps: The steps data list from the template case
-        :param end_marker_index: The test steps index of the end marker (if found) in the case data
-        :return:
+        Classifies the test case data and logs the results
+        :param test_case_data: The source test cases
+        :return: Returns the CaseClassification for the source test cases
         """
-        if len(case_data_steps) < len(template_data_steps):
-            return False
-        elif end_marker_index > -1 and end_marker_index != len(template_data_steps):
-            return False
-        else:
-            for i in range(0, len(template_data_steps)):
-                if case_data_steps[i]['content'] != template_data_steps[i]['content']:
-                    return False
-                if case_data_steps[i]['expected'] != template_data_steps[i]['expected']:
-                    return False
+        self._log.info("Beginning to classify template test cases and test cases to update")
+        classification = self._classify_cases(test_case_data)
+        self._log.info("Found {0} template test cases!".format(len(classification.template_cases)))
 
-        return True
+        for key, val in classification.cases_to_update.items():
+            self._log.info("Found {0} cases to update for template ID: {1}".format(len(val), key))
 
-    def _check_for_endmarker_step(self, case_data_steps: list) -> int:
+        return classification
+
+    def _log_update_summary(self, case_ids_updated: list) -> int:
         """
-        Helper function to scan all test steps in a test steps data field for the end marker. This is to identify where
-        the last index to update should be, in case any custom steps have been added past the templated steps
-        :param case_data_steps:
-        :return:
+        Logs the update summary for a templater execution
+        :param case_ids_updated: The case IDs successfully updated, as strings
+        :return: Returns 0 if every write succeeded, otherwise 2
         """
-        ret_val = -1
+        self._log.info("Updated {0} test cases. The following test case IDs have been updated {1}".
+                       format(len(case_ids_updated), str.join(',', case_ids_updated)))
 
-        for i in range(0, len(case_data_steps)):
-            step = case_data_steps[i]
-            if self._end_marker in step['content']:
-                ret_val = i
-                break
+        if len(case_ids_updated) != len(self._write_results):
+            return 2
 
-        return ret_val
+        return 0
+
+    def _update_test_cases(self, template_test_cases: dict, cases_to_update: dict,
+                           dry_run: bool) -> list:
+        """
+        Applies the template cases to the cases deriving from them and writes the changed cases
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :param dry_run: When True the changes are not written to the TestRail server
+        :return: Returns a list of the case IDs updated, as strings
+        """
+        self._write_results = []
+        with self._tr.phase("diff"):
+            case_changes = self._diff_test_cases(template_test_cases,
+                                                 self._skip_journaled_cases(template_test_cases, cases_to_update))
 
-    def _handle_string_replacement(self, template_data: str, case_data: str) -> str:
+        if dry_run is True:
+            return []
+
+        with self._tr.phase("write"):
+            return self._write_case_changes(case_changes)
+
+    def _plan_test_cases(self, template_test_cases: dict, cases_to_update: dict, plan_path: str,
+                         planned_at: float) -> int:
         """
-        Helper function
-        :param template_data:
-        :param case_data:
-        :return:
+        Streams the changes to the cases deriving from the template cases to a change plan instead of writing them
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :param plan_path: The change plan file path
+        :param planned_at: Time retrieving the test case data began
+        :return: Returns 0 if the plan was written, otherwise 1
         """
-        ret_val = "{0}{1}{2}"
+        try:
+            with ChangePlanWriter(plan_path, self._tr_proj_id, self._tr_suite_id, self._template_id_field_name,
+                                  self._fields_to_template, as_of=planned_at) as plan_writer:
+                with self._tr.phase("diff"):
+                    self._diff_test_cases(template_test_cases, cases_to_update, plan_writer)
+        except Exception as e:
+            self._log.exception("Failed to write change plan {0}. Exception: {1}".format(plan_path, e))
+            return 1
 
-        splits = case_data.split(self._end_marker)
-        if len(splits) > 1:
-            if template_data == splits[0]:
-                return ""
-            ret_val = ret_val.format(template_data, self._end_marker, splits[1])
+        return 0
+
+    def template_digest(self, case_id):
+        """
+        Gets the digest of the template applied to a test case by the last diff
+        :param case_id: The test case ID
+        :return: Returns the digest string, or None if the last diff did not change the case
+        """
+        return self._case_digests.get(int(case_id))
+
+    def _skip_journaled_cases(self, template_test_cases: dict, cases_to_update: dict) -> dict:
+        """
+        Removes the test cases the write journal confirms as written from their template's current digest. Cases
+        written from a template which changed since, or journaled without a digest, are kept
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :return: Returns the filtered dict
+        """
+        if self._write_journal is None:
+            return cases_to_update
+
+        completed = self._write_journal.completed_case_ids
+        if len(completed) == 0:
+            return cases_to_update
+
+        ret_val = {}
+        skipped = 0
+        for template_id, cases in cases_to_update.items():
+            template_data = template_test_cases.get(template_id)
+            if template_data is None or not any(int(case['id']) in completed for case in cases):
+                ret_val[template_id] = cases
+                continue
+
+            template_digest = TemplatePlan(template_data, self._fields_to_template, self._end_marker).digest
+            ret_val[template_id] = [case for case in cases
+                                    if self._write_journal.completed_digest(case['id']) != template_digest]
+            skipped += len(cases) - len(ret_val[template_id])
+
+        if skipped > 0:
+            self._log.info("Skipping {0} test cases already written from an unchanged template according to journal "
+                           "{1}".format(skipped, self._write_journal.path))
 
         return ret_val
 
-    def _get_template_cases_from_case_ids(self, src_template_case_ids: list, test_case_data: list,
-                                          template_id_field: str) -> dict:
+    def _record_write(self, result):
         """
-        Retrieve the template test cases that reside under the provided sectin ids
-        :param src_template_case_ids: The provided Template Test Case IDs
-        :param test_case_data: The source test cases
-        :param template_id_field: The field name of the Template ID field
+        Journals a write outcome with the digest of the template written
+        :param result: The WriteResult
         :return:
         """
-        template_cases = {}
+        self._write_journal.record(result, self.template_digest(result.case_id))
+
+    def _diff_test_cases(self, template_test_cases: dict, cases_to_update: dict,
+                         plan_writer: ChangePlanWriter = None) -> list:
+        """
+        Compiles each template case into a TemplatePlan and applies it to the cases deriving from the template.
+        The case data is updated in place and only the changed fields are collected for writing.
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :param plan_writer: Optional ChangePlanWriter each change is streamed to, with the case's updated_on from
+        before the change
+        :return: Returns a list of (case_id, changed fields dict) tuples
+        """
+        case_changes = []
+        self._case_digests = {}
 
         try:
-            for i in range(0, len(test_case_data)):
-                if test_case_data[i]['id'] in src_template_case_ids:
-                    template_cases[test_case_data[i][template_id_field]] = test_case_data[i]
+            for template_id, template_digest, changed_cases in self._iter_template_diffs(template_test_cases,
+                                                                                         cases_to_update):
+                for case_to_update, changes in changed_cases:
+                    self._case_digests[int(case_to_update['id'])] = template_digest
+                    if plan_writer is not None:
+                        plan_writer.add(case_to_update['id'], template_id, template_digest,
+                                        case_to_update.get('updated_on'), changes)
+                    case_to_update.update(changes)
+                    case_changes.append((case_to_update['id'], changes))
 
         except Exception as e:
-            self._log.exception("Exception hit when finding template test cases! Exception:{0}".format(e))
+            self._log.exception("Exception caught when attempting to update test case data! Exception: {0}".format(e))
 
-        return template_cases
+        self._log.info("Found {0} test cases with changes to deploy".format(len(case_changes)))
 
-    def _get_template_cases_from_secs(self, test_case_data: list, section_ids: list, template_id_field: str) -> dict:
+        return case_changes
+
+    def _iter_template_diffs(self, template_test_cases: dict, cases_to_update: dict):
         """
-        Retrieve the template test cases that reside under the provided sectin ids
-        :param test_case_data: The source test cases
-        :param section_ids: The section IDs to find matching test cases
-        :param template_id_field: The field name of the Template ID field
-        :return:
+        Diffs the cases deriving from each template case, in worker processes when diff_workers is set
+        :param template_test_cases: A dict of template ID -> template test case
+        :param cases_to_update: A dict of template ID -> list of test cases to update
+        :return: Returns a generator of (template_id, template digest, list of (test case, changed fields dict)),
+        holding only the cases with changes
         """
-        template_cases = {}
+        diff_engine = ProcessDiffEngine(self._fields_to_template, self._end_marker, self._diff_workers or 1)
 
-        try:
-            for i in range(0, len(test_case_data)):
-                if test_case_data[i]['section_id'] in section_ids:
-                    template_cases[test_case_data[i][template_id_field]] = test_case_data[i]
+        return diff_engine.diff(template_test_cases, cases_to_update)
 
-        except Exception as e:
-            self._log.exception("Exception hit when finding template test cases! Exception:{0}".format(e))
+    def _write_case_changes(self, case_changes: list) -> list:
+        """
+        Writes the changed fields of each test case to the TestRail server using the interface's write executor
+        :param case_changes: A list of (case_id, changed fields dict) tuples
+        :return: Returns a list of the case IDs successfully updated, as strings
+        """
+        on_result = self._record_write if self._write_journal is not None else None
+        write_results = self._tr.update_cases(case_changes, on_result)
 
-        return template_cases
+        return self._process_write_results(write_results)
 
-    def _get_cases_to_update(self, template_ids: list, template_case_ids: list,
-                             test_case_data: list, template_field_id: str) -> dict:
+    def _process_write_results(self, write_results: list) -> list:
         """
-        Get all the test cases which have matching template id data.
-        :param template_ids: The template ID retrieved from the source template test cases
-        :param test_case_data: The source test cases
-        :param template_field_id: The field name of the template ID field
-        :return: Returns a dict of template Id (keys) and a list of test cases (dicts) to update
+        Records the write results and logs any failed writes
+        :param write_results: A list of WriteResult
+        :return: Returns a list of the case IDs successfully updated, as strings
         """
-        cases_to_update = {}
+        self._write_results = write_results
+        cases_updated, cases_failed = summarize_results(write_results)
+        self._update_template_index(write_results)
 
-        for template_id in template_ids:
-            cases_to_update[template_id] = []
+        if len(cases_failed) > 0:
+            self._log.error("Failed to update {0} test cases. The following test case IDs failed to update {1}"
+                            .format(len(cases_failed), str.join(',', cases_failed)))
 
-        try:
-            for test_case in test_case_data:
-                if test_case[template_field_id] in template_ids and test_case['id'] not in template_case_ids:
-                        cases_to_update[test_case[template_field_id]].append(test_case)
+        return cases_updated
 
-        except Exception as e:
-            self._log.exception("Failure encountered when getting case data to update! Exception: {0}".format(e))
+    def _update_template_index(self, write_results: list):
+        """
+        Updates the template index, when one is in use, with the test case data returned by successful writes
+        :param write_results: A list of WriteResult
+        :return:
+        """
+        template_index = self._tr.template_index
+        if template_index is None:
+            return
 
-        for key, val in cases_to_update.items():
-            self._log.info("Found {0} cases to update for template ID: {1}".format(len(val), key))
+        template_index.upsert_cases(self._tr_proj_id, self._tr_suite_id, self._template_id_field_name,
+                                    [result.response for result in write_results
+                                     if result.success is True and isinstance(result.response, dict)])
+
+        return
+
+    def _classify_cases(self, test_case_data) -> CaseClassification:
+        """
+        Identifies the template test cases and the test cases to update with a single pass over the case data
+        :param test_case_data: The source test cases
+        :return: Returns the CaseClassification for the source test cases
+        """
+        classifier = CaseClassifier(self._template_id_field_name, section_ids=self._template_src_section_ids,
+                                    case_ids=self._template_src_case_ids)
 
-        return cases_to_update
+        return classifier.classify(test_case_data)
 
     def _verify_params(self) -> bool:
         """
@@ -19,126 +19,40 @@
 import argparse
 import logging
 import sys
+import typing
 
-from tr_utils.interface.tr_interface import TestRailInterface
-from tr_utils.utils.tr_gen_template_ids import TemplateIDGen
-from tr_utils.utils.tr_templater import TestRailTemplater
+from tr_utils import commands
+from tr_utils.utils.tr_profiler import PhaseProfiler
+
+# The interface and the utilities are imported once a utility is selected, keeping CLI startup light
+if typing.TYPE_CHECKING:
+    from tr_utils.interface.tr_interface import TestRailInterface
 
 _log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-class _utils(object):
-    class common_args:
-        @staticmethod
-        def add_secs_or_caseids(sub_parser: argparse.ArgumentParser, reqd: bool = True):
-            arg_group = sub_parser.add_mutually_exclusive_group(required=reqd)
-            arg_group.add_argument("-secids", "-s",
-                                             help="Section IDs in CSV format to template children test cases from",
-                                             type=str, default=None)
-            arg_group.add_argument("-tcids", "-i", help="TestCase IDs in CSV format to template from", type=str,
-                                   default=None)
-
-        @staticmethod
-        def add_inc_children_secs(sub_parser: argparse.ArgumentParser, reqd: bool = False, default: bool = False):
-            sub_parser.add_argument("-incchildren", "-c",
-                                          help="Include all children sections if templating by section id", type=bool,
-                                          required=reqd, default=default)
-
-        @staticmethod
-        def add_template_id_field_name(sub_parser: argparse.ArgumentParser, reqd: bool = False, default: bool = None):
-            sub_parser.add_argument("-tfname", "-tn", help="Template ID field name", required=reqd, type=str,
-                                          default=default)
-
-    class templater(object):
-
-        util = TestRailTemplater
-
-        @staticmethod
-        def setup_args(tr_util_subargs:argparse._SubParsersAction):
-            """
-            Defines the parameters for use with the templater utility
-
-            :param tr_util_subargs: The sub parser generated from the main instance of argparser
-            :return:
-            """
-            templater_parser = tr_util_subargs.add_parser("templater")
-
-            # add the section Ids or case Ids choice
-            _utils.common_args.add_secs_or_caseids(templater_parser)
-
-            # add option to include section children
-            _utils.common_args.add_inc_children_secs(templater_parser)
-
-            #add template ID field arg
-            _utils.common_args.add_template_id_field_name(templater_parser)
-
-            templater_parser.add_argument("-fields", "-f", help="Field names in CSV format to template", required=True)
-
-            templater_parser.add_argument("-markeroverride", "-mo", help="End of template marker override. Default "
-            "value is: {0}".format(_utils.templater.util.get_default_end_marker()),
-                                          required=False, type=str, default=None)
-            return
-
-        @staticmethod
-        def execute_util(templater_params:argparse.Namespace, tr_instance: TestRailInterface):
-            templater = _utils.templater.util(tr_instance, templater_params.trprojid, templater_params.tfname,
-                                              templater_params.fields, templater_params.secids, templater_params.tcids)
-
-            dry_run = False
-            if 'dryrun' in templater_params and templater_params.dryrun is not None:
-                if templater_params.dryrun.lower() == "true":
-                    dry_run = True
-
-            templater.execute_templater(dry_run)
-            return
-
-    class template_id_gen(object):
-        util = TemplateIDGen
-
-        @staticmethod
-        def setup_args(tr_util_subargs: argparse._SubParsersAction):
-            id_gen_parser = tr_util_subargs.add_parser("templateidgen")
 
-            # add the section Ids or case Ids choice
-            _utils.common_args.add_secs_or_caseids(id_gen_parser)
-
-            # add option to include section children
-            _utils.common_args.add_inc_children_secs(id_gen_parser)
-
-            #add template ID field arg
-            _utils.common_args.add_template_id_field_name(id_gen_parser)
-
-            id_gen_parser.add_argument("-overwrite", "-ow",
-                                          help="Overwrite data found in the TemplateID field. Defaults to "
-                                               "True", type=bool, required=False, default=True)
-
-        @staticmethod
-        def execute_util(template_id_gen_params:argparse.Namespace, tr_instance: TestRailInterface):
-            template_id_gen = _utils.template_id_gen.util(tr_instance, template_id_gen_params.tfname,
-                                                          template_id_gen_params.trprojid,
-                                                          template_id_gen_params.trsuiteid,
-                                                          template_id_gen_params.secids, template_id_gen_params.tcids)
-
-            dry_run = False
-            if 'dryrun' in template_id_gen_params and template_id_gen_params.dryrun is not None:
-                if template_id_gen_params.dryrun.lower() == "true":
-                    dry_run = True
+def _selected_util_name(tr_utils_args: argparse.ArgumentParser, argv: list) -> str:
+    """
+    Finds the utility name given on the command line, the first positional argument after the common arguments
+    :param tr_utils_args: The parser of the common arguments, before the utilities are added
+    :param argv: The arguments to parse
+    :return: Returns the utility name, or None if none is given
+    """
+    _, remaining = tr_utils_args.parse_known_args([arg for arg in argv if arg not in ("-h", "--help")])
 
-            template_id_gen.execute_id_gen(dry_run)
-            return
+    return next((arg for arg in remaining if arg.startswith("-") is False), None)
 
 
-def setup_templateid_gen_args(tr_util_subargs:argparse._SubParsersAction):
+def _setup_arg_parsers(argv: list = None) -> argparse.Namespace:
     """
-
-    :param tr_util_subargs:
-    :return:
+    Parses the common arguments, then the arguments of the selected utility. Only the selected utility's command is
+    imported and has its arguments defined
+    :param argv: The arguments to parse. Defaults to sys.argv
+    :return: Returns the parsed arguments, with the selected UtilCommand as 'command'
     """
+    argv = sys.argv[1:] if argv is None else argv
 
-    return
-
-
-def _setup_arg_parsers() -> argparse.Namespace:
     tr_utils_args = argparse.ArgumentParser()
     tr_utils_args.add_argument("-dryrun", help="Execute a dry run without writing and changes to TestRail",
                                required=False)
@@ -148,41 +62,150 @@ def _setup_arg_parsers() -> argparse.Namespace:
                                required=False, default=None)
     tr_utils_args.add_argument("-trpass", help="The TestRail password. Recommend usage of env vars for security",
                                required=False, default=None)
-    tr_utils_args.add_argument("-trprojid", "-pid", help="The TestRail project ID to perform operations in.",
-                               required=True)
+    tr_utils_args.add_argument("-concurrency", "-cc", help="The maximum number of test case writes to have in "
+                                                          "flight at once. Defaults to 1",
+                               required=False, type=int, default=1)
+    tr_utils_args.add_argument("-ratelimit", "-rl", help="The maximum number of TestRail API requests per second. "
+                                                         "Throttling by the server is handled either way",
+                               required=False, type=float, default=None)
+    tr_utils_args.add_argument("-requestconcurrency", "-rc", help="The maximum number of TestRail API requests to "
+                                                                  "have in flight at once. Defaults to the "
+                                                                  "concurrency", required=False, type=int,
+                               default=None)
+    tr_utils_args.add_argument("-poolsize", help="The number of kept-alive connections to pool. Defaults to the "
+                                                 "concurrency plus one", required=False, type=int, default=None)
+    tr_utils_args.add_argument("-connecttimeout", help="Seconds to wait for a connection to the TestRail server. "
+                                                       "Defaults to 10", required=False, type=float, default=10)
+    tr_utils_args.add_argument("-readtimeout", help="Seconds to wait for the TestRail server to respond. Defaults to "
+                                                    "60", required=False, type=float, default=60)
+    tr_utils_args.add_argument("-streamdecode", help="Decode test case pages incrementally as they are received, "
+                                                     "lowering peak memory for step heavy suites",
+                               action="store_true")
+    tr_utils_args.add_argument("-metricsjson", help="File to write the TestRail API call metrics to as JSON on exit",
+                               required=False, type=str, default=None)
+    tr_utils_args.add_argument("-metricsprom", help="File to write the TestRail API call metrics to in the "
+                                                    "Prometheus text format on exit",
+                               required=False, type=str, default=None)
+    tr_utils_args.add_argument("-profile", help="Time each phase of the utility run and log a phase report",
+                               action="store_true")
+    tr_utils_args.add_argument("-profilecpu", help="Also profile the CPU-bound phases with cProfile, writing pstats "
+                                                   "data, or with a sampling profiler, writing collapsed stacks for "
+                                                   "flamegraphs. Implies -profile",
+                               required=False, choices=PhaseProfiler.CPU_PROFILERS, default=None)
+    tr_utils_args.add_argument("-profileout", help="File to write the CPU profile to. Defaults to "
+                                                   "tr_utils_profile.prof or tr_utils_profile.collapsed",
+                               required=False, type=str, default=None)
+    journal_args = tr_utils_args.add_mutually_exclusive_group()
+    journal_args.add_argument("-journal", help="File to journal every test case write to, so an interrupted run can "
+                                               "be resumed with -resume", required=False, type=str, default=None)
+    journal_args.add_argument("-resume", help="Resume an interrupted run from its journal, skipping the test cases "
+                                              "it confirms as written. Templated cases are only skipped while their "
+                                              "template is unchanged", required=False, type=str, default=None)
+    tr_utils_args.add_argument("-snapshotdir", help="Directory to keep incrementally refreshed suite snapshots in. "
+                                                    "When set, suite test case data is served from the snapshot",
+                               required=False, type=str, default=None)
+    tr_utils_args.add_argument("-templateindex", "-ti", help="Path of the SQLite template ID index used to find "
+                                                             "derived test cases without a full suite scan",
+                               required=False, type=str, default=None)
+    tr_utils_args.add_argument("-trprojid", "-pid", help="The TestRail project ID to perform operations in. "
+                                                         "Required by every utility but batch and apply",
+                               required=False, default=None)
     tr_utils_args.add_argument("-trsuiteid", "-tsid", help="The TestRail suite ID to operate in. Optional if using"
                                                            "single suite mode.",
                                required=False)
+    # Utilities are listed without importing them, the selected one defines its arguments below
+    builtin_selected = _selected_util_name(tr_utils_args, argv) in commands.BUILTIN_COMMANDS
     tr_util_subargs = tr_utils_args.add_subparsers(help="Which TestRail utility to run", dest='util')
+    available = commands.available_commands(scan_entry_points=builtin_selected is False)
+    for name, util_help in available.items():
+        tr_util_subargs.add_parser(name, help=util_help, add_help=False)
 
-    _utils.templater.setup_args(tr_util_subargs)
-    _utils.template_id_gen.setup_args(tr_util_subargs)
+    parsed_args, util_argv = tr_utils_args.parse_known_args(argv)
+    parsed_args.command = None
+    if parsed_args.util is None:
+        if len(util_argv) > 0:
+            tr_utils_args.error("unrecognized arguments: {0}".format(" ".join(util_argv)))
+        return parsed_args
 
-    return tr_utils_args.parse_args()
+    parsed_args.command = commands.load_command(parsed_args.util)
+    util_parser = argparse.ArgumentParser(prog="{0} {1}".format(tr_utils_args.prog, parsed_args.util),
+                                          description=available[parsed_args.util])
+    parsed_args.command.setup_args(util_parser)
+
+    return util_parser.parse_args(util_argv, namespace=parsed_args)
 
 
 def _select_and_execute_util(parsed_args) -> int:
-    tri = TestRailInterface(parsed_args.trurl, parsed_args.truser, parsed_args.trpass)
+    command = parsed_args.command
+    if command is None:
+        _log.error("No TestRail utility selected. Cannot continue! Exiting.")
+        return 4
+
+    if command.requires_project is True and parsed_args.trprojid is None:
+        _log.error("The {0} utility requires the -trprojid parameter. Exiting.".format(parsed_args.util))
+        return 1
+
+    exit_code = command.prepare(parsed_args)
+    if exit_code is not None:
+        return exit_code
+
+    from tr_utils.interface.tr_interface import TestRailInterface
+
+    tri = TestRailInterface(parsed_args.trurl, parsed_args.truser, parsed_args.trpass,
+                            write_concurrency=parsed_args.concurrency, snapshot_dir=parsed_args.snapshotdir,
+                            template_index_path=parsed_args.templateindex, rate_limit=parsed_args.ratelimit,
+                            pool_size=parsed_args.poolsize, connect_timeout=parsed_args.connecttimeout,
+                            read_timeout=parsed_args.readtimeout, stream_decode=parsed_args.streamdecode,
+                            request_concurrency=parsed_args.requestconcurrency)
 
     if tri.is_initialized is False:
         _log.error("Failed to initialize TestRail interface. Cannot continue! Exiting.")
         return 3
 
-    #if parsed_args.util == _utils.templater.__name__:
-    #_utils.template_id_gen.execute_util(parsed_args, tri)
-    _utils.templater.execute_util(parsed_args, tri)
-        #todo error code handle
-     #   return 0
-
-    return 0
+    profiler = None
+    if parsed_args.profile is True or parsed_args.profilecpu is not None:
+        profiler = PhaseProfiler(parsed_args.profilecpu)
+        tri.add_phase_listener(profiler)
+        profiler.start()
+
+    try:
+        return command.execute_util(parsed_args, tri)
+    finally:
+        if profiler is not None:
+            _report_profile(parsed_args, tri, profiler)
+        _export_metrics(parsed_args, tri)
+
+
+def _report_profile(parsed_args, tri: "TestRailInterface", profiler: PhaseProfiler):
+    profiler.stop()
+    tri.remove_phase_listener(profiler)
+    _log.info("Phase profile:\n{0}".format(profiler.report(tri.metrics)))
+
+    if parsed_args.profilecpu is not None:
+        out_path = parsed_args.profileout
+        if out_path is None:
+            out_path = "tr_utils_profile.prof" if parsed_args.profilecpu == "cprofile" else \
+                "tr_utils_profile.collapsed"
+        try:
+            profiler.write_cpu_profile(out_path)
+        except Exception as e:
+            _log.exception("Failed to write the CPU profile. Exception: {0}".format(e))
+
+
+def _export_metrics(parsed_args, tri: "TestRailInterface"):
+    try:
+        if parsed_args.metricsjson is not None:
+            tri.metrics.write_json(parsed_args.metricsjson)
+        if parsed_args.metricsprom is not None:
+            tri.metrics.write_prometheus(parsed_args.metricsprom)
+    except Exception as e:
+        _log.exception("Failed to export the TestRail API call metrics. Exception: {0}".format(e))
 
 
 def main():
     parsed_args = _setup_arg_parsers()
-    _select_and_execute_util(parsed_args)
 
-    # TODO: [cf] Actual ret val
-    return 0
+    return _select_and_execute_util(parsed_args)
 
 if __name__ == '__main__':
     sys.exit(main())